@@ -0,0 +1,558 @@
+"""
+Lokalny serwer HTTP/JSON Ofertomat 2.0 - katalog i oferty dostępne dla innych programów w sieci lokalnej
+
+Uruchomienie:
+    python -m ofertomat serve [--host 127.0.0.1] [--port 8765] [--readers 4]
+    python api_server.py [--db ofertomat.db] [--port 8765]
+
+Współbieżność:
+    - odczyty obsługiwane równolegle (wątek na żądanie) z puli połączeń tylko do odczytu (WAL
+      pozwala czytać w trakcie zapisu),
+    - wszystkie zapisy przechodzą przez jeden wątek zapisujący (SingleWriter) - brak
+      rywalizacji o blokadę zapisu SQLite i błędów "database is locked",
+    - długie listy wysyłane są strumieniowo (Transfer-Encoding: chunked), PDF generowany
+      w pamięci (BytesIO) i wysyłany porcjami - bez plików tymczasowych.
+
+Endpointy:
+    GET    /api/health
+    GET    /api/categories
+    GET    /api/products?search=&category_id=&page=1&page_size=50
+    GET    /api/offers?search=&sort=modified&page=1&page_size=50
+    POST   /api/offers                  {"title", "items", "category_order"}
+    GET    /api/offers/<id>
+    PUT    /api/offers/<id>             {"title", "items", "category_order"} (pozycje z offer_item_id)
+    DELETE /api/offers/<id>
+    POST   /api/offers/<id>/clone       {"title"} (opcjonalnie)
+    GET    /api/offers/<id>/pdf
+"""
+
+import argparse
+import io
+import json
+import os
+import queue
+import re
+import sqlite3
+import sys
+import threading
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from database import Database, OFFER_SORT_ORDERS
+from services import OfferService
+
+DEFAULT_PORT = 8765
+DEFAULT_READERS = 4
+POOL_TIMEOUT_S = 10
+WRITE_TIMEOUT_S = 60
+MAX_PAGE_SIZE = 500
+MAX_BODY_BYTES = 16 * 1024 * 1024
+STREAM_CHUNK_BYTES = 64 * 1024
+
+
+class ApiError(Exception):
+    """Błąd żądania zwracany klientowi jako {"error": ...} z podanym kodem HTTP"""
+    
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class _PooledConnection:
+    """
+    Połączenie wypożyczone z puli - zachowuje się jak sqlite3.Connection,
+    ale close() oddaje je do puli zamiast zamykać
+    
+    Połączenie wraca do puli jawnie: przez close() (wzorzec try/finally w Database)
+    albo na końcu bloku "with self.get_connection() as conn" - tam Database
+    nie wywołuje close(), więc __exit__ po commit/rollback sam oddaje połączenie.
+    """
+    
+    __slots__ = ('_conn', '_pool')
+    
+    def __init__(self, conn: sqlite3.Connection, pool: queue.Queue):
+        self._conn = conn
+        self._pool = pool
+    
+    def __getattr__(self, name):
+        if name in self.__slots__:
+            raise AttributeError(name)
+        return getattr(self._conn, name)
+    
+    def __enter__(self):
+        self._conn.__enter__()
+        return self
+    
+    def __exit__(self, *exc_info):
+        try:
+            return self._conn.__exit__(*exc_info)
+        finally:
+            self.close()
+    
+    def close(self):
+        conn, self._conn = self._conn, None
+        if conn is None:
+            return
+        if conn.in_transaction:
+            conn.rollback()
+        self._pool.put(conn)
+
+
+class PooledDatabase(Database):
+    """
+    Database dla wątków serwera - stała pula połączeń tylko do odczytu (PRAGMA query_only)
+    
+    get_connection() wypożycza połączenie z puli; przy wyczerpaniu puli czeka
+    POOL_TIMEOUT_S, potem zgłasza ApiError 503. Zapisy wykonuje SingleWriter.
+    """
+    
+    check_same_thread = False
+    _pool: Optional[queue.Queue] = None
+    
+    def __init__(self, db_path: str = "ofertomat.db", pool_size: int = DEFAULT_READERS, **kwargs):
+        # Migracje (init_database) idą jeszcze przez zwykłe połączenie - pula powstaje po nich
+        super().__init__(db_path, **kwargs)
+        self.pool_size = pool_size
+        pool = queue.Queue()
+        for _ in range(pool_size):
+            conn = super().get_connection()
+            conn.execute('PRAGMA query_only = 1')
+            pool.put(conn)
+        self._pool = pool
+    
+    def get_connection(self):
+        if self._pool is None:
+            return super().get_connection()
+        try:
+            conn = self._pool.get(timeout=POOL_TIMEOUT_S)
+        except queue.Empty:
+            raise ApiError(503, "Wszystkie połączenia z bazą są zajęte - spróbuj ponownie")
+        return _PooledConnection(conn, self._pool)
+    
+    def close(self):
+        """Zamyka połączenia z puli (checkpoint robi baza wątku zapisującego)"""
+        pool, self._pool = self._pool, None
+        if pool is None:
+            return
+        for _ in range(self.pool_size):
+            try:
+                pool.get(timeout=POOL_TIMEOUT_S).close()
+            except queue.Empty:
+                print("Połączenie z puli nie zostało oddane przed zamknięciem serwera")
+                break
+
+
+class SingleWriter:
+    """
+    Jeden wątek wykonujący wszystkie zapisy serwera po kolei na własnym obiekcie Database
+    
+    submit(func) kolejkuje wywołanie func(db) i zwraca Future z jego wynikiem.
+    """
+    
+    def __init__(self, db: Database):
+        self.db = db
+        self._queue: queue.Queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="api-writer", daemon=True)
+        self._thread.start()
+    
+    def submit(self, func: Callable[[Database], object]) -> Future:
+        future = Future()
+        self._queue.put((func, future))
+        return future
+    
+    def call(self, func: Callable[[Database], object], timeout: float = WRITE_TIMEOUT_S):
+        """Wykonuje zapis i czeka na wynik (wyjątek z wątku zapisującego jest przekazywany dalej)"""
+        return self.submit(func).result(timeout)
+    
+    def _run(self):
+        while True:
+            task = self._queue.get()
+            if task is None:
+                break
+            func, future = task
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(func(self.db))
+            except Exception as e:
+                future.set_exception(e)
+        self.db.close()
+    
+    def close(self):
+        """Kończy wątek po wykonaniu zakolejkowanych zapisów"""
+        self._queue.put(None)
+        self._thread.join()
+
+
+def _int_param(query: Dict[str, List[str]], name: str, default: Optional[int],
+               minimum: int = 1, maximum: Optional[int] = None) -> Optional[int]:
+    """Parametr liczbowy z query string (ApiError 400 gdy niepoprawny)"""
+    values = query.get(name)
+    if not values or values[0] == '':
+        return default
+    try:
+        value = int(values[0])
+    except ValueError:
+        raise ApiError(400, f"Parametr {name} musi być liczbą całkowitą")
+    if value < minimum:
+        raise ApiError(400, f"Parametr {name} musi być >= {minimum}")
+    return min(value, maximum) if maximum is not None else value
+
+
+_NUMBER = (int, float)
+
+# Pola pozycji oferty w API: (dopuszczalne typy, wartość domyślna; _REQUIRED = pole wymagane)
+# Domyślne jak w OfferService.items_to_save (bez produktu nie ma domyślnej marży - 0) - zapisana
+# pozycja zawsze nadaje się do PDF
+_REQUIRED = object()
+OFFER_ITEM_FIELDS = {
+    'name': (str, _REQUIRED),
+    'purchase_price_net': (_NUMBER, _REQUIRED),
+    'vat_rate': (_NUMBER, _REQUIRED),
+    'category_name': (str, 'Bez kategorii'),
+    'unit': (str, 'szt.'),
+    'margin': (_NUMBER, 0.0),
+    'quantity': (_NUMBER, 1.0),
+    'product_id': (int, None),
+    'offer_item_id': (int, None),
+}
+
+
+def _offer_item(index: int, item: Dict) -> Dict:
+    """Pozycja oferty z treści żądania: sprawdzone typy i uzupełnione wartości domyślne"""
+    missing = [key for key, (_, default) in OFFER_ITEM_FIELDS.items()
+               if default is _REQUIRED and item.get(key) in (None, '')]
+    if missing:
+        raise ApiError(400, f"Pozycja {index}: brak pól {', '.join(missing)}")
+    
+    normalized = {}
+    for key, (types, default) in OFFER_ITEM_FIELDS.items():
+        value = item.get(key)
+        if value is None or (value == '' and types is str):
+            normalized[key] = default
+            continue
+        # bool jest podklasą int - true/false w JSON to nie liczba
+        if isinstance(value, bool) or not isinstance(value, types):
+            kind = 'tekstem' if types is str else 'liczbą całkowitą' if types is int else 'liczbą'
+            raise ApiError(400, f"Pozycja {index}: pole {key} musi być {kind}")
+        normalized[key] = value
+    if not normalized['name'].strip():
+        raise ApiError(400, f"Pozycja {index}: pole name nie może być puste")
+    return normalized
+
+
+def _offer_payload(body: Dict) -> Tuple[str, List[Dict], Dict]:
+    """Tytuł, pozycje i kolejność kategorii z treści POST/PUT oferty"""
+    title = body.get('title')
+    if not isinstance(title, str) or not title.strip():
+        raise ApiError(400, "Pole title jest wymagane")
+    items = body.get('items', [])
+    if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+        raise ApiError(400, "Pole items musi być listą obiektów")
+    items = [_offer_item(index, item) for index, item in enumerate(items)]
+    category_order = body.get('category_order', {})
+    if isinstance(category_order, list) and all(isinstance(name, str) for name in category_order):
+        category_order = {name: index for index, name in enumerate(category_order)}
+    if not isinstance(category_order, dict) or not all(
+            isinstance(index, _NUMBER) and not isinstance(index, bool) for index in category_order.values()):
+        raise ApiError(400, "Pole category_order musi być listą nazw kategorii lub obiektem {nazwa: numer}")
+    return title.strip(), items, category_order
+
+
+class ApiRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "Ofertomat/2.0"
+    
+    # (metoda, wzorzec ścieżki, nazwa metody obsługującej)
+    ROUTES = [
+        ('GET', r'/api/health', 'health'),
+        ('GET', r'/api/categories', 'categories'),
+        ('GET', r'/api/products', 'products'),
+        ('GET', r'/api/offers', 'list_offers'),
+        ('POST', r'/api/offers', 'create_offer'),
+        ('GET', r'/api/offers/(\d+)', 'get_offer'),
+        ('PUT', r'/api/offers/(\d+)', 'update_offer'),
+        ('DELETE', r'/api/offers/(\d+)', 'delete_offer'),
+        ('POST', r'/api/offers/(\d+)/clone', 'clone_offer'),
+        ('GET', r'/api/offers/(\d+)/pdf', 'offer_pdf'),
+    ]
+    
+    def do_GET(self):
+        self._dispatch('GET')
+    
+    def do_POST(self):
+        self._dispatch('POST')
+    
+    def do_PUT(self):
+        self._dispatch('PUT')
+    
+    def do_DELETE(self):
+        self._dispatch('DELETE')
+    
+    def _dispatch(self, method: str):
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        path_matched = False
+        try:
+            for route_method, pattern, name in self.ROUTES:
+                match = re.fullmatch(pattern, url.path.rstrip('/'))
+                if not match:
+                    continue
+                path_matched = True
+                if route_method == method:
+                    getattr(self, f'handle_{name}')(query, *(int(group) for group in match.groups()))
+                    return
+            if path_matched:
+                raise ApiError(405, f"Metoda {method} nie jest obsługiwana dla {url.path}")
+            raise ApiError(404, f"Nie ma zasobu {url.path}")
+        except ApiError as e:
+            self._send_json(e.status, {'error': e.message})
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+        except Exception as e:
+            self.log_error("Błąd obsługi %s %s: %r", method, self.path, e)
+            self._send_json(500, {'error': str(e)})
+    
+    # === ODPOWIEDZI ===
+    
+    def _send_json(self, status: int, data, headers: Optional[Dict[str, str]] = None):
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def _start_chunked(self, status: int, content_type: str, headers: Optional[Dict[str, str]] = None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Transfer-Encoding', 'chunked')
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+    
+    def _write_chunk(self, data: bytes):
+        if data:
+            self.wfile.write(f"{len(data):X}\r\n".encode('ascii') + data + b"\r\n")
+    
+    def _end_chunked(self):
+        self.wfile.write(b"0\r\n\r\n")
+    
+    def _send_json_stream(self, head: Dict, list_key: str, items: Iterable[Dict]):
+        """
+        Obiekt JSON z długą listą wysyłany porcjami (~STREAM_CHUNK_BYTES) - klient dostaje
+        pierwsze bajty od razu, serwer nie składa całej odpowiedzi w jednym napisie
+        """
+        self._start_chunked(200, 'application/json; charset=utf-8')
+        prefix = json.dumps(head, ensure_ascii=False)[:-1]
+        buffer = [f'{prefix}{", " if head else ""}"{list_key}": ['.encode('utf-8')]
+        buffered = len(buffer[0])
+        for index, item in enumerate(items):
+            part = (', ' if index else '') + json.dumps(item, ensure_ascii=False)
+            encoded = part.encode('utf-8')
+            buffer.append(encoded)
+            buffered += len(encoded)
+            if buffered >= STREAM_CHUNK_BYTES:
+                self._write_chunk(b''.join(buffer))
+                buffer, buffered = [], 0
+        buffer.append(b']}')
+        self._write_chunk(b''.join(buffer))
+        self._end_chunked()
+    
+    def _send_bytes_stream(self, data: memoryview, content_type: str, headers: Optional[Dict[str, str]] = None):
+        """Gotowa treść binarna wysyłana porcjami STREAM_CHUNK_BYTES (znana długość - bez chunked)"""
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        for offset in range(0, len(data), STREAM_CHUNK_BYTES):
+            self.wfile.write(data[offset:offset + STREAM_CHUNK_BYTES])
+    
+    def _read_json(self, required: bool = True) -> Dict:
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+        except ValueError:
+            raise ApiError(400, "Niepoprawny nagłówek Content-Length")
+        if length > MAX_BODY_BYTES:
+            self.close_connection = True
+            raise ApiError(413, f"Treść żądania większa niż {MAX_BODY_BYTES} bajtów")
+        if not length:
+            if required:
+                raise ApiError(400, "Brak treści żądania (JSON)")
+            return {}
+        try:
+            body = json.loads(self.rfile.read(length).decode('utf-8'))
+        except (UnicodeDecodeError, json.JSONDecodeError) as e:
+            raise ApiError(400, f"Niepoprawny JSON: {e}")
+        if not isinstance(body, dict):
+            raise ApiError(400, "Treść żądania musi być obiektem JSON")
+        return body
+    
+    def _existing_offer(self, offer_id: int) -> Dict:
+        offer = self.server.db.get_offer_by_id(offer_id)
+        if not offer:
+            raise ApiError(404, f"Nie ma oferty {offer_id}")
+        return offer
+    
+    # === ODCZYT (pula połączeń) ===
+    
+    def handle_health(self, query):
+        self._send_json(200, {
+            'status': 'ok',
+            'readers': self.server.db.pool_size,
+            'sqlite': sqlite3.sqlite_version
+        })
+    
+    def handle_categories(self, query):
+        self._send_json(200, {'categories': self.server.db.get_categories()})
+    
+    def handle_products(self, query):
+        page = _int_param(query, 'page', 1)
+        page_size = _int_param(query, 'page_size', 50, maximum=MAX_PAGE_SIZE)
+        category_id = _int_param(query, 'category_id', None)
+        search = query.get('search', [''])[0]
+        products, total = self.server.db.get_products_paginated(category_id, search, page, page_size)
+        self._send_json_stream({'page': page, 'page_size': page_size, 'total': total}, 'products', products)
+    
+    def handle_list_offers(self, query):
+        page = _int_param(query, 'page', 1)
+        page_size = _int_param(query, 'page_size', 50, maximum=MAX_PAGE_SIZE)
+        search = query.get('search', [''])[0]
+        sort = query.get('sort', ['modified'])[0]
+        if sort not in OFFER_SORT_ORDERS:
+            raise ApiError(400, f"Parametr sort: jedno z {', '.join(OFFER_SORT_ORDERS)}")
+        offers, total = self.server.db.list_offers(page, page_size, search, sort)
+        self._send_json_stream({'page': page, 'page_size': page_size, 'total': total}, 'offers', offers)
+    
+    def handle_get_offer(self, query, offer_id: int):
+        offer = self._existing_offer(offer_id)
+        items = offer.pop('items')
+        self._send_json_stream(offer, 'items', items)
+    
+    def handle_offer_pdf(self, query, offer_id: int):
+        offer = self._existing_offer(offer_id)
+        # reportlab ładowany dopiero przy pierwszym PDF (import api_server nie ciągnie pdf_generator)
+        from pdf_generator import PDFGenerationError
+        
+        # PDF budowany w pamięci - błąd generowania wychodzi przed wysłaniem nagłówków (kod 500)
+        buffer = io.BytesIO()
+        try:
+            rendered = self.server.offer_service.write_offer_pdf(offer, buffer)
+        except PDFGenerationError as e:
+            raise ApiError(500, f"Nie udało się wygenerować PDF oferty {offer_id}: {e}")
+        filename = os.path.basename(self.server.offer_service.offer_pdf_path(offer, ''))
+        self._send_bytes_stream(buffer.getbuffer(), 'application/pdf', {
+            'Content-Disposition': f'attachment; filename="{filename}"',
+            'X-PDF-Pages': str(rendered['pages']),
+            'X-Render-Seconds': f"{rendered['seconds']:.3f}"
+        })
+    
+    # === ZAPIS (jeden wątek zapisujący) ===
+    
+    def handle_create_offer(self, query):
+        title, items, category_order = _offer_payload(self._read_json())
+        offer_id = self.server.writer.call(lambda db: db.save_offer(title, items, category_order))
+        if not offer_id:
+            raise ApiError(500, "Nie udało się zapisać oferty")
+        self._send_json(201, {'id': offer_id}, {'Location': f'/api/offers/{offer_id}'})
+    
+    def handle_update_offer(self, query, offer_id: int):
+        title, items, category_order = _offer_payload(self._read_json())
+        self._existing_offer(offer_id)
+        if self.server.writer.call(lambda db: db.update_offer(offer_id, title, items, category_order)) is None:
+            raise ApiError(500, f"Nie udało się zaktualizować oferty {offer_id}")
+        self._send_json(200, {'id': offer_id})
+    
+    def handle_delete_offer(self, query, offer_id: int):
+        self._existing_offer(offer_id)
+        if not self.server.writer.call(lambda db: db.delete_offer(offer_id)):
+            raise ApiError(500, f"Nie udało się usunąć oferty {offer_id}")
+        self._send_json(200, {'deleted': offer_id})
+    
+    def handle_clone_offer(self, query, offer_id: int):
+        title = self._read_json(required=False).get('title')
+        if title is not None and not isinstance(title, str):
+            raise ApiError(400, "Pole title musi być tekstem")
+        self._existing_offer(offer_id)
+        new_id = self.server.writer.call(lambda db: db.clone_offer(offer_id, title))
+        if not new_id:
+            raise ApiError(500, f"Nie udało się skopiować oferty {offer_id}")
+        self._send_json(201, {'id': new_id}, {'Location': f'/api/offers/{new_id}'})
+
+
+class OfertomatHTTPServer(ThreadingHTTPServer):
+    """Serwer HTTP z pulą połączeń do odczytu i jednym wątkiem zapisującym"""
+    
+    daemon_threads = True
+    
+    def __init__(self, address: Tuple[str, int], db_path: str = "ofertomat.db",
+                 readers: int = DEFAULT_READERS):
+        self.db = PooledDatabase(db_path, pool_size=readers)
+        self.writer = SingleWriter(Database(db_path))
+        self.offer_service = OfferService(self.db)
+        try:
+            super().__init__(address, ApiRequestHandler)
+        except OSError:
+            self.writer.close()
+            self.db.close()
+            raise
+    
+    def server_close(self):
+        super().server_close()
+        self.writer.close()
+        self.db.close()
+
+
+def start_server(db_path: str = "ofertomat.db", host: str = "127.0.0.1", port: int = 0,
+                 readers: int = DEFAULT_READERS) -> Tuple[OfertomatHTTPServer, threading.Thread]:
+    """
+    Uruchamia serwer w wątku w tle (port=0 - wolny port, np. do testów na localhost)
+    
+    Zatrzymanie: server.shutdown(); server.server_close()
+    """
+    server = OfertomatHTTPServer((host, port), db_path, readers)
+    thread = threading.Thread(target=server.serve_forever, name="api-server", daemon=True)
+    thread.start()
+    return server, thread
+
+
+def serve(db_path: str = "ofertomat.db", host: str = "127.0.0.1", port: int = DEFAULT_PORT,
+          readers: int = DEFAULT_READERS) -> None:
+    """Uruchamia serwer na pierwszym planie (Ctrl+C kończy)"""
+    server = OfertomatHTTPServer((host, port), db_path, readers)
+    print(f"🌐 Serwer API Ofertomat: http://{host}:{server.server_port}/api/health "
+          f"({readers} połączeń do odczytu)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print("Serwer API zatrzymany")
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument('--host', default="127.0.0.1", help="adres nasłuchu (domyślnie tylko localhost)")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f"port (domyślnie {DEFAULT_PORT})")
+    parser.add_argument('--readers', type=int, default=DEFAULT_READERS,
+                        help=f"połączeń do odczytu w puli (domyślnie {DEFAULT_READERS})")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Ofertomat 2.0 - lokalny serwer HTTP/JSON")
+    parser.add_argument('--db', default="ofertomat.db", help="ścieżka do bazy (domyślnie ofertomat.db)")
+    add_arguments(parser)
+    args = parser.parse_args(argv)
+    serve(args.db, args.host, args.port, args.readers)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,511 @@
+"""
+Benchmarki wydajności Ofertomat 2.0
+Każdy benchmark działa na tymczasowej bazie i zwraca słownik z wynikami.
+
+Użycie:
+    python benchmark.py                       # wszystkie benchmarki
+    python benchmark.py read_during_import    # wybrane (nazwy jak w BENCHMARKS)
+    
+    python benchmark.py suite [--scales 2k,20k,200k,1m] [--lines 1k,10k,50k] [--output wyniki.json]
+    python benchmark.py compare baseline.json wyniki.json [--threshold 0.2]
+
+suite zakłada bazy z katalogiem w podanych skalach, mierzy import, przeglądanie,
+wyszukiwanie i operacje na ofertach, a wynik zapisuje jako JSON. compare porównuje
+dwa takie pliki i kończy się kodem 1, gdy któraś metryka pogorszyła się ponad próg.
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List
+
+from database import Database
+from generate_test_products import iter_products, sample_offer_items, seed_database, write_csv
+
+# Rejestr benchmarków: nazwa -> funkcja zwracająca słownik wyników
+BENCHMARKS: Dict[str, Callable[[], Dict]] = {}
+
+
+def benchmark(name: str):
+    """Dekorator rejestrujący benchmark"""
+    def register(func):
+        BENCHMARKS[name] = func
+        return func
+    return register
+
+
+def latency_stats(latencies_ms: List[float]) -> Dict:
+    """p50/p95/max dla listy czasów w ms"""
+    if not latencies_ms:
+        return {'count': 0, 'p50_ms': 0.0, 'p95_ms': 0.0, 'max_ms': 0.0}
+    ordered = sorted(latencies_ms)
+    return {
+        'count': len(ordered),
+        'p50_ms': round(ordered[len(ordered) // 2], 3),
+        'p95_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 3),
+        'max_ms': round(ordered[-1], 3)
+    }
+
+
+def make_products(count: int, seed: int = 42, code_prefix: str = "B",
+                  category_id: int = None) -> Iterator[Dict]:
+    """Deterministyczne produkty w formacie DataImporter.import_from_file"""
+    rnd = random.Random(seed)
+    for i in range(count):
+        yield {
+            'code': f"{code_prefix}{i:07d}",
+            'name': f"Produkt {rnd.randrange(10**9):09d}",
+            'unit': 'szt.',
+            'purchase_price_net': round(rnd.uniform(0.5, 500.0), 2),
+            'vat_rate': rnd.choice((5.0, 8.0, 23.0)),
+            'category_id': category_id
+        }
+
+
+@benchmark('read_during_import')
+def bench_read_during_import(rows: int = 100_000, initial_rows: int = 2000) -> Dict:
+    """
+    Opóźnienie odczytu pierwszej strony listy produktów w trakcie importu `rows` wierszy
+    Porównuje dziennik rollback ('safe') z WAL ('default')
+    """
+    results = {}
+    for profile in ('safe', 'default'):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            db = Database(os.path.join(tmp_dir, "bench.db"), pragma_profile=profile,
+                          pragmas={'busy_timeout': 2000})
+            db.import_products_batch(list(make_products(initial_rows, seed=1, code_prefix="A")))
+            products = list(make_products(rows, seed=2))
+            
+            import_time = {}
+            
+            def run_import():
+                start = time.perf_counter()
+                db.import_products_batch(products)
+                import_time['seconds'] = time.perf_counter() - start
+            
+            writer = threading.Thread(target=run_import)
+            latencies = []
+            locked_errors = 0
+            writer.start()
+            while writer.is_alive():
+                start = time.perf_counter()
+                try:
+                    db.get_products_paginated(page=1, page_size=100)
+                except sqlite3.OperationalError:
+                    locked_errors += 1
+                latencies.append((time.perf_counter() - start) * 1000)
+                time.sleep(0.005)
+            writer.join()
+            db.close()
+            
+            results[profile] = {
+                'journal_mode': db.pragmas['journal_mode'],
+                'import_seconds': round(import_time.get('seconds', 0.0), 3),
+                'locked_errors': locked_errors,
+                **latency_stats(latencies)
+            }
+    return results
+
+
+def make_offer_items(count: int, seed: int = 42) -> List[Dict]:
+    """Deterministyczne pozycje oferty w formacie Database.save_offer"""
+    rnd = random.Random(seed)
+    return [{
+        'product_id': i + 1,
+        'name': f"Produkt {rnd.randrange(10**9):09d}",
+        'category_name': f"Kategoria {i % 20}",
+        'unit': 'szt.',
+        'purchase_price_net': round(rnd.uniform(0.5, 500.0), 2),
+        'vat_rate': rnd.choice((5.0, 8.0, 23.0)),
+        'margin': 30.0,
+        'quantity': 1.0
+    } for i in range(count)]
+
+
+def throughput(rows: int, seconds: float) -> Dict:
+    """Czas i liczba wierszy na sekundę"""
+    return {
+        'rows': rows,
+        'seconds': round(seconds, 3),
+        'rows_per_s': round(rows / seconds) if seconds else 0
+    }
+
+
+@benchmark('save_offer')
+def bench_save_offer(lines: int = 50_000) -> Dict:
+    """
+    Zapis oferty z `lines` pozycjami: Database.save_offer (executemany)
+    w porównaniu z zapisem wiersz po wierszu w jednej transakcji
+    """
+    items = make_offer_items(lines)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db = Database(os.path.join(tmp_dir, "bench.db"))
+        
+        start = time.perf_counter()
+        conn = db.get_connection()
+        cursor = conn.cursor()
+        cursor.execute("INSERT INTO SavedOffers (title, created_date, modified_date, category_order) "
+                       "VALUES ('per_row', '', '', '{}')")
+        offer_id = cursor.lastrowid
+        for position, item in enumerate(items):
+            cursor.execute('''
+                INSERT INTO SavedOfferItems (offer_id, product_id, name, category_name, unit,
+                                            purchase_price_net, vat_rate, margin, quantity, position)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (offer_id, item['product_id'], item['name'], item['category_name'], item['unit'],
+                  item['purchase_price_net'], item['vat_rate'], item['margin'], item['quantity'],
+                  float(position)))
+        conn.commit()
+        conn.close()
+        per_row_seconds = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        db.save_offer("executemany", items, {})
+        bulk_seconds = time.perf_counter() - start
+        db.close()
+    
+    return {
+        'per_row': throughput(lines, per_row_seconds),
+        'executemany': throughput(lines, bulk_seconds)
+    }
+
+
+@benchmark('bulk_update_prices')
+def bench_bulk_update_prices(rows: int = 200_000) -> Dict:
+    """
+    Aktualizacja `rows` cen: Database.bulk_update_prices (executemany, commit porcjami)
+    w porównaniu z UPDATE wiersz po wierszu w jednej transakcji
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db = Database(os.path.join(tmp_dir, "bench.db"))
+        db.import_products_batch(list(make_products(rows)))
+        conn = db.get_connection()
+        product_ids = [row['id'] for row in conn.execute('SELECT id FROM Products')]
+        conn.close()
+        
+        rnd = random.Random(7)
+        updates = [{'id': product_id, 'purchase_price_net': round(rnd.uniform(0.5, 500.0), 2)}
+                   for product_id in product_ids]
+        
+        start = time.perf_counter()
+        conn = db.get_connection()
+        for update in updates:
+            conn.execute('UPDATE Products SET purchase_price_net = ?, price_update_date = ? WHERE id = ?',
+                         (update['purchase_price_net'], '2026-01-01 00:00:00', update['id']))
+        conn.commit()
+        conn.close()
+        per_row_seconds = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        db.bulk_update_prices(updates)
+        bulk_seconds = time.perf_counter() - start
+        db.close()
+    
+    return {
+        'per_row': throughput(len(updates), per_row_seconds),
+        'executemany': throughput(len(updates), bulk_seconds)
+    }
+
+
+# === PEŁNY ZESTAW W SKALI KATALOGU (suite / compare) ===
+
+SUITE_SCALES = ('2k', '20k', '200k', '1m')
+SUITE_OFFER_LINES = ('1k', '10k', '50k')
+SUITE_REPEAT = 20
+SUITE_BUDGET_S = 5.0        # limit czasu powtórzeń jednej operacji (wolne operacje przy 1M)
+SUITE_CATEGORIES = 20
+SUITE_PAGE_SIZE = 100
+SUITE_OFFER_CATALOG = 20_000  # katalog bazy, z której losowane są pozycje ofert
+
+# Metryki porównywane przez compare: mniejsze lepsze / większe lepsze
+LOWER_IS_BETTER = ('p50_ms', 'p95_ms', 'seconds')
+HIGHER_IS_BETTER = ('rows_per_s',)
+NOISE_FLOOR_MS = 1.0
+
+
+def parse_count(text: str) -> int:
+    """'2k' -> 2000, '1m' -> 1000000, '1500' -> 1500"""
+    text = text.strip().lower()
+    multiplier = {'k': 1_000, 'm': 1_000_000}.get(text[-1:], 1)
+    return int(float(text[:-1] if multiplier > 1 else text) * multiplier)
+
+
+def timed_ms(func: Callable[[], object], repeat: int = SUITE_REPEAT,
+             budget_s: float = SUITE_BUDGET_S) -> Dict:
+    """Powtarza func do `repeat` razy (co najmniej 3, o ile mieści się w budżecie czasu) - statystyki w ms"""
+    latencies = []
+    deadline = time.perf_counter() + budget_s
+    for run in range(repeat):
+        start = time.perf_counter()
+        func()
+        latencies.append((time.perf_counter() - start) * 1000)
+        if run >= 2 and time.perf_counter() > deadline:
+            break
+    return latency_stats(latencies)
+
+
+def seed_catalog(db: Database, csv_path: str) -> Dict:
+    """
+    Import cennika z pomiarem osobno parsowania (DataImporter) i zapisu (import_products_batch)
+    
+    Cennik pochodzi z generate_test_products (ten sam seed - te same dane). Plik czytany
+    jest porcjami (iter_import_batches - ta sama ścieżka co import_from_file), więc pamięć
+    nie rośnie z rozmiarem katalogu. Po imporcie produkty są rozdzielane między
+    SUITE_CATEGORIES kategorii i wykonywany jest PRAGMA optimize (poza pomiarem).
+    """
+    from importer import DataImporter
+    
+    parse_seconds = write_seconds = 0.0
+    rows = 0
+    batches = DataImporter.iter_import_batches(csv_path)
+    while True:
+        start = time.perf_counter()
+        batch = next(batches, None)
+        parse_seconds += time.perf_counter() - start
+        if batch is None:
+            break
+        start = time.perf_counter()
+        db.import_products_batch(batch)
+        write_seconds += time.perf_counter() - start
+        rows += len(batch)
+    
+    category_ids = [db.add_category(f"Kategoria {index}", 30.0) for index in range(SUITE_CATEGORIES)]
+    conn = db.get_connection()
+    try:
+        conn.executemany('UPDATE Products SET category_id = ? WHERE id % ? = ?',
+                         ((category_id, SUITE_CATEGORIES, index) for index, category_id in enumerate(category_ids)))
+        conn.commit()
+    finally:
+        conn.close()
+    db.optimize()
+    
+    return {
+        'parse': throughput(rows, parse_seconds),
+        'write': throughput(rows, write_seconds),
+        'total': throughput(rows, parse_seconds + write_seconds)
+    }
+
+
+def bench_catalog_reads(db: Database, count: int, repeat: int) -> Dict:
+    """Przeglądanie i wyszukiwanie katalogu (get_products_paginated)"""
+    last_page = max(1, -(-count // SUITE_PAGE_SIZE))
+    category_id = db.get_categories()[0]['id']
+    rare_code = f"{count // 2:08d}"
+    
+    def page(**kwargs):
+        return lambda: db.get_products_paginated(page_size=SUITE_PAGE_SIZE, **kwargs)
+    
+    return {
+        'browse_first_page': timed_ms(page(page=1), repeat),
+        'browse_deep_page': timed_ms(page(page=last_page), repeat),
+        'browse_category': timed_ms(page(category_id=category_id, page=1), repeat),
+        'search_common': timed_ms(page(search_query="sos", page=1), repeat),
+        'search_rare': timed_ms(page(search_query=rare_code, page=1), repeat)
+    }
+
+
+def bench_offer_ops(db: Database, lines: int, repeat: int, pdf: bool = True) -> Dict:
+    """Zapis, odczyt, zapis różnicowy i PDF oferty z `lines` pozycjami (produkty z katalogu bazy)"""
+    items = sample_offer_items(db, lines, random.Random(lines))
+    
+    start = time.perf_counter()
+    offer_id = db.save_offer(f"Benchmark {lines}", items, {})
+    results = {'save_offer': throughput(lines, time.perf_counter() - start)}
+    
+    results['get_offer_by_id'] = timed_ms(lambda: db.get_offer_by_id(offer_id), repeat)
+    
+    # Zapis różnicowy: zmiana ilości w co dziesiątej pozycji
+    offer = db.get_offer_by_id(offer_id)
+    for item in offer['items'][::10]:
+        item['quantity'] += 1
+    start = time.perf_counter()
+    db.update_offer(offer_id, offer['title'], offer['items'], {})
+    results['update_offer_10pct'] = throughput(len(offer['items'][::10]), time.perf_counter() - start)
+    
+    if pdf:
+        from pdf_generator import PDFGenerator
+        offer_data = {
+            'title': offer['title'],
+            'date': '01.01.2026',
+            'items': offer['items'],
+            'business_card': None,
+            'category_order': {}
+        }
+        rendered = PDFGenerator().render_offer_pdf(offer_data, io.BytesIO())
+        results['generate_offer_pdf'] = {
+            **throughput(lines, rendered['seconds']),
+            'pages': rendered['pages'],
+            'bytes': rendered['bytes']
+        }
+    return results
+
+
+def run_suite(scales: List[str] = SUITE_SCALES, offer_lines: List[str] = SUITE_OFFER_LINES,
+              repeat: int = SUITE_REPEAT, pdf: bool = True) -> Dict:
+    """
+    Pełny zestaw: dla każdej skali katalogu osobna baza (import + odczyty),
+    operacje na ofertach dla każdej liczby pozycji
+    
+    Returns: {'meta': {...}, 'results': {'catalog_2k': {...}, 'offer_1k': {...}, ...}}
+    """
+    results = {}
+    for label in scales:
+        count = parse_count(label)
+        print(f"⏱️  katalog {label} ({count} produktów)...")
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            csv_path = os.path.join(tmp_dir, "cennik.csv")
+            write_csv(iter_products(count, SUITE_CATEGORIES, seed=42), csv_path, delimiter=';')
+            db = Database(os.path.join(tmp_dir, "bench.db"))
+            results[f'catalog_{label}'] = {
+                'import': seed_catalog(db, csv_path),
+                **bench_catalog_reads(db, count, repeat)
+            }
+            db.close()
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db = Database(os.path.join(tmp_dir, "bench.db"))
+        seed_database(db, iter_products(SUITE_OFFER_CATALOG, SUITE_CATEGORIES, seed=42))
+        for label in offer_lines:
+            print(f"⏱️  oferta {label} pozycji...")
+            results[f'offer_{label}'] = bench_offer_ops(db, parse_count(label), repeat, pdf)
+        db.close()
+    
+    return {
+        'meta': {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+            'scales': list(scales),
+            'offer_lines': list(offer_lines),
+            'repeat': repeat
+        },
+        'results': results
+    }
+
+
+def _flatten_metrics(results: Dict, prefix: str = "") -> Dict[str, float]:
+    """{'catalog_2k': {'browse_first_page': {'p50_ms': 1.2}}} -> {'catalog_2k.browse_first_page.p50_ms': 1.2}"""
+    metrics = {}
+    for key, value in results.items():
+        path = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            metrics.update(_flatten_metrics(value, path))
+        elif key in LOWER_IS_BETTER or key in HIGHER_IS_BETTER:
+            metrics[path] = value
+    return metrics
+
+
+def compare_results(baseline: Dict, current: Dict, threshold: float = 0.2) -> List[Dict]:
+    """
+    Porównuje wyniki suite z bazowymi - lista metryk wspólnych dla obu plików
+    
+    regression = True gdy metryka pogorszyła się o więcej niż threshold (0.2 = 20%).
+    Czasy poniżej NOISE_FLOOR_MS w obu plikach nie są oznaczane jako regresja.
+    """
+    base_metrics = _flatten_metrics(baseline['results'])
+    current_metrics = _flatten_metrics(current['results'])
+    rows = []
+    for path, base_value in base_metrics.items():
+        if path not in current_metrics:
+            continue
+        value = current_metrics[path]
+        metric = path.rsplit('.', 1)[1]
+        if metric in HIGHER_IS_BETTER:
+            worse_ratio = base_value / value if value else float('inf')
+        else:
+            worse_ratio = value / base_value if base_value else (float('inf') if value else 1.0)
+        floor = NOISE_FLOOR_MS / 1000 if metric == 'seconds' else NOISE_FLOOR_MS
+        below_noise = metric in LOWER_IS_BETTER and max(value, base_value) < floor
+        rows.append({
+            'metric': path,
+            'baseline': base_value,
+            'current': value,
+            'change_pct': round((value - base_value) / base_value * 100, 1) if base_value else None,
+            'regression': not below_noise and worse_ratio > 1 + threshold
+        })
+    return rows
+
+
+def run_benchmarks(names: List[str] = None) -> Dict[str, Dict]:
+    """Uruchamia wybrane (domyślnie wszystkie) benchmarki i zwraca wyniki"""
+    results = {}
+    for name in names or list(BENCHMARKS):
+        print(f"⏱️  {name}...")
+        results[name] = BENCHMARKS[name]()
+    return results
+
+
+def main_suite(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(prog="python benchmark.py suite",
+                                     description="Pełny zestaw benchmarków w skali katalogu (wynik JSON)")
+    parser.add_argument('--scales', default=",".join(SUITE_SCALES), help="liczby produktów, np. 2k,20k,200k,1m")
+    parser.add_argument('--lines', default=",".join(SUITE_OFFER_LINES), help="pozycje ofert, np. 1k,10k,50k")
+    parser.add_argument('--repeat', type=int, default=SUITE_REPEAT, help="powtórzeń operacji odczytu")
+    parser.add_argument('--no-pdf', action='store_true', help="pomiń generowanie PDF")
+    parser.add_argument('--output', default="benchmark_results.json", help="plik wyników JSON")
+    args = parser.parse_args(argv)
+    
+    suite = run_suite([label for label in args.scales.split(',') if label],
+                      [label for label in args.lines.split(',') if label],
+                      repeat=args.repeat, pdf=not args.no_pdf)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(suite, f, ensure_ascii=False, indent=2)
+    
+    for section, operations in suite['results'].items():
+        print(f"\n📊 {section}")
+        for operation, values in operations.items():
+            print(f"   {operation}: " + ", ".join(f"{key}={value}" for key, value in values.items()))
+    print(f"\n💾 Wyniki zapisane: {args.output}")
+    return 0
+
+
+def main_compare(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(prog="python benchmark.py compare",
+                                     description="Porównanie wyników suite z plikiem bazowym")
+    parser.add_argument('baseline')
+    parser.add_argument('current')
+    parser.add_argument('--threshold', type=float, default=0.2, help="dopuszczalne pogorszenie (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+    
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    with open(args.current, encoding='utf-8') as f:
+        current = json.load(f)
+    
+    rows = compare_results(baseline, current, args.threshold)
+    width = max((len(row['metric']) for row in rows), default=10)
+    for row in rows:
+        change = f"{row['change_pct']:+.1f}%" if row['change_pct'] is not None else "-"
+        flag = "  ❌ REGRESJA" if row['regression'] else ""
+        print(f"{row['metric']:<{width}}  {row['baseline']:>12}  {row['current']:>12}  {change:>8}{flag}")
+    
+    regressions = sum(row['regression'] for row in rows)
+    print(f"\n{len(rows)} metryk, regresji: {regressions} (próg {args.threshold:.0%})")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ['suite']:
+        sys.exit(main_suite(sys.argv[2:]))
+    if sys.argv[1:2] == ['compare']:
+        sys.exit(main_compare(sys.argv[2:]))
+    
+    unknown = [name for name in sys.argv[1:] if name not in BENCHMARKS]
+    if unknown:
+        print(f"Nieznane benchmarki: {', '.join(unknown)}. Dostępne: {', '.join(BENCHMARKS)}")
+        sys.exit(2)
+    
+    for bench_name, bench_result in run_benchmarks(sys.argv[1:]).items():
+        print(f"\n📊 {bench_name}")
+        for variant, values in bench_result.items():
+            print(f"   {variant}: " + ", ".join(f"{key}={value}" for key, value in values.items()))
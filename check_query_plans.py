@@ -0,0 +1,147 @@
+"""
+Kontrola planów zapytań (EXPLAIN QUERY PLAN) dla Ofertomat 2.0
+Seeduje tymczasową bazę 100 000 produktów, wywołuje metody listujące Database
+i porównuje plan każdego zapytania z oczekiwanym dostępem do tabeli Products
+(EXPECTED_PLANS). Zapytanie z filtrem kategorii musi wyszukiwać w indeksie (SEARCH),
+pełny przebieg (SCAN) dopuszczamy tylko w wymienionych kształtach: lista bez filtra
+(kolejność z indeksu) i wyszukiwanie LIKE '%...%'. Sortowanie w TEMP B-TREE
+jest zawsze regresją. Kod wyjścia 1 oznacza regresję.
+
+Użycie:
+    python check_query_plans.py [liczba_produktów]
+"""
+
+import os
+import random
+import re
+import sys
+import tempfile
+
+from database import Database
+
+# Fragmenty planu oznaczające regresję
+FORBIDDEN_PLAN_STEPS = ('USE TEMP B-TREE',)
+
+# Oczekiwany krok planu dla tabeli Products (alias p) w kolejnych zapytaniach SELECT
+# wykonywanych przez daną metodę: (nazwa kształtu, wywołanie(db, category_id), wzorce kroków)
+_COUNT_ALL = r'SCAN p USING COVERING INDEX idx_products_\w+$'
+_ORDERED_SCAN = r'SCAN p USING INDEX idx_products_name_code$'
+_CATEGORY_SEARCH = r'SEARCH p USING INDEX idx_products_category_name \(category_id=\?\)$'
+_CATEGORY_COUNT = r'SEARCH p USING COVERING INDEX idx_products_category_name \(category_id=\?\)$'
+_LIKE_SCAN = r'SCAN p USING (COVERING )?INDEX idx_products_name_code$'
+
+EXPECTED_PLANS = [
+    ("get_products", lambda db, cat: db.get_products(), [_ORDERED_SCAN]),
+    ("get_products(kategoria)", lambda db, cat: db.get_products(cat), [_CATEGORY_SEARCH]),
+    ("strona 1", lambda db, cat: db.get_products_paginated(page=1, page_size=100),
+     [_COUNT_ALL, _ORDERED_SCAN]),
+    ("strona 50", lambda db, cat: db.get_products_paginated(page=50, page_size=100),
+     [_COUNT_ALL, _ORDERED_SCAN]),
+    ("strona kategorii", lambda db, cat: db.get_products_paginated(category_id=cat, page=2, page_size=100),
+     [_CATEGORY_COUNT, _CATEGORY_SEARCH]),
+    ("strona LIKE", lambda db, cat: db.get_products_paginated(search_query="123", page=1, page_size=100),
+     [_LIKE_SCAN, _LIKE_SCAN]),
+    ("strona kategorii LIKE",
+     lambda db, cat: db.get_products_paginated(category_id=cat, search_query="123", page=1, page_size=100),
+     [_CATEGORY_COUNT, _CATEGORY_SEARCH]),
+    ("search_products LIKE", lambda db, cat: db.search_products("123"), [_LIKE_SCAN]),
+]
+
+
+class TracingDatabase(Database):
+    """Database zapisujący treść wykonywanych zapytań (z podstawionymi parametrami)"""
+    
+    def __init__(self, db_path: str):
+        self.statements = []
+        super().__init__(db_path)
+    
+    def get_connection(self):
+        conn = super().get_connection()
+        conn.set_trace_callback(self.statements.append)
+        return conn
+
+
+def seed_products(db: Database, count: int, categories: int = 10, seed: int = 42):
+    """Wypełnia bazę deterministycznymi produktami"""
+    rnd = random.Random(seed)
+    conn = Database.get_connection(db)
+    cursor = conn.cursor()
+    cursor.executemany('INSERT OR IGNORE INTO Categories (name, default_margin) VALUES (?, ?)',
+                       ((f"Kategoria {i}", 30.0) for i in range(1, categories + 1)))
+    category_ids = [row['id'] for row in cursor.execute('SELECT id FROM Categories')]
+    cursor.executemany('''
+        INSERT INTO Products (code, name, unit, purchase_price_net, price_update_date, vat_rate, category_id)
+        VALUES (?, ?, ?, ?, '2026-01-01 00:00:00', ?, ?)
+    ''', ((f"P{i:07d}", f"Produkt {rnd.randrange(10**9):09d}", 'szt.',
+           round(rnd.uniform(0.5, 500.0), 2), 23.0, rnd.choice(category_ids))
+          for i in range(count)))
+    conn.commit()
+    conn.execute('ANALYZE')
+    conn.close()
+    return category_ids
+
+
+def find_plan_problems(plan_steps: list, expected: str) -> list:
+    """
+    Zwraca kroki planu niezgodne z oczekiwaniem
+    
+    Args:
+        plan_steps: Kolumna detail z EXPLAIN QUERY PLAN
+        expected: Wzorzec (regex) kroku dla tabeli Products
+    """
+    problems = [step for step in plan_steps
+                if any(forbidden in step for forbidden in FORBIDDEN_PLAN_STEPS)]
+    products_steps = [step for step in plan_steps if re.match(r'(SCAN|SEARCH) p\b', step)]
+    if not any(re.match(expected, step) for step in products_steps):
+        problems.append(f"oczekiwano: {expected}")
+    # Każdy inny pełny przebieg (np. Categories) też jest regresją
+    problems.extend(step for step in plan_steps
+                    if step.startswith('SCAN ') and not re.match(expected, step))
+    return problems
+
+
+def collect_query_plans(db: TracingDatabase, category_id: int) -> list:
+    """Wykonuje kształty z EXPECTED_PLANS; zwraca (kształt, sql, kroki planu, problemy)"""
+    results = []
+    conn = Database.get_connection(db)
+    try:
+        for name, call, expected_steps in EXPECTED_PLANS:
+            db.statements.clear()
+            call(db, category_id)
+            queries = [sql for sql in db.statements if sql.lstrip().upper().startswith('SELECT')]
+            if len(queries) != len(expected_steps):
+                results.append((name, ' | '.join(queries), [],
+                                [f"oczekiwano {len(expected_steps)} zapytań SELECT, jest {len(queries)}"]))
+                continue
+            for sql, expected in zip(queries, expected_steps):
+                plan_steps = [row['detail'] for row in conn.execute(f'EXPLAIN QUERY PLAN {sql}')]
+                results.append((name, sql, plan_steps, find_plan_problems(plan_steps, expected)))
+    finally:
+        conn.close()
+    return results
+
+
+def check_query_plans(product_count: int = 100_000) -> bool:
+    """Sprawdza plany zapytań; zwraca True jeśli brak regresji"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db = TracingDatabase(os.path.join(tmp_dir, "plans.db"))
+        category_ids = seed_products(db, product_count)
+        results = collect_query_plans(db, category_ids[len(category_ids) // 2])
+    
+    all_ok = True
+    for name, sql, plan_steps, problems in results:
+        status = "❌" if problems else "✅"
+        print(f"{status} [{name}] {' '.join(sql.split())[:100]}")
+        for step in plan_steps:
+            print(f"      {step}")
+        for problem in problems:
+            print(f"      ❌ {problem}")
+        all_ok = all_ok and not problems
+    return all_ok
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    ok = check_query_plans(count)
+    print(f"\n{'✅ Plany zapytań bez regresji' if ok else '❌ Wykryto regresję planów zapytań'} ({count} produktów)")
+    sys.exit(0 if ok else 1)
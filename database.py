@@ -1,44 +1,128 @@
 from datetime import datetime
-from typing import List, Dict, Optional, Tuple
+from typing import Iterator, List, Dict, Optional, Tuple
 import sqlite3
 import json
+import time
+from itertools import islice
 
-class Database:
-    def __init__(self, db_path: str = "ofertomat.db"):
-        self.db_path = db_path
-        self.init_database()
+# Profile ustawień SQLite (PRAGMA) stosowane przy każdym połączeniu
+# journal_mode ustawiany jest raz przy starcie (jest trwały w pliku bazy)
+PRAGMA_PROFILES = {
+    # Domyślny: WAL - odczyty UI nie czekają na długie transakcje importu
+    'default': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',       # W trybie WAL bezpieczne przy awarii aplikacji
+        'cache_size': -16000,          # Ujemna wartość = rozmiar w KiB (~16 MB)
+        'mmap_size': 64 * 1024 * 1024,
+        'temp_store': 'MEMORY',
+        'busy_timeout': 10000,         # ms
+        'wal_autocheckpoint': 1000,    # Strony WAL, po których następuje automatyczny checkpoint
+    },
+    # Maksymalna trwałość zapisów (np. baza na dysku sieciowym / bez WAL)
+    'safe': {
+        'journal_mode': 'DELETE',
+        'synchronous': 'FULL',
+        'cache_size': -4000,
+        'mmap_size': 0,
+        'temp_store': 'DEFAULT',
+        'busy_timeout': 10000,
+    },
+    # Masowe operacje wsadowe (import nocny, benchmarki) - większy cache, rzadsze checkpointy
+    'bulk': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -64000,
+        'mmap_size': 256 * 1024 * 1024,
+        'temp_store': 'MEMORY',
+        'busy_timeout': 30000,
+        'wal_autocheckpoint': 10000,
+    },
+}
+
+# Liczba wierszy operacji wsadowej, po której wykonujemy pasywny checkpoint WAL
+CHECKPOINT_AFTER_ROWS = 10000
+
+# Dozwolone sortowania listy ofert (Database.list_offers) -> klauzula ORDER BY
+OFFER_SORT_ORDERS = {
+    'modified': 'o.modified_date DESC, o.id DESC',
+    'created': 'o.created_date DESC, o.id DESC',
+    'title': 'o.title COLLATE NOCASE, o.id'
+}
+
+# Rozmiar porcji zapisu masowego (executemany + raport postępu / commit)
+BULK_WRITE_CHUNK_ROWS = 20000
+
+
+def _chunked(rows, size: int):
+    """Dzieli iterowalne wiersze na listy po `size` elementów"""
+    iterator = iter(rows)
+    chunk = list(islice(iterator, size))
+    while chunk:
+        yield chunk
+        chunk = list(islice(iterator, size))
+
+
+def _migration_initial_schema(cursor):
+    """Schemat bazowy (tabele, indeksy, kolumny company/quantity, opcjonalny kod)"""
+    # Tabela Categories
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS Categories (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL UNIQUE,
+            default_margin REAL DEFAULT 0.0
+        )
+    ''')
     
-    def get_connection(self):
-        """Tworzy połączenie z bazą danych"""
-        conn = sqlite3.connect(self.db_path, timeout=10.0)
-        conn.row_factory = sqlite3.Row
-        
-        # Dodaj funkcję do obsługi polskich znaków w wyszukiwaniu
-        def polish_lower(text):
-            if text is None:
-                return ""
-            return text.lower()
-        
-        conn.create_function("POLISH_LOWER", 1, polish_lower)
-        return conn
+    # Tabela Products
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS Products (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            code TEXT,
+            name TEXT NOT NULL,
+            unit TEXT DEFAULT 'szt.',
+            purchase_price_net REAL DEFAULT 0.0,
+            price_update_date TEXT,
+            vat_rate REAL DEFAULT 23.0,
+            category_id INTEGER,
+            FOREIGN KEY (category_id) REFERENCES Categories(id)
+        )
+    ''')
     
-    def init_database(self):
-        """Inicjalizuje bazę danych z tabelami"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        # Tabela Categories
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS Categories (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL UNIQUE,
-                default_margin REAL DEFAULT 0.0
-            )
-        ''')
+    # Indeksy dla optymalizacji wydajności
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_products_category ON Products(category_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_products_code ON Products(code)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_products_name ON Products(name COLLATE NOCASE)')
+    
+    # Tabela BusinessCard
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS BusinessCard (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            full_name TEXT,
+            phone TEXT,
+            email TEXT
+        )
+    ''')
+    
+    # Migracja: dodaj kolumnę company jeśli nie istnieje
+    cursor.execute("PRAGMA table_info(BusinessCard)")
+    columns = [row[1] for row in cursor.fetchall()]
+    if 'company' not in columns:
+        cursor.execute("ALTER TABLE BusinessCard ADD COLUMN company TEXT")
+        print("Dodano kolumnę 'company' do tabeli BusinessCard")
+    
+    # Migracja: usuń constraint UNIQUE i NOT NULL z kolumny code w Products
+    # SQLite nie pozwala na bezpośrednią modyfikację constraints, więc musimy przebudować tabelę
+    cursor.execute("PRAGMA table_info(Products)")
+    products_columns = cursor.fetchall()
+    
+    # Sprawdź czy trzeba wykonać migrację (sprawdzamy czy code ma NOT NULL)
+    code_column = [col for col in products_columns if col[1] == 'code']
+    if code_column and code_column[0][3] == 1:  # notnull == 1
+        print("Wykonuję migrację: usuwanie wymagania pola 'code' w Products...")
         
-        # Tabela Products
+        # Utwórz tabelę tymczasową z nową strukturą
         cursor.execute('''
-            CREATE TABLE IF NOT EXISTS Products (
+            CREATE TABLE Products_new (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 code TEXT,
                 name TEXT NOT NULL,
@@ -51,117 +135,538 @@ class Database:
             )
         ''')
         
-        # Indeksy dla optymalizacji wydajności
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_products_category ON Products(category_id)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_products_code ON Products(code)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_products_name ON Products(name COLLATE NOCASE)')
-        
-        # Tabela BusinessCard
+        # Skopiuj dane
         cursor.execute('''
-            CREATE TABLE IF NOT EXISTS BusinessCard (
-                id INTEGER PRIMARY KEY CHECK (id = 1),
-                full_name TEXT,
-                phone TEXT,
-                email TEXT
-            )
+            INSERT INTO Products_new (id, code, name, unit, purchase_price_net, 
+                                     price_update_date, vat_rate, category_id)
+            SELECT id, code, name, unit, purchase_price_net, 
+                   price_update_date, vat_rate, category_id
+            FROM Products
         ''')
         
-        # Migracja: dodaj kolumnę company jeśli nie istnieje
-        cursor.execute("PRAGMA table_info(BusinessCard)")
-        columns = [row[1] for row in cursor.fetchall()]
-        if 'company' not in columns:
-            cursor.execute("ALTER TABLE BusinessCard ADD COLUMN company TEXT")
-            print("Dodano kolumnę 'company' do tabeli BusinessCard")
+        # Usuń starą tabelę i przemianuj nową
+        cursor.execute('DROP TABLE Products')
+        cursor.execute('ALTER TABLE Products_new RENAME TO Products')
         
-        # Migracja: usuń constraint UNIQUE i NOT NULL z kolumny code w Products
-        # SQLite nie pozwala na bezpośrednią modyfikację constraints, więc musimy przebudować tabelę
-        cursor.execute("PRAGMA table_info(Products)")
-        products_columns = cursor.fetchall()
+        # Odtwórz indeksy
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_products_category ON Products(category_id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_products_code ON Products(code)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_products_name ON Products(name COLLATE NOCASE)')
         
-        # Sprawdź czy trzeba wykonać migrację (sprawdzamy czy code ma NOT NULL)
-        code_column = [col for col in products_columns if col[1] == 'code']
-        if code_column and code_column[0][3] == 1:  # notnull == 1
-            print("Wykonuję migrację: usuwanie wymagania pola 'code' w Products...")
-            
-            # Utwórz tabelę tymczasową z nową strukturą
-            cursor.execute('''
-                CREATE TABLE Products_new (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    code TEXT,
-                    name TEXT NOT NULL,
-                    unit TEXT DEFAULT 'szt.',
-                    purchase_price_net REAL DEFAULT 0.0,
-                    price_update_date TEXT,
-                    vat_rate REAL DEFAULT 23.0,
-                    category_id INTEGER,
-                    FOREIGN KEY (category_id) REFERENCES Categories(id)
-                )
-            ''')
-            
-            # Skopiuj dane
-            cursor.execute('''
-                INSERT INTO Products_new (id, code, name, unit, purchase_price_net, 
-                                         price_update_date, vat_rate, category_id)
-                SELECT id, code, name, unit, purchase_price_net, 
-                       price_update_date, vat_rate, category_id
-                FROM Products
+        print("Migracja zakończona: pole 'code' jest teraz opcjonalne")
+    
+    # Tabela SavedOffers - zapisane oferty
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS SavedOffers (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            created_date TEXT NOT NULL,
+            modified_date TEXT NOT NULL,
+            category_order TEXT
+        )
+    ''')
+    
+    # Tabela SavedOfferItems - pozycje w zapisanych ofertach
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS SavedOfferItems (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            offer_id INTEGER NOT NULL,
+            product_id INTEGER,
+            name TEXT NOT NULL,
+            category_name TEXT,
+            unit TEXT,
+            purchase_price_net REAL,
+            vat_rate REAL,
+            margin REAL,
+            FOREIGN KEY (offer_id) REFERENCES SavedOffers(id) ON DELETE CASCADE
+        )
+    ''')
+    
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_offer_items_offer ON SavedOfferItems(offer_id)')
+    
+    # Migracja: dodaj kolumnę quantity jeśli nie istnieje
+    cursor.execute("PRAGMA table_info(SavedOfferItems)")
+    offer_items_columns = [row[1] for row in cursor.fetchall()]
+    if 'quantity' not in offer_items_columns:
+        cursor.execute("ALTER TABLE SavedOfferItems ADD COLUMN quantity REAL DEFAULT 1.0")
+        print("Dodano kolumnę 'quantity' do tabeli SavedOfferItems")
+    
+    # Dodaj domyślną kategorię jeśli baza jest pusta
+    cursor.execute('SELECT COUNT(*) as count FROM Categories')
+    if cursor.fetchone()['count'] == 0:
+        cursor.execute('INSERT INTO Categories (name, default_margin) VALUES (?, ?)', 
+                     ('Bez kategorii', 30.0))
+
+
+def _migration_listing_indexes(cursor):
+    """Indeksy złożone pod zapytania listujące produkty"""
+    # (category_id, name, code) - filtr kategorii + ORDER BY p.name bez sortowania w TEMP B-TREE,
+    # COUNT(*) z wyszukiwaniem liczony z samego indeksu (covering)
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_products_category_name ON Products(category_id, name, code)')
+    # (name, code) - lista bez filtra w kolejności nazwy, zliczanie wyszukiwania bez odczytu tabeli
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_products_name_code ON Products(name, code)')
+    
+    # Stare indeksy: pierwszy jest prefiksem nowego, drugi (COLLATE NOCASE) nie pasuje do ORDER BY p.name
+    cursor.execute('DROP INDEX IF EXISTS idx_products_category')
+    cursor.execute('DROP INDEX IF EXISTS idx_products_name')
+
+
+def _migration_offer_item_positions(cursor):
+    """Stabilna kolejność pozycji ofert (kolumna position) pod zapis różnicowy"""
+    cursor.execute("PRAGMA table_info(SavedOfferItems)")
+    if 'position' not in [row[1] for row in cursor.fetchall()]:
+        cursor.execute("ALTER TABLE SavedOfferItems ADD COLUMN position REAL")
+    
+    # Dotychczasowa kolejność wynikała z id - numerujemy pozycje w obrębie oferty
+    cursor.execute('SELECT id, offer_id FROM SavedOfferItems ORDER BY offer_id, id')
+    positions = []
+    last_offer_id, position = None, 0
+    for row in cursor.fetchall():
+        position = position + 1 if row['offer_id'] == last_offer_id else 0
+        last_offer_id = row['offer_id']
+        positions.append((float(position), row['id']))
+    cursor.executemany('UPDATE SavedOfferItems SET position = ? WHERE id = ?', positions)
+    
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_offer_items_offer_position ON SavedOfferItems(offer_id, position)')
+    cursor.execute('DROP INDEX IF EXISTS idx_offer_items_offer')
+
+
+def _migration_offer_listing_index(cursor):
+    """Indeks pod listę zapisanych ofert sortowaną po dacie modyfikacji"""
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_saved_offers_modified ON SavedOffers(modified_date, id)')
+
+
+def _refresh_offer_totals(cursor, offer_id: Optional[int] = None):
+    """
+    Przelicza zmaterializowane sumy oferty (lub wszystkich ofert gdy offer_id=None)
+    
+    Zaokrąglenia per pozycja jak w PDFGenerator.calculate_price: netto, VAT
+    i brutto pozycji zaokrąglane osobno, sumy z zaokrąglonych wartości.
+    """
+    if offer_id is not None:
+        items_filter, offers_filter, params = 'WHERE offer_id = ?', 'WHERE id = ?', (offer_id,)
+    else:
+        items_filter, offers_filter, params = '', '', ()
+    cursor.execute(f'DELETE FROM SavedOfferTotals {items_filter}', params)
+    cursor.execute(f'''
+        INSERT INTO SavedOfferTotals (offer_id, category_name, vat_rate, items_count,
+                                      total_net, total_vat, total_gross)
+        SELECT offer_id, category_name, vat_rate, COUNT(*),
+               ROUND(COALESCE(SUM(ROUND(line_net, 2)), 0), 2),
+               ROUND(COALESCE(SUM(ROUND(line_net * vat_rate / 100, 2)), 0), 2),
+               ROUND(COALESCE(SUM(ROUND(line_net * (1 + vat_rate / 100), 2)), 0), 2)
+        FROM (
+            SELECT offer_id,
+                   COALESCE(category_name, 'Bez kategorii') AS category_name,
+                   COALESCE(vat_rate, 23.0) AS vat_rate,
+                   purchase_price_net * (1 + COALESCE(margin, 30.0) / 100) * COALESCE(quantity, 1.0) AS line_net
+            FROM SavedOfferItems
+            {items_filter}
+        )
+        GROUP BY offer_id, category_name, vat_rate
+    ''', params)
+    cursor.execute(f'''
+        UPDATE SavedOffers
+        SET (items_count, total_net, total_vat, total_gross) = (
+            SELECT COALESCE(SUM(items_count), 0), ROUND(COALESCE(SUM(total_net), 0), 2),
+                   ROUND(COALESCE(SUM(total_vat), 0), 2), ROUND(COALESCE(SUM(total_gross), 0), 2)
+            FROM SavedOfferTotals t
+            WHERE t.offer_id = SavedOffers.id
+        )
+        {offers_filter}
+    ''', params)
+
+
+def _migration_offer_totals(cursor):
+    """Zmaterializowane sumy ofert (kolumny w SavedOffers + tabela SavedOfferTotals)"""
+    cursor.execute("PRAGMA table_info(SavedOffers)")
+    columns = [row[1] for row in cursor.fetchall()]
+    for column, definition in (('items_count', 'INTEGER NOT NULL DEFAULT 0'),
+                               ('total_net', 'REAL NOT NULL DEFAULT 0'),
+                               ('total_vat', 'REAL NOT NULL DEFAULT 0'),
+                               ('total_gross', 'REAL NOT NULL DEFAULT 0')):
+        if column not in columns:
+            cursor.execute(f"ALTER TABLE SavedOffers ADD COLUMN {column} {definition}")
+    
+    # Sumy per kategoria i stawka VAT
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS SavedOfferTotals (
+            offer_id INTEGER NOT NULL,
+            category_name TEXT NOT NULL,
+            vat_rate REAL NOT NULL,
+            items_count INTEGER NOT NULL,
+            total_net REAL NOT NULL,
+            total_vat REAL NOT NULL,
+            total_gross REAL NOT NULL,
+            PRIMARY KEY (offer_id, category_name, vat_rate),
+            FOREIGN KEY (offer_id) REFERENCES SavedOffers(id) ON DELETE CASCADE
+        ) WITHOUT ROWID
+    ''')
+    
+    _refresh_offer_totals(cursor)
+
+
+def _migration_price_history(cursor):
+    """Historia cen zakupu (PriceHistory) zapisywana triggerami na Products"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS PriceHistory (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            product_id INTEGER NOT NULL,
+            purchase_price_net REAL NOT NULL,
+            valid_from TEXT NOT NULL,
+            FOREIGN KEY (product_id) REFERENCES Products(id) ON DELETE CASCADE
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_price_history_product ON PriceHistory(product_id, valid_from)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_price_history_valid_from ON PriceHistory(valid_from, product_id)')
+    
+    # Cena obowiązuje od price_update_date ustawianego przez zapisujący kod
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_products_price_insert
+        AFTER INSERT ON Products
+        WHEN NEW.purchase_price_net IS NOT NULL
+        BEGIN
+            INSERT INTO PriceHistory (product_id, purchase_price_net, valid_from)
+            VALUES (NEW.id, NEW.purchase_price_net,
+                    COALESCE(NEW.price_update_date, datetime('now', 'localtime')));
+        END
+    ''')
+    # Tylko rzeczywista zmiana ceny (ten sam próg co update_product) - import bez zmian nie pisze historii
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_products_price_update
+        AFTER UPDATE OF purchase_price_net ON Products
+        WHEN NEW.purchase_price_net IS NOT NULL
+             AND (OLD.purchase_price_net IS NULL
+                  OR abs(NEW.purchase_price_net - OLD.purchase_price_net) > 0.001)
+        BEGIN
+            INSERT INTO PriceHistory (product_id, purchase_price_net, valid_from)
+            VALUES (NEW.id, NEW.purchase_price_net,
+                    COALESCE(NEW.price_update_date, datetime('now', 'localtime')));
+        END
+    ''')
+    # foreign_keys nie jest włączone - historię usuniętego produktu sprzątamy triggerem
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_products_price_delete
+        AFTER DELETE ON Products
+        BEGIN
+            DELETE FROM PriceHistory WHERE product_id = OLD.id;
+        END
+    ''')
+    
+    # Punkt startowy historii - aktualne ceny
+    cursor.execute('''
+        INSERT INTO PriceHistory (product_id, purchase_price_net, valid_from)
+        SELECT id, purchase_price_net, COALESCE(price_update_date, datetime('now', 'localtime'))
+        FROM Products
+        WHERE purchase_price_net IS NOT NULL
+          AND id NOT IN (SELECT product_id FROM PriceHistory)
+    ''')
+
+
+def _migration_offer_drafts(cursor):
+    """Szkice ofert w bazie (DraftOffers, DraftCategories, DraftItems)"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS DraftOffers (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            source_offer_id INTEGER,
+            created_date TEXT NOT NULL,
+            modified_date TEXT NOT NULL
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS DraftCategories (
+            draft_id INTEGER NOT NULL,
+            category_name TEXT NOT NULL,
+            sort_order INTEGER NOT NULL,
+            PRIMARY KEY (draft_id, category_name)
+        ) WITHOUT ROWID
+    ''')
+    # offer_item_id - wiersz SavedOfferItems, z którego pochodzi pozycja (zapis różnicowy)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS DraftItems (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            draft_id INTEGER NOT NULL,
+            offer_item_id INTEGER,
+            product_id INTEGER,
+            name TEXT NOT NULL,
+            category_name TEXT NOT NULL,
+            unit TEXT,
+            purchase_price_net REAL,
+            vat_rate REAL,
+            margin REAL,
+            quantity REAL DEFAULT 1.0,
+            position REAL NOT NULL
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_draft_items_category ON DraftItems(draft_id, category_name, position)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_draft_items_product ON DraftItems(draft_id, product_id)')
+
+
+def _migration_draft_journal(cursor):
+    """Dziennik autozapisu szkiców (DraftJournal) i licznik zmian szkicu"""
+    cursor.execute("PRAGMA table_info(DraftOffers)")
+    if 'changes' not in [row[1] for row in cursor.fetchall()]:
+        cursor.execute("ALTER TABLE DraftOffers ADD COLUMN changes INTEGER NOT NULL DEFAULT 0")
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS DraftJournal (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            draft_id INTEGER NOT NULL,
+            operation TEXT NOT NULL,
+            created_date TEXT NOT NULL
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_draft_journal_draft ON DraftJournal(draft_id, id)')
+
+
+def _migration_draft_item_positions(cursor):
+    """Indeks kolejności pozycji szkicu - wstawianie pozycji przed wskazaną (cofnięcie usunięcia)"""
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_draft_items_position ON DraftItems(draft_id, position)')
+
+
+def _migration_change_counter(cursor):
+    """Licznik zmian katalogu (ChangeCounter) podbijany triggerami na Products i Categories"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS ChangeCounter (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            value INTEGER NOT NULL
+        )
+    ''')
+    cursor.execute('INSERT OR IGNORE INTO ChangeCounter (id, value) VALUES (1, 0)')
+    
+    # PRAGMA data_version dotyczy tylko jednego połączenia, a w trybie WAL licznik zmian
+    # w nagłówku pliku nie rośnie - stąd trwały licznik aktualizowany w tej samej transakcji
+    for table in ('Products', 'Categories'):
+        for event in ('INSERT', 'UPDATE', 'DELETE'):
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS trg_{table.lower()}_change_{event.lower()}
+                AFTER {event} ON {table}
+                BEGIN
+                    UPDATE ChangeCounter SET value = value + 1 WHERE id = 1;
+                END
             ''')
-            
-            # Usuń starą tabelę i przemianuj nową
-            cursor.execute('DROP TABLE Products')
-            cursor.execute('ALTER TABLE Products_new RENAME TO Products')
-            
-            # Odtwórz indeksy
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_products_category ON Products(category_id)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_products_code ON Products(code)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_products_name ON Products(name COLLATE NOCASE)')
-            
-            print("Migracja zakończona: pole 'code' jest teraz opcjonalne")
-        
-        # Tabela SavedOffers - zapisane oferty
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS SavedOffers (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                title TEXT NOT NULL,
-                created_date TEXT NOT NULL,
-                modified_date TEXT NOT NULL,
-                category_order TEXT
-            )
-        ''')
-        
-        # Tabela SavedOfferItems - pozycje w zapisanych ofertach
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS SavedOfferItems (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                offer_id INTEGER NOT NULL,
-                product_id INTEGER,
-                name TEXT NOT NULL,
-                category_name TEXT,
-                unit TEXT,
-                purchase_price_net REAL,
-                vat_rate REAL,
-                margin REAL,
-                FOREIGN KEY (offer_id) REFERENCES SavedOffers(id) ON DELETE CASCADE
-            )
-        ''')
+
+
+def _migration_draft_baseline(cursor):
+    """Szkic edycji oferty bez kopii pozycji - zapisana oferta jest punktem wyjścia dziennika"""
+    cursor.execute("PRAGMA table_info(DraftOffers)")
+    if 'baseline_pending' not in [row[1] for row in cursor.fetchall()]:
+        # 1 = pozycje oferty źródłowej nie są jeszcze skopiowane do DraftItems (istniejące szkice mają kopię)
+        cursor.execute("ALTER TABLE DraftOffers ADD COLUMN baseline_pending INTEGER NOT NULL DEFAULT 0")
+
+
+def _migration_change_counter_per_transaction(cursor):
+    """Licznik zmian katalogu podbijany raz na transakcję zapisu zamiast triggerów na każdym wierszu"""
+    # Trigger wykonywał UPDATE ChangeCounter dla każdego zmienionego wiersza (~7% czasu importu);
+    # teraz licznik podbijają metody zapisu klasy Database (_bump_change_counter)
+    for table in ('products', 'categories'):
+        for event in ('insert', 'update', 'delete'):
+            cursor.execute(f'DROP TRIGGER IF EXISTS trg_{table}_change_{event}')
+
+
+# Kolejne migracje schematu - numer wersji = pozycja na liście (PRAGMA user_version)
+# Nowe migracje dopisujemy WYŁĄCZNIE na końcu listy
+MIGRATIONS = [
+    _migration_initial_schema,
+    _migration_listing_indexes,
+    _migration_offer_item_positions,
+    _migration_offer_listing_index,
+    _migration_offer_totals,
+    _migration_price_history,
+    _migration_offer_drafts,
+    _migration_draft_journal,
+    _migration_draft_item_positions,
+    _migration_change_counter,
+    _migration_draft_baseline,
+    _migration_change_counter_per_transaction,
+]
+
+
+# Kolumny pozycji oferty porównywane przy zapisie różnicowym (kolejność jak w _offer_item_values)
+OFFER_ITEM_COLUMNS = ('product_id', 'name', 'category_name', 'unit',
+                      'purchase_price_net', 'vat_rate', 'margin', 'quantity')
+
+# Minimalny odstęp między pozycjami - poniżej tej wartości kolejność numerujemy od nowa
+MIN_POSITION_GAP = 1e-6
+
+
+def _offer_item_values(item: Dict) -> tuple:
+    """Wartości kolumn OFFER_ITEM_COLUMNS dla pozycji oferty"""
+    return (item.get('product_id'), item['name'], item.get('category_name'),
+            item.get('unit'), item.get('purchase_price_net'), item.get('vat_rate'),
+            item.get('margin'), item.get('quantity', 1.0))
+
+
+def _plan_item_positions(old_positions: List[Optional[float]]) -> List[float]:
+    """
+    Wylicza nowe wartości position dla listy pozycji w docelowej kolejności
+    
+    Pozycje leżące na najdłuższym rosnącym podciągu starych wartości zachowują
+    swoje position (nie wymagają zapisu); przesunięte i nowe pozycje dostają
+    wartości pomiędzy sąsiadami. Gdy brakuje miejsca - numeracja od nowa.
+    
+    Args:
+        old_positions: Stara wartość position dla każdej pozycji (None = nowa pozycja)
+    """
+    # Najdłuższy rosnący podciąg (O(n log n)) po pozycjach istniejących
+    tails, tails_idx, parent = [], [], {}
+    for idx, pos in enumerate(old_positions):
+        if pos is None:
+            continue
+        lo, hi = 0, len(tails)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if tails[mid] < pos:
+                lo = mid + 1
+            else:
+                hi = mid
+        parent[idx] = tails_idx[lo - 1] if lo > 0 else None
+        if lo == len(tails):
+            tails.append(pos)
+            tails_idx.append(idx)
+        else:
+            tails[lo] = pos
+            tails_idx[lo] = idx
+    
+    anchors = set()
+    idx = tails_idx[-1] if tails_idx else None
+    while idx is not None:
+        anchors.add(idx)
+        idx = parent[idx]
+    
+    # Wypełnij luki między zachowanymi pozycjami
+    new_positions: List[Optional[float]] = [old_positions[i] if i in anchors else None
+                                            for i in range(len(old_positions))]
+    i = 0
+    while i < len(new_positions):
+        if new_positions[i] is not None:
+            i += 1
+            continue
+        run_end = i
+        while run_end < len(new_positions) and new_positions[run_end] is None:
+            run_end += 1
+        count = run_end - i
+        lower = new_positions[i - 1] if i > 0 else None
+        upper = new_positions[run_end] if run_end < len(new_positions) else None
+        if lower is None and upper is None:
+            lower, upper = -1.0, float(count)
+        elif lower is None:
+            lower = upper - count - 1
+        elif upper is None:
+            upper = lower + count + 1
+        step = (upper - lower) / (count + 1)
+        if step < MIN_POSITION_GAP:
+            return [float(n) for n in range(len(old_positions))]
+        for offset in range(count):
+            new_positions[i + offset] = lower + step * (offset + 1)
+        i = run_end
+    return new_positions
+
+
+class Database:
+    # False - połączenia mogą przechodzić między wątkami (pula połączeń serwera API)
+    check_same_thread = True
+    
+    def __init__(self, db_path: str = "ofertomat.db", instrumentation=None,
+                 pragma_profile: str = 'default', pragmas: Optional[Dict] = None):
+        """
+        Args:
+            db_path: Ścieżka do pliku bazy SQLite
+            instrumentation: Opcjonalny DatabaseInstrumentation (db_instrumentation.py) -
+                             pomiar czasu metod i zapytań, log wolnych zapytań
+            pragma_profile: Nazwa profilu z PRAGMA_PROFILES
+            pragmas: Opcjonalne nadpisania pojedynczych ustawień profilu
+        """
+        self.db_path = db_path
+        self.instrumentation = instrumentation
+        self.pragmas = {**PRAGMA_PROFILES[pragma_profile], **(pragmas or {})}
+        if instrumentation is not None:
+            instrumentation.wrap_methods(self)
+        self.init_database()
+    
+    def get_connection(self):
+        """Tworzy połączenie z bazą danych i stosuje profil PRAGMA"""
+        timeout = self.pragmas.get('busy_timeout', 10000) / 1000
+        if self.instrumentation is not None:
+            conn = sqlite3.connect(self.db_path, timeout=timeout, check_same_thread=self.check_same_thread,
+                                   factory=self.instrumentation.connection_class)
+            self.instrumentation.attach(conn)
+        else:
+            conn = sqlite3.connect(self.db_path, timeout=timeout, check_same_thread=self.check_same_thread)
+        conn.row_factory = sqlite3.Row
         
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_offer_items_offer ON SavedOfferItems(offer_id)')
+        for pragma in ('synchronous', 'cache_size', 'mmap_size', 'temp_store', 'wal_autocheckpoint'):
+            if pragma in self.pragmas:
+                conn.execute(f'PRAGMA {pragma} = {self.pragmas[pragma]}')
         
-        # Migracja: dodaj kolumnę quantity jeśli nie istnieje
-        cursor.execute("PRAGMA table_info(SavedOfferItems)")
-        offer_items_columns = [row[1] for row in cursor.fetchall()]
-        if 'quantity' not in offer_items_columns:
-            cursor.execute("ALTER TABLE SavedOfferItems ADD COLUMN quantity REAL DEFAULT 1.0")
-            print("Dodano kolumnę 'quantity' do tabeli SavedOfferItems")
+        # Dodaj funkcję do obsługi polskich znaków w wyszukiwaniu
+        def polish_lower(text):
+            if text is None:
+                return ""
+            return text.lower()
         
-        # Dodaj domyślną kategorię jeśli baza jest pusta
-        cursor.execute('SELECT COUNT(*) as count FROM Categories')
-        if cursor.fetchone()['count'] == 0:
-            cursor.execute('INSERT INTO Categories (name, default_margin) VALUES (?, ?)', 
-                         ('Bez kategorii', 30.0))
+        conn.create_function("POLISH_LOWER", 1, polish_lower)
+        return conn
+    
+    def init_database(self):
+        """
+        Inicjalizuje bazę danych - wykonuje tylko brakujące migracje schematu
         
-        conn.commit()
-        conn.close()
+        Wersja schematu przechowywana jest w PRAGMA user_version, więc dla aktualnej
+        bazy start kończy się na jednym odczycie (plus ustawienie trybu dziennika). Każda migracja wykonywana jest
+        dokładnie raz, w osobnej transakcji.
+        """
+        conn = self.get_connection()
+        try:
+            # Tryb dziennika jest trwały - zmienia coś tylko przy pierwszym starcie z nowym profilem
+            if 'journal_mode' in self.pragmas:
+                conn.execute(f"PRAGMA journal_mode = {self.pragmas['journal_mode']}")
+            
+            if conn.execute('PRAGMA user_version').fetchone()[0] >= len(MIGRATIONS):
+                return
+            
+            conn.isolation_level = None  # Transakcje sterowane ręcznie
+            while True:
+                # BEGIN IMMEDIATE - równoległy start drugiej instancji poczeka na blokadę
+                conn.execute('BEGIN IMMEDIATE')
+                try:
+                    version = conn.execute('PRAGMA user_version').fetchone()[0]
+                    if version >= len(MIGRATIONS):
+                        conn.execute('COMMIT')
+                        break
+                    
+                    migration = MIGRATIONS[version]
+                    start = time.perf_counter()
+                    migration(conn.cursor())
+                    conn.execute(f'PRAGMA user_version = {version + 1}')
+                    conn.execute('COMMIT')
+                except Exception:
+                    conn.execute('ROLLBACK')
+                    raise
+                
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                print(f"Migracja schematu {version + 1} ({migration.__doc__}) wykonana w {elapsed_ms:.1f} ms")
+        finally:
+            conn.close()
+    
+    @staticmethod
+    def _bump_change_counter(cursor) -> None:
+        """Podbija licznik zmian katalogu - raz w każdej transakcji zapisującej Products lub Categories"""
+        cursor.execute('UPDATE ChangeCounter SET value = value + 1 WHERE id = 1')
+    
+    def get_change_counter(self) -> Optional[int]:
+        """Licznik zmian produktów i kategorii - rośnie przy każdym zapisie przez Database (także z innych procesów)"""
+        conn = None
+        try:
+            conn = self.get_connection()
+            row = conn.execute('SELECT value FROM ChangeCounter WHERE id = 1').fetchone()
+            return row['value'] if row else None
+        except sqlite3.Error as e:
+            print(f"Błąd odczytu licznika zmian: {e}")
+            return None
+        finally:
+            if conn:
+                conn.close()
     
     # === KATEGORIE ===
     
@@ -173,6 +678,7 @@ class Database:
             cursor = conn.cursor()
             cursor.execute('INSERT INTO Categories (name, default_margin) VALUES (?, ?)', 
                          (name, default_margin))
+            self._bump_change_counter(cursor)
             conn.commit()
             return cursor.lastrowid
         except sqlite3.IntegrityError:
@@ -199,6 +705,7 @@ class Database:
                 cursor = conn.cursor()
                 cursor.execute('UPDATE Categories SET name = ?, default_margin = ? WHERE id = ?', 
                              (name, default_margin, category_id))
+                self._bump_change_counter(cursor)
                 conn.commit()
                 return True
             except sqlite3.IntegrityError:
@@ -243,6 +750,7 @@ class Database:
             
             # Usuń kategorię
             cursor.execute('DELETE FROM Categories WHERE id = ?', (category_id,))
+            self._bump_change_counter(cursor)
             conn.commit()
             return True
         finally:
@@ -263,6 +771,7 @@ class Database:
                 INSERT INTO Products (code, name, unit, purchase_price_net, price_update_date, vat_rate, category_id)
                 VALUES (?, ?, ?, ?, ?, ?, ?)
             ''', (code, name, unit, purchase_price_net, now, vat_rate, category_id))
+            self._bump_change_counter(cursor)
             conn.commit()
             return cursor.lastrowid
         except sqlite3.IntegrityError:
@@ -307,6 +816,7 @@ class Database:
                     WHERE id = ?
                 ''', (code, name, unit, vat_rate, category_id, product_id))
             
+            self._bump_change_counter(cursor)
             conn.commit()
             return True
         except sqlite3.IntegrityError:
@@ -315,6 +825,43 @@ class Database:
             if conn:
                 conn.close()
     
+    def move_products_to_category(self, product_ids: List[int], category_id: Optional[int]) -> int:
+        """
+        Przenosi wiele produktów do kategorii jednym zapytaniem UPDATE
+        
+        Returns:
+            Liczba zaktualizowanych produktów (0 w przypadku błędu)
+        """
+        conn = None
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            self._fill_temp_ids(cursor, '_selected_products', product_ids)
+            cursor.execute('''
+                UPDATE Products SET category_id = ?
+                WHERE id IN (SELECT id FROM _selected_products)
+            ''', (category_id,))
+            updated = cursor.rowcount
+            self._bump_change_counter(cursor)
+            conn.commit()
+            return updated
+        except sqlite3.Error as e:
+            print(f"Błąd zmiany kategorii produktów: {e}")
+            if conn:
+                conn.rollback()
+            return 0
+        finally:
+            if conn:
+                conn.close()
+    
+    @staticmethod
+    def _fill_temp_ids(cursor, table_name: str, ids) -> None:
+        """Tworzy tabelę tymczasową z listą ID (na czas życia połączenia)"""
+        cursor.execute(f'CREATE TEMP TABLE IF NOT EXISTS {table_name} (id INTEGER PRIMARY KEY)')
+        cursor.execute(f'DELETE FROM {table_name}')
+        cursor.executemany(f'INSERT OR IGNORE INTO {table_name} (id) VALUES (?)',
+                           ((item_id,) for item_id in ids))
+    
     def delete_product(self, product_id: int) -> bool:
         """Usuwa produkt"""
         conn = None
@@ -322,6 +869,7 @@ class Database:
             conn = self.get_connection()
             cursor = conn.cursor()
             cursor.execute('DELETE FROM Products WHERE id = ?', (product_id,))
+            self._bump_change_counter(cursor)
             conn.commit()
             return True
         finally:
@@ -353,6 +901,30 @@ class Database:
         conn.close()
         return products
     
+    def iter_products(self, category_id: Optional[int] = None, batch_size: int = 5000) -> Iterator[Dict]:
+        """
+        Produkty strumieniowo w kolejności ID (eksport katalogu) - w pamięci jest
+        tylko bieżąca porcja batch_size wierszy
+        """
+        conn = self.get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT p.*, c.name as category_name, c.default_margin
+                FROM Products p
+                LEFT JOIN Categories c ON p.category_id = c.id
+                WHERE ? IS NULL OR p.category_id = ?
+                ORDER BY p.id
+            ''', (category_id, category_id))
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield dict(row)
+        finally:
+            conn.close()
+    
     def get_products_paginated(self, category_id: Optional[int] = None, 
                               search_query: str = "", page: int = 1, 
                               page_size: int = 50) -> Tuple[List[Dict], int]:
@@ -428,149 +1000,902 @@ class Database:
         conn.close()
         return products
     
-    def import_products_batch(self, products: List[Dict]) -> Tuple[int, int]:
+    def import_products_batch(self, products: List[Dict], keep_category: bool = False) -> Tuple[int, int]:
         """
-        Importuje wiele produktów naraz
+        Importuje wiele produktów naraz (jedna transakcja - porcja zapisuje się w całości albo wcale)
         Zwraca (liczba dodanych, liczba zaktualizowanych)
-        """
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        added = 0
-        updated = 0
-        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        
-        for product in products:
-            # Sprawdź czy produkt już istnieje
-            cursor.execute('SELECT id, purchase_price_net FROM Products WHERE code = ?', 
-                         (product['code'],))
-            existing = cursor.fetchone()
-            
-            if existing:
-                # Aktualizuj istniejący produkt
-                cursor.execute('''
-                    UPDATE Products 
-                    SET name = ?, unit = ?, purchase_price_net = ?, price_update_date = ?, 
-                        vat_rate = ?, category_id = ?
-                    WHERE id = ?
-                ''', (product['name'], product['unit'], product['purchase_price_net'], 
-                     now, product['vat_rate'], product.get('category_id'), existing['id']))
-                updated += 1
-            else:
-                # Dodaj nowy produkt
-                cursor.execute('''
-                    INSERT INTO Products (code, name, unit, purchase_price_net, price_update_date, vat_rate, category_id)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                ''', (product['code'], product['name'], product['unit'], product['purchase_price_net'],
-                     now, product['vat_rate'], product.get('category_id')))
-                added += 1
         
-        conn.commit()
-        conn.close()
-        return added, updated
-    
-    # === WIZYTÓWKA ===
-    
-    def get_business_card(self) -> Optional[Dict]:
-        """Pobiera wizytówkę użytkownika"""
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute('SELECT * FROM BusinessCard WHERE id = 1')
-            row = cursor.fetchone()
-            return dict(row) if row else None
-    
-    def save_business_card(self, company: str, full_name: str, phone: str, email: str) -> bool:
-        """Zapisuje lub aktualizuje wizytówkę użytkownika"""
-        try:
-            with self.get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute('''
-                    INSERT OR REPLACE INTO BusinessCard (id, company, full_name, phone, email)
-                    VALUES (1, ?, ?, ?, ?)
-                ''', (company, full_name, phone, email))
-                conn.commit()
-            return True
-        except Exception as e:
-            print(f"Błąd zapisywania wizytówki: {e}")
-            return False
-    
-    # === ZAPISANE OFERTY ===
-    
-    def save_offer(self, title: str, items: List[Dict], category_order: Dict) -> int:
-        """Zapisuje nową ofertę i zwraca jej ID"""
+        Args:
+            keep_category: Produkt bez category_id zachowuje dotychczasową kategorię
+                (nocny import cennika z CLI). Domyślnie - jak w GUI - import bez wybranej
+                kategorii przenosi istniejące produkty do "Bez kategorii".
+        """
+        category_sql = 'COALESCE(?, category_id)' if keep_category else '?'
         conn = None
         try:
             conn = self.get_connection()
             cursor = conn.cursor()
+            added = 0
+            updated = 0
             now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
             
-            # Zapisz ofertę
-            cursor.execute('''
-                INSERT INTO SavedOffers (title, created_date, modified_date, category_order)
-                VALUES (?, ?, ?, ?)
-            ''', (title, now, now, json.dumps(category_order)))
-            
-            offer_id = cursor.lastrowid
-            
-            # Zapisz pozycje oferty
-            for item in items:
-                cursor.execute('''
-                    INSERT INTO SavedOfferItems (offer_id, product_id, name, category_name, unit, 
-                                                purchase_price_net, vat_rate, margin, quantity)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (offer_id, item.get('product_id'), item['name'], item.get('category_name'),
-                     item.get('unit'), item.get('purchase_price_net'), item.get('vat_rate'),
-                     item.get('margin'), item.get('quantity', 1.0)))
+            for product in products:
+                # Sprawdź czy produkt już istnieje
+                cursor.execute('SELECT id, purchase_price_net FROM Products WHERE code = ?', 
+                             (product['code'],))
+                existing = cursor.fetchone()
+                
+                if existing:
+                    # Aktualizuj istniejący produkt
+                    cursor.execute(f'''
+                        UPDATE Products 
+                        SET name = ?, unit = ?, purchase_price_net = ?, price_update_date = ?, 
+                            vat_rate = ?, category_id = {category_sql}
+                        WHERE id = ?
+                    ''', (product['name'], product['unit'], product['purchase_price_net'], 
+                         now, product['vat_rate'], product.get('category_id'), existing['id']))
+                    updated += 1
+                else:
+                    # Dodaj nowy produkt
+                    cursor.execute('''
+                        INSERT INTO Products (code, name, unit, purchase_price_net, price_update_date, vat_rate, category_id)
+                        VALUES (?, ?, ?, ?, ?, ?, ?)
+                    ''', (product['code'], product['name'], product['unit'], product['purchase_price_net'],
+                         now, product['vat_rate'], product.get('category_id')))
+                    added += 1
             
+            self._bump_change_counter(cursor)
             conn.commit()
-            return offer_id
-        except Exception as e:
-            print(f"Błąd zapisywania oferty: {e}")
+            if len(products) >= CHECKPOINT_AFTER_ROWS:
+                self._passive_checkpoint(conn)
+            return added, updated
+        except Exception:
             if conn:
                 conn.rollback()
-            return 0
+            raise
         finally:
             if conn:
                 conn.close()
     
-    def update_offer(self, offer_id: int, title: str, items: List[Dict], category_order: Dict) -> bool:
-        """Aktualizuje istniejącą ofertę"""
-        conn = None
+    # === HISTORIA CEN ===
+    
+    def get_price_as_of(self, product_id: int, as_of: str) -> Optional[float]:
+        """
+        Cena zakupu netto produktu obowiązująca w danej chwili
+        
+        Args:
+            as_of: Data w formacie 'YYYY-MM-DD HH:MM:SS' (lub sam dzień 'YYYY-MM-DD' = jego początek)
+        
+        Returns:
+            Cena lub None gdy produkt nie miał jeszcze ceny
+        """
+        conn = self.get_connection()
         try:
-            conn = self.get_connection()
             cursor = conn.cursor()
-            now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            
-            # Aktualizuj ofertę
             cursor.execute('''
-                UPDATE SavedOffers 
-                SET title = ?, modified_date = ?, category_order = ?
+                SELECT purchase_price_net FROM PriceHistory
+                WHERE product_id = ? AND valid_from <= ?
+                ORDER BY valid_from DESC, id DESC
+                LIMIT 1
+            ''', (product_id, as_of))
+            row = cursor.fetchone()
+            return row['purchase_price_net'] if row else None
+        finally:
+            conn.close()
+    
+    def get_price_history(self, product_id: int) -> List[Dict]:
+        """Pełna historia cen produktu (od najstarszej)"""
+        conn = self.get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT purchase_price_net, valid_from FROM PriceHistory
+                WHERE product_id = ?
+                ORDER BY valid_from, id
+            ''', (product_id,))
+            return [dict(row) for row in cursor.fetchall()]
+        finally:
+            conn.close()
+    
+    def get_products_changed_since(self, since: str) -> List[Dict]:
+        """
+        Produkty, których cena zmieniła się po podanej dacie
+        
+        Returns:
+            Lista produktów (jak get_products) z dodatkowym kluczem price_before -
+            cena obowiązująca w chwili `since` (None dla produktów dodanych później)
+        """
+        conn = self.get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT p.*, c.name as category_name, c.default_margin,
+                       (SELECT h.purchase_price_net FROM PriceHistory h
+                        WHERE h.product_id = p.id AND h.valid_from <= ?
+                        ORDER BY h.valid_from DESC, h.id DESC
+                        LIMIT 1) as price_before
+                FROM Products p
+                LEFT JOIN Categories c ON p.category_id = c.id
+                WHERE p.id IN (SELECT product_id FROM PriceHistory WHERE valid_from > ?)
+                ORDER BY p.name
+            ''', (since, since))
+            return [dict(row) for row in cursor.fetchall()]
+        finally:
+            conn.close()
+    
+    # === SZKICE OFERT ===
+    
+    # Kolumny pozycji przepisywane między SavedOfferItems a DraftItems
+    _DRAFT_ITEM_COLUMNS = 'product_id, name, category_name, unit, purchase_price_net, vat_rate, margin, quantity, position'
+    
+    @staticmethod
+    def _touch_draft(cursor, draft_id: int) -> None:
+        """Aktualizuje datę modyfikacji szkicu i dopisuje nowe kategorie na koniec kolejności"""
+        cursor.execute('UPDATE DraftOffers SET modified_date = ? WHERE id = ?',
+                       (datetime.now().strftime('%Y-%m-%d %H:%M:%S'), draft_id))
+        cursor.execute('''
+            INSERT INTO DraftCategories (draft_id, category_name, sort_order)
+            SELECT ?, category_name,
+                   (SELECT COALESCE(MAX(sort_order), -1) FROM DraftCategories WHERE draft_id = ?)
+                   + ROW_NUMBER() OVER (ORDER BY MIN(position))
+            FROM DraftItems
+            WHERE draft_id = ?
+              AND category_name NOT IN (SELECT category_name FROM DraftCategories WHERE draft_id = ?)
+            GROUP BY category_name
+        ''', (draft_id, draft_id, draft_id, draft_id))
+    
+    def create_draft(self, title: str = "Oferta handlowa", source_offer_id: Optional[int] = None) -> int:
+        """
+        Tworzy szkic oferty (pusty lub do edycji zapisanej oferty)
+        
+        Szkic edycji nie kopiuje pozycji - zapisana oferta jest jego punktem wyjścia, a zmiany
+        trafiają do dziennika. Pozycje oferty kopiowane są do DraftItems dopiero przy
+        pierwszym scalaniu dziennika (compact_draft_journal).
+        
+        Returns:
+            ID szkicu lub 0 w przypadku błędu
+        """
+        conn = None
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            
+            if source_offer_id is not None:
+                cursor.execute('SELECT 1 FROM SavedOffers WHERE id = ?', (source_offer_id,))
+                if not cursor.fetchone():
+                    return 0
+            
+            cursor.execute('''
+                INSERT INTO DraftOffers (title, source_offer_id, created_date, modified_date, baseline_pending)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (title, source_offer_id, now, now, int(source_offer_id is not None)))
+            draft_id = cursor.lastrowid
+            conn.commit()
+            return draft_id
+        except sqlite3.Error as e:
+            print(f"Błąd tworzenia szkicu oferty: {e}")
+            if conn:
+                conn.rollback()
+            return 0
+        finally:
+            if conn:
+                conn.close()
+    
+    def _load_draft_baseline(self, cursor, draft_id: int) -> None:
+        """Kopiuje pozycje i kolejność kategorii oferty źródłowej do szkicu (jeśli jeszcze nie skopiowane)"""
+        cursor.execute('''
+            SELECT d.source_offer_id, o.category_order
+            FROM DraftOffers d
+            LEFT JOIN SavedOffers o ON o.id = d.source_offer_id
+            WHERE d.id = ? AND d.baseline_pending = 1
+        ''', (draft_id,))
+        row = cursor.fetchone()
+        if not row:
+            return
+        
+        category_order = json.loads(row['category_order']) if row['category_order'] else {}
+        cursor.executemany(
+            'INSERT OR IGNORE INTO DraftCategories (draft_id, category_name, sort_order) VALUES (?, ?, ?)',
+            ((draft_id, cat_name, sort_order) for cat_name, sort_order in category_order.items())
+        )
+        cursor.execute(f'''
+            INSERT INTO DraftItems (draft_id, offer_item_id, {self._DRAFT_ITEM_COLUMNS})
+            SELECT ?, id, product_id, name, COALESCE(category_name, 'Bez kategorii'), unit,
+                   purchase_price_net, vat_rate, margin, quantity, COALESCE(position, id)
+            FROM SavedOfferItems WHERE offer_id = ?
+        ''', (draft_id, row['source_offer_id']))
+        cursor.execute('UPDATE DraftOffers SET baseline_pending = 0 WHERE id = ?', (draft_id,))
+        self._touch_draft(cursor, draft_id)
+    
+    def get_drafts(self) -> List[Dict]:
+        """Lista szkiców (najnowsze pierwsze) z liczbą pozycji"""
+        conn = self.get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT d.*,
+                       CASE WHEN d.baseline_pending
+                            THEN (SELECT COUNT(*) FROM SavedOfferItems s WHERE s.offer_id = d.source_offer_id)
+                            ELSE (SELECT COUNT(*) FROM DraftItems i WHERE i.draft_id = d.id)
+                       END as items_count
+                FROM DraftOffers d
+                ORDER BY d.modified_date DESC, d.id DESC
+            ''')
+            return [dict(row) for row in cursor.fetchall()]
+        finally:
+            conn.close()
+    
+    # Operacje zbiorowe wprost na DraftItems (jedno zapytanie zamiast pętli w Pythonie).
+    # Dziennik szkicu musi być wcześniej scalony (DraftAutosave.sync) - inaczej operacje
+    # oczekujące w dzienniku zostałyby później odtworzone w złej kolejności.
+    
+    def _add_to_draft(self, draft_id: int, source_sql: str, params: tuple, error_label: str,
+                      product_ids: Optional[List[int]] = None) -> int:
+        """Dopisuje produkty wybrane zapytaniem source_sql (aliasy p, c) na koniec szkicu"""
+        conn = None
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            self._load_draft_baseline(cursor, draft_id)
+            if product_ids is not None:
+                self._fill_temp_ids(cursor, '_draft_products', product_ids)
+            cursor.execute(f'''
+                INSERT INTO DraftItems (draft_id, {self._DRAFT_ITEM_COLUMNS})
+                SELECT ?, p.id, p.name, COALESCE(c.name, 'Bez kategorii'), p.unit, p.purchase_price_net,
+                       p.vat_rate, COALESCE(c.default_margin, 30.0), 1.0,
+                       (SELECT COALESCE(MAX(position), -1) FROM DraftItems WHERE draft_id = ?)
+                       + ROW_NUMBER() OVER (ORDER BY p.name, p.code)
+                {source_sql}
+                  AND NOT EXISTS (SELECT 1 FROM DraftItems i WHERE i.draft_id = ? AND i.product_id = p.id)
+            ''', (draft_id, draft_id, *params, draft_id))
+            added = cursor.rowcount
+            self._touch_draft(cursor, draft_id)
+            conn.commit()
+            return added
+        except sqlite3.Error as e:
+            print(f"Błąd {error_label}: {e}")
+            if conn:
+                conn.rollback()
+            return 0
+        finally:
+            if conn:
+                conn.close()
+    
+    def add_products_to_draft(self, draft_id: int, product_ids: List[int]) -> int:
+        """Dodaje produkty do szkicu (pomija już obecne); zwraca liczbę dodanych"""
+        return self._add_to_draft(draft_id, '''
+            FROM Products p
+            LEFT JOIN Categories c ON p.category_id = c.id
+            WHERE p.id IN (SELECT id FROM _draft_products)
+        ''', (), "dodawania produktów do szkicu", product_ids=product_ids)
+    
+    def add_category_to_draft(self, draft_id: int, category_id: Optional[int]) -> int:
+        """Dodaje wszystkie produkty kategorii do szkicu jednym INSERT ... SELECT; zwraca liczbę dodanych"""
+        return self._add_to_draft(draft_id, '''
+            FROM Products p
+            LEFT JOIN Categories c ON p.category_id = c.id
+            WHERE p.category_id IS ?
+        ''', (category_id,), "dodawania kategorii do szkicu")
+    
+    def remove_draft_items(self, draft_id: int, item_ids: List[int]) -> int:
+        """Usuwa pozycje szkicu; zwraca liczbę usuniętych"""
+        conn = None
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            self._load_draft_baseline(cursor, draft_id)
+            self._fill_temp_ids(cursor, '_draft_items', item_ids)
+            cursor.execute('''
+                DELETE FROM DraftItems
+                WHERE draft_id = ? AND id IN (SELECT id FROM _draft_items)
+            ''', (draft_id,))
+            removed = cursor.rowcount
+            self._touch_draft(cursor, draft_id)
+            conn.commit()
+            return removed
+        except sqlite3.Error as e:
+            print(f"Błąd usuwania pozycji szkicu: {e}")
+            if conn:
+                conn.rollback()
+            return 0
+        finally:
+            if conn:
+                conn.close()
+    
+    def update_draft_items(self, draft_id: int, item_ids: List[int], margin: Optional[float] = None,
+                           category_name: Optional[str] = None) -> int:
+        """Zmienia marżę i/lub kategorię wielu pozycji szkicu jednym UPDATE; zwraca liczbę zmienionych"""
+        assignments, params = [], []
+        if margin is not None:
+            assignments.append('margin = ?')
+            params.append(margin)
+        if category_name is not None:
+            assignments.append('category_name = ?')
+            params.append(category_name)
+        if not assignments:
+            return 0
+        
+        conn = None
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            self._load_draft_baseline(cursor, draft_id)
+            self._fill_temp_ids(cursor, '_draft_items', item_ids)
+            cursor.execute(f'''
+                UPDATE DraftItems SET {', '.join(assignments)}
+                WHERE draft_id = ? AND id IN (SELECT id FROM _draft_items)
+            ''', (*params, draft_id))
+            updated = cursor.rowcount
+            self._touch_draft(cursor, draft_id)
+            conn.commit()
+            return updated
+        except sqlite3.Error as e:
+            print(f"Błąd aktualizacji pozycji szkicu: {e}")
+            if conn:
+                conn.rollback()
+            return 0
+        finally:
+            if conn:
+                conn.close()
+    
+    def set_draft_category_order(self, draft_id: int, categories: List[str]) -> bool:
+        """Ustawia kolejność kategorii szkicu (kategorie spoza listy trafiają na koniec)"""
+        conn = None
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            self._load_draft_baseline(cursor, draft_id)
+            cursor.execute('DELETE FROM DraftCategories WHERE draft_id = ?', (draft_id,))
+            cursor.executemany(
+                'INSERT OR IGNORE INTO DraftCategories (draft_id, category_name, sort_order) VALUES (?, ?, ?)',
+                ((draft_id, cat_name, sort_order) for sort_order, cat_name in enumerate(categories))
+            )
+            self._touch_draft(cursor, draft_id)
+            conn.commit()
+            return True
+        except sqlite3.Error as e:
+            print(f"Błąd zmiany kolejności kategorii szkicu: {e}")
+            if conn:
+                conn.rollback()
+            return False
+        finally:
+            if conn:
+                conn.close()
+    
+    def get_draft_categories(self, draft_id: int) -> List[Dict]:
+        """
+        Kategorie szkicu w ustalonej kolejności z liczbą pozycji i wartością netto
+        
+        Returns:
+            Lista słowników: category_name, sort_order, items_count, total_net
+        """
+        conn = self.get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT c.category_name, c.sort_order,
+                       COUNT(i.id) as items_count,
+                       ROUND(COALESCE(SUM(ROUND(i.purchase_price_net * (1 + COALESCE(i.margin, 30.0) / 100)
+                                                * COALESCE(i.quantity, 1.0), 2)), 0), 2) as total_net
+                FROM DraftCategories c
+                LEFT JOIN DraftItems i ON i.draft_id = c.draft_id AND i.category_name = c.category_name
+                WHERE c.draft_id = ?
+                GROUP BY c.category_name
+                ORDER BY c.sort_order
+            ''', (draft_id,))
+            return [dict(row) for row in cursor.fetchall()]
+        finally:
+            conn.close()
+    
+    def get_draft_items(self, draft_id: int, category_name: str, offset: int = 0,
+                        limit: int = 200) -> List[Dict]:
+        """Okno pozycji jednej kategorii szkicu (w kolejności position) - do wyświetlania"""
+        conn = self.get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT * FROM DraftItems
+                WHERE draft_id = ? AND category_name = ?
+                ORDER BY position
+                LIMIT ? OFFSET ?
+            ''', (draft_id, category_name, limit, offset))
+            return [dict(row) for row in cursor.fetchall()]
+        finally:
+            conn.close()
+    
+    def save_draft(self, draft_id: int, title: Optional[str] = None) -> int:
+        """
+        Zapisuje szkic jako ofertę
+        
+        Szkic utworzony z zapisanej oferty aktualizuje ją różnicowo (usuwa, zmienia i dopisuje
+        tylko potrzebne wiersze), pozostałe tworzą nową ofertę. Wszystko po stronie bazy.
+        
+        Returns:
+            ID zapisanej oferty lub 0 w przypadku błędu
+        """
+        # Operacje z dziennika (i kopia oferty źródłowej) muszą być w DraftItems
+        self.compact_draft_journal(draft_id)
+        conn = None
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            
+            cursor.execute('SELECT * FROM DraftOffers WHERE id = ?', (draft_id,))
+            draft = cursor.fetchone()
+            if not draft:
+                return 0
+            title = title or draft['title']
+            cursor.execute('''
+                SELECT category_name, sort_order FROM DraftCategories
+                WHERE draft_id = ? ORDER BY sort_order
+            ''', (draft_id,))
+            category_order = json.dumps({row['category_name']: idx for idx, row in enumerate(cursor.fetchall())})
+            
+            offer_id = draft['source_offer_id']
+            if offer_id is not None:
+                cursor.execute('''
+                    UPDATE SavedOffers SET title = ?, modified_date = ?, category_order = ?
+                    WHERE id = ?
+                ''', (title, now, category_order, offer_id))
+                if cursor.rowcount == 0:
+                    offer_id = None
+            
+            if offer_id is None:
+                cursor.execute('''
+                    INSERT INTO SavedOffers (title, created_date, modified_date, category_order)
+                    VALUES (?, ?, ?, ?)
+                ''', (title, now, now, category_order))
+                offer_id = cursor.lastrowid
+            else:
+                # Wiersze oferty, których nie ma już w szkicu
+                cursor.execute('''
+                    DELETE FROM SavedOfferItems
+                    WHERE offer_id = ?
+                      AND id NOT IN (SELECT offer_item_id FROM DraftItems
+                                     WHERE draft_id = ? AND offer_item_id IS NOT NULL)
+                ''', (offer_id, draft_id))
+                # Wiersze zmienione w szkicu
+                columns = [col.strip() for col in self._DRAFT_ITEM_COLUMNS.split(',')]
+                cursor.execute(f'''
+                    UPDATE SavedOfferItems
+                    SET ({', '.join(columns)}) = (
+                        SELECT {', '.join('d.' + col for col in columns)}
+                        FROM DraftItems d
+                        WHERE d.draft_id = ? AND d.offer_item_id = SavedOfferItems.id
+                    )
+                    WHERE offer_id = ?
+                      AND id IN (
+                        SELECT d.offer_item_id FROM DraftItems d
+                        JOIN SavedOfferItems s ON s.id = d.offer_item_id
+                        WHERE d.draft_id = ?
+                          AND ({' OR '.join(f'd.{col} IS NOT s.{col}' for col in columns)})
+                      )
+                ''', (draft_id, offer_id, draft_id))
+            
+            # Pozycje dodane w szkicu
+            cursor.execute(f'''
+                INSERT INTO SavedOfferItems (offer_id, {self._DRAFT_ITEM_COLUMNS})
+                SELECT ?, {self._DRAFT_ITEM_COLUMNS}
+                FROM DraftItems
+                WHERE draft_id = ? AND offer_item_id IS NULL
+                ORDER BY position
+            ''', (offer_id, draft_id))
+            
+            _refresh_offer_totals(cursor, offer_id)
+            
+            # Szkic jest zapisany - usuwamy go
+            cursor.execute('DELETE FROM DraftJournal WHERE draft_id = ?', (draft_id,))
+            cursor.execute('DELETE FROM DraftItems WHERE draft_id = ?', (draft_id,))
+            cursor.execute('DELETE FROM DraftCategories WHERE draft_id = ?', (draft_id,))
+            cursor.execute('DELETE FROM DraftOffers WHERE id = ?', (draft_id,))
+            
+            conn.commit()
+            return offer_id
+        except sqlite3.Error as e:
+            print(f"Błąd zapisywania szkicu oferty: {e}")
+            if conn:
+                conn.rollback()
+            return 0
+        finally:
+            if conn:
+                conn.close()
+    
+    def delete_draft(self, draft_id: int) -> bool:
+        """Usuwa szkic wraz z pozycjami"""
+        conn = None
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            cursor.execute('DELETE FROM DraftJournal WHERE draft_id = ?', (draft_id,))
+            cursor.execute('DELETE FROM DraftItems WHERE draft_id = ?', (draft_id,))
+            cursor.execute('DELETE FROM DraftCategories WHERE draft_id = ?', (draft_id,))
+            cursor.execute('DELETE FROM DraftOffers WHERE id = ?', (draft_id,))
+            conn.commit()
+            return True
+        except sqlite3.Error as e:
+            print(f"Błąd usuwania szkicu oferty: {e}")
+            if conn:
+                conn.rollback()
+            return False
+        finally:
+            if conn:
+                conn.close()
+    
+    # === DZIENNIK AUTOZAPISU SZKICÓW ===
+    
+    # Pola pozycji zmieniane operacją 'update' (offer_draft.EDITABLE_FIELDS)
+    _DRAFT_EDITABLE_FIELDS = ('name', 'category_name', 'unit', 'purchase_price_net', 'vat_rate', 'margin', 'quantity')
+    
+    def append_draft_journal(self, draft_id: int, operations: List[Dict]) -> bool:
+        """Dopisuje operacje (offer_draft.OfferDraft) do dziennika szkicu jedną transakcją"""
+        conn = None
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            cursor.executemany(
+                'INSERT INTO DraftJournal (draft_id, operation, created_date) VALUES (?, ?, ?)',
+                ((draft_id, json.dumps(op, ensure_ascii=False), now) for op in operations)
+            )
+            cursor.execute('''
+                UPDATE DraftOffers SET changes = changes + ?, modified_date = ?
+                WHERE id = ?
+            ''', (len(operations), now, draft_id))
+            conn.commit()
+            return True
+        except sqlite3.Error as e:
+            print(f"Błąd autozapisu szkicu: {e}")
+            if conn:
+                conn.rollback()
+            return False
+        finally:
+            if conn:
+                conn.close()
+    
+    @staticmethod
+    def _draft_key_filter(key) -> Tuple[str, tuple]:
+        """Warunek WHERE wybierający pozycję szkicu po kluczu offer_draft.item_key"""
+        if isinstance(key, str) and key.startswith('n:'):
+            return 'product_id IS NULL AND name = ?', (key[2:],)
+        return 'product_id = ?', (key,)
+    
+    def _apply_draft_operation(self, cursor, draft_id: int, op: Dict) -> None:
+        """Odtwarza jedną operację dziennika na migawce szkicu (DraftItems/DraftCategories)"""
+        kind = op['op']
+        if kind == 'add' and op.get('stored'):
+            # Pozycje zapisane od razu w DraftItems (add_category_to_draft) - dziennik tylko je odnotowuje
+            return
+        if kind == 'add':
+            cursor.execute('SELECT COALESCE(MAX(position), -1) as last FROM DraftItems WHERE draft_id = ?', (draft_id,))
+            last_position = cursor.fetchone()['last']
+            if 'before' in op:
+                # Ponowne wstawienie (cofnięcie usunięcia): każda pozycja tuż przed wskazaną
+                for item, before in zip(op['items'], op['before']):
+                    row = None
+                    if before is not None:
+                        key_sql, key_params = self._draft_key_filter(before)
+                        cursor.execute(f'''
+                            SELECT position,
+                                   (SELECT MAX(position) FROM DraftItems
+                                    WHERE draft_id = ? AND position < b.position) as previous
+                            FROM DraftItems b WHERE draft_id = ? AND {key_sql}
+                        ''', (draft_id, draft_id, *key_params))
+                        row = cursor.fetchone()
+                    if row is None:
+                        last_position += 1
+                        position = last_position
+                    else:
+                        previous = row['previous'] if row['previous'] is not None else row['position'] - 1
+                        position = (previous + row['position']) / 2
+                    self._insert_draft_items(cursor, draft_id, [item], position)
+            else:
+                self._insert_draft_items(cursor, draft_id, op['items'], last_position + 1)
+        elif kind == 'remove':
+            for key in op['keys']:
+                key_sql, key_params = self._draft_key_filter(key)
+                cursor.execute(f'DELETE FROM DraftItems WHERE draft_id = ? AND {key_sql}',
+                               (draft_id, *key_params))
+        elif kind == 'update':
+            fields = {field: value for field, value in op['fields'].items() if field in self._DRAFT_EDITABLE_FIELDS}
+            if not fields:
+                return
+            set_sql = ', '.join(f'{field} = ?' for field in fields)
+            for key in op['keys']:
+                key_sql, key_params = self._draft_key_filter(key)
+                cursor.execute(f'UPDATE DraftItems SET {set_sql} WHERE draft_id = ? AND {key_sql}',
+                               (*fields.values(), draft_id, *key_params))
+        elif kind == 'swap':
+            positions = []
+            for key in op['keys']:
+                key_sql, key_params = self._draft_key_filter(key)
+                cursor.execute(f'SELECT id, position FROM DraftItems WHERE draft_id = ? AND {key_sql}',
+                               (draft_id, *key_params))
+                positions.append(cursor.fetchone())
+            if all(positions):
+                first, second = positions
+                cursor.executemany('UPDATE DraftItems SET position = ? WHERE id = ?',
+                                   ((second['position'], first['id']), (first['position'], second['id'])))
+        elif kind == 'category_order':
+            cursor.execute('DELETE FROM DraftCategories WHERE draft_id = ?', (draft_id,))
+            cursor.executemany(
+                'INSERT OR IGNORE INTO DraftCategories (draft_id, category_name, sort_order) VALUES (?, ?, ?)',
+                ((draft_id, cat_name, sort_order) for sort_order, cat_name in enumerate(op['categories']))
+            )
+        elif kind == 'clear':
+            cursor.execute('DELETE FROM DraftItems WHERE draft_id = ?', (draft_id,))
+            cursor.execute('DELETE FROM DraftCategories WHERE draft_id = ?', (draft_id,))
+        elif kind == 'title':
+            cursor.execute('UPDATE DraftOffers SET title = ? WHERE id = ?', (op['title'], draft_id))
+        else:
+            raise ValueError(f"Nieznana operacja dziennika: {kind}")
+        
+        if kind in ('add', 'update'):
+            self._touch_draft(cursor, draft_id)
+    
+    def _insert_draft_items(self, cursor, draft_id: int, items: List[Dict], first_position: float) -> None:
+        """Wstawia pozycje operacji 'add' na kolejne pozycje od first_position"""
+        cursor.executemany(f'''
+            INSERT INTO DraftItems (draft_id, offer_item_id, {self._DRAFT_ITEM_COLUMNS})
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', ((draft_id, item.get('offer_item_id'), item.get('id'), item['name'],
+               item.get('category_name') or 'Bez kategorii', item.get('unit'),
+               item.get('purchase_price_net'), item.get('vat_rate'), item.get('margin'),
+               item.get('quantity') or 1.0, first_position + offset)
+              for offset, item in enumerate(items)))
+    
+    def compact_draft_journal(self, draft_id: int) -> int:
+        """
+        Scala dziennik szkicu z migawką: odtwarza operacje na DraftItems i usuwa je z dziennika
+        
+        Szkic edycji oferty najpierw dostaje kopię jej pozycji (_load_draft_baseline) -
+        operacje dziennika odnoszą się do zapisanej oferty.
+        
+        Returns:
+            Liczba scalonych operacji
+        """
+        conn = None
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            self._load_draft_baseline(cursor, draft_id)
+            cursor.execute('''
+                SELECT id, operation FROM DraftJournal
+                WHERE draft_id = ? ORDER BY id
+            ''', (draft_id,))
+            entries = cursor.fetchall()
+            if not entries:
+                conn.commit()
+                return 0
+            
+            for entry in entries:
+                self._apply_draft_operation(cursor, draft_id, json.loads(entry['operation']))
+            cursor.execute('DELETE FROM DraftJournal WHERE draft_id = ? AND id <= ?',
+                           (draft_id, entries[-1]['id']))
+            conn.commit()
+            return len(entries)
+        except (sqlite3.Error, ValueError, KeyError) as e:
+            print(f"Błąd scalania dziennika szkicu: {e}")
+            if conn:
+                conn.rollback()
+            return 0
+        finally:
+            if conn:
+                conn.close()
+    
+    def get_draft_snapshot(self, draft_id: int) -> Optional[Dict]:
+        """
+        Pełny stan szkicu (bez operacji oczekujących w dzienniku - patrz compact_draft_journal)
+        
+        Returns:
+            dict z kluczami title, source_offer_id, changes, categories (w kolejności),
+            items (w kolejności position) lub None gdy szkic nie istnieje
+        """
+        conn = self.get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute('SELECT * FROM DraftOffers WHERE id = ?', (draft_id,))
+            draft_row = cursor.fetchone()
+            if not draft_row:
+                return None
+            snapshot = dict(draft_row)
+            
+            cursor.execute('''
+                SELECT category_name, sort_order FROM DraftCategories
+                WHERE draft_id = ? ORDER BY sort_order
+            ''', (draft_id,))
+            snapshot['categories'] = [dict(row) for row in cursor.fetchall()]
+            
+            cursor.execute(f'''
+                SELECT offer_item_id, {self._DRAFT_ITEM_COLUMNS} FROM DraftItems
+                WHERE draft_id = ? ORDER BY position, id
+            ''', (draft_id,))
+            snapshot['items'] = [dict(row) for row in cursor.fetchall()]
+            return snapshot
+        finally:
+            conn.close()
+    
+    # === WIZYTÓWKA ===
+    
+    def get_business_card(self) -> Optional[Dict]:
+        """Pobiera wizytówkę użytkownika"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT * FROM BusinessCard WHERE id = 1')
+            row = cursor.fetchone()
+            return dict(row) if row else None
+    
+    def save_business_card(self, company: str, full_name: str, phone: str, email: str) -> bool:
+        """Zapisuje lub aktualizuje wizytówkę użytkownika"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    INSERT OR REPLACE INTO BusinessCard (id, company, full_name, phone, email)
+                    VALUES (1, ?, ?, ?, ?)
+                ''', (company, full_name, phone, email))
+                conn.commit()
+            return True
+        except Exception as e:
+            print(f"Błąd zapisywania wizytówki: {e}")
+            return False
+    
+    # === ZAPISANE OFERTY ===
+    
+    def save_offer(self, title: str, items: List[Dict], category_order: Dict,
+                   progress_callback=None) -> int:
+        """
+        Zapisuje nową ofertę i zwraca jej ID
+        
+        Pozycje zapisywane są porcjami przez executemany w jednej transakcji -
+        niekompletna oferta nigdy nie jest widoczna dla innych połączeń.
+        
+        Args:
+            progress_callback: Opcjonalna funkcja callback(current, total) wywoływana po każdej porcji
+        """
+        conn = None
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            
+            # Zapisz ofertę
+            cursor.execute('''
+                INSERT INTO SavedOffers (title, created_date, modified_date, category_order)
+                VALUES (?, ?, ?, ?)
+            ''', (title, now, now, json.dumps(category_order)))
+            
+            offer_id = cursor.lastrowid
+            
+            # Zapisz pozycje oferty
+            rows = ((offer_id, *_offer_item_values(item), float(position))
+                    for position, item in enumerate(items))
+            saved = 0
+            for chunk in _chunked(rows, BULK_WRITE_CHUNK_ROWS):
+                cursor.executemany('''
+                    INSERT INTO SavedOfferItems (offer_id, product_id, name, category_name, unit, 
+                                                purchase_price_net, vat_rate, margin, quantity, position)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', chunk)
+                saved += len(chunk)
+                if progress_callback:
+                    progress_callback(saved, len(items))
+            
+            _refresh_offer_totals(cursor, offer_id)
+            conn.commit()
+            if len(items) >= CHECKPOINT_AFTER_ROWS:
+                self._passive_checkpoint(conn)
+            return offer_id
+        except Exception as e:
+            print(f"Błąd zapisywania oferty: {e}")
+            if conn:
+                conn.rollback()
+            return 0
+        finally:
+            if conn:
+                conn.close()
+    
+    def update_offer(self, offer_id: int, title: str, items: List[Dict],
+                     category_order: Dict) -> Optional[Dict[int, int]]:
+        """
+        Aktualizuje istniejącą ofertę zapisując tylko różnice względem bazy
+        
+        Pozycje identyfikowane są kluczem 'offer_item_id' (zwracanym przez get_offer_by_id).
+        Pozycje bez tego klucza są dopisywane, brakujące - usuwane, a zmienione lub
+        przesunięte - aktualizowane. Niezmienione wiersze nie są ruszane.
+        
+        Returns:
+            {indeks pozycji w items: offer_item_id} dla dopisanych pozycji (pusty, gdy nic
+            nie dopisano) lub None w przypadku błędu. Wywołujący zapisuje te ID w pozycjach,
+            żeby kolejny zapis ich nie usuwał i nie dopisywał od nowa.
+        """
+        conn = None
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            
+            # Aktualizuj ofertę
+            cursor.execute('''
+                UPDATE SavedOffers 
+                SET title = ?, modified_date = ?, category_order = ?
                 WHERE id = ?
             ''', (title, now, json.dumps(category_order), offer_id))
             
-            # Usuń stare pozycje
-            cursor.execute('DELETE FROM SavedOfferItems WHERE offer_id = ?', (offer_id,))
+            # Stan zapisany w bazie
+            cursor.execute(f'''
+                SELECT id, position, {', '.join(OFFER_ITEM_COLUMNS)}
+                FROM SavedOfferItems WHERE offer_id = ?
+            ''', (offer_id,))
+            stored = {row['id']: row for row in cursor.fetchall()}
             
-            # Dodaj nowe pozycje
+            # Dopasuj pozycje do zapisanych wierszy
+            matched_rows = []
             for item in items:
-                cursor.execute('''
+                row = stored.pop(item.get('offer_item_id'), None)
+                matched_rows.append(row)
+            positions = _plan_item_positions([row['position'] if row else None for row in matched_rows])
+            
+            inserts, updates, inserted_positions = [], [], {}
+            for index, (item, row, position) in enumerate(zip(items, matched_rows, positions)):
+                values = _offer_item_values(item)
+                if row is None:
+                    inserts.append((offer_id, *values, position))
+                    inserted_positions[position] = index
+                elif tuple(row[col] for col in OFFER_ITEM_COLUMNS) != values or row['position'] != position:
+                    updates.append((*values, position, row['id']))
+            
+            # Wiersze, które nie zostały dopasowane, zniknęły z oferty
+            if stored:
+                cursor.executemany('DELETE FROM SavedOfferItems WHERE id = ?',
+                                   ((item_id,) for item_id in stored))
+            if updates:
+                cursor.executemany(f'''
+                    UPDATE SavedOfferItems
+                    SET {', '.join(f'{col} = ?' for col in OFFER_ITEM_COLUMNS)}, position = ?
+                    WHERE id = ?
+                ''', updates)
+            if inserts:
+                cursor.executemany('''
                     INSERT INTO SavedOfferItems (offer_id, product_id, name, category_name, unit,
-                                                purchase_price_net, vat_rate, margin, quantity)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (offer_id, item.get('product_id'), item['name'], item.get('category_name'),
-                     item.get('unit'), item.get('purchase_price_net'), item.get('vat_rate'),
-                     item.get('margin'), item.get('quantity', 1.0)))
+                                                purchase_price_net, vat_rate, margin, quantity, position)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', inserts)
+                # Wartości position w ofercie są unikalne - po nich odczytujemy ID dopisanych wierszy
+                cursor.execute('SELECT id, position FROM SavedOfferItems WHERE offer_id = ?', (offer_id,))
+                inserted_ids = {inserted_positions[row['position']]: row['id'] for row in cursor.fetchall()
+                                if row['position'] in inserted_positions}
+            else:
+                inserted_ids = {}
+            
+            if stored or updates or inserts:
+                _refresh_offer_totals(cursor, offer_id)
             
             conn.commit()
-            return True
+            return inserted_ids
         except Exception as e:
             print(f"Błąd aktualizacji oferty: {e}")
             if conn:
                 conn.rollback()
-            return False
+            return None
         finally:
             if conn:
                 conn.close()
     
+    def get_offer_item_ids(self, offer_id: int) -> List[int]:
+        """ID pozycji oferty (offer_item_id) w kolejności pozycji - np. po save_offer nowej oferty"""
+        conn = self.get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT id FROM SavedOfferItems
+                WHERE offer_id = ? ORDER BY position, id
+            ''', (offer_id,))
+            return [row['id'] for row in cursor.fetchall()]
+        finally:
+            conn.close()
+    
     def get_saved_offers(self) -> List[Dict]:
         """Pobiera listę wszystkich zapisanych ofert"""
         with self.get_connection() as conn:
@@ -578,6 +1903,84 @@ class Database:
             cursor.execute('SELECT * FROM SavedOffers ORDER BY modified_date DESC')
             return [dict(row) for row in cursor.fetchall()]
     
+    def list_offers(self, page: int = 1, page_size: int = 50, search: str = "",
+                    sort: str = 'modified') -> Tuple[List[Dict], int]:
+        """Pobiera stronę zapisanych ofert z liczbą pozycji i wartością netto/brutto
+        
+        Sumy czytane są ze zmaterializowanych kolumn SavedOffers (utrzymywanych przy zapisie).
+        
+        Args:
+            sort: Klucz z OFFER_SORT_ORDERS ('modified', 'created', 'title')
+        
+        Returns: (lista ofert z kluczami items_count, total_net, total_vat, total_gross, całkowita liczba ofert)
+        """
+        order_sql = OFFER_SORT_ORDERS.get(sort, OFFER_SORT_ORDERS['modified'])
+        where_sql = '1=1'
+        params = []
+        if search:
+            where_sql = 'POLISH_LOWER(o.title) LIKE POLISH_LOWER(?)'
+            params.append(f'%{search}%')
+        
+        conn = self.get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(f'SELECT COUNT(*) as total FROM SavedOffers o WHERE {where_sql}', params)
+            total = cursor.fetchone()['total']
+            
+            cursor.execute(f'''
+                SELECT o.id, o.title, o.created_date, o.modified_date,
+                       o.items_count, o.total_net, o.total_vat, o.total_gross
+                FROM SavedOffers o
+                WHERE {where_sql}
+                ORDER BY {order_sql}
+                LIMIT ? OFFSET ?
+            ''', params + [page_size, (page - 1) * page_size])
+            offers = [dict(row) for row in cursor.fetchall()]
+        finally:
+            conn.close()
+        
+        return offers, total
+    
+    def get_offer_totals(self, offer_id: int) -> Optional[Dict]:
+        """
+        Pobiera zmaterializowane sumy oferty
+        
+        Returns:
+            dict z kluczami items_count, total_net, total_vat, total_gross oraz
+            by_category (sumy per kategoria i stawka VAT) i by_vat (sumy per stawka VAT)
+            lub None gdy oferta nie istnieje
+        """
+        conn = self.get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT items_count, total_net, total_vat, total_gross
+                FROM SavedOffers WHERE id = ?
+            ''', (offer_id,))
+            row = cursor.fetchone()
+            if not row:
+                return None
+            totals = dict(row)
+            
+            cursor.execute('''
+                SELECT category_name, vat_rate, items_count, total_net, total_vat, total_gross
+                FROM SavedOfferTotals WHERE offer_id = ?
+                ORDER BY category_name, vat_rate
+            ''', (offer_id,))
+            totals['by_category'] = [dict(row) for row in cursor.fetchall()]
+            
+            cursor.execute('''
+                SELECT vat_rate, SUM(items_count) as items_count, ROUND(SUM(total_net), 2) as total_net,
+                       ROUND(SUM(total_vat), 2) as total_vat, ROUND(SUM(total_gross), 2) as total_gross
+                FROM SavedOfferTotals WHERE offer_id = ?
+                GROUP BY vat_rate
+                ORDER BY vat_rate
+            ''', (offer_id,))
+            totals['by_vat'] = [dict(row) for row in cursor.fetchall()]
+            return totals
+        finally:
+            conn.close()
+    
     def get_offer_by_id(self, offer_id: int) -> Optional[Dict]:
         """Pobiera szczegóły oferty po ID"""
         conn = self.get_connection()
@@ -599,11 +2002,11 @@ class Database:
         except:
             offer['category_order'] = {}
         
-        # Pobierz pozycje oferty
+        # Pobierz pozycje oferty (offer_item_id = stabilny identyfikator dla update_offer)
         cursor.execute('''
-            SELECT * FROM SavedOfferItems 
+            SELECT *, id AS offer_item_id FROM SavedOfferItems 
             WHERE offer_id = ?
-            ORDER BY id
+            ORDER BY position, id
         ''', (offer_id,))
         
         offer['items'] = [dict(row) for row in cursor.fetchall()]
@@ -611,24 +2014,188 @@ class Database:
         
         return offer
     
+    # Zmienione ceny pozycji ofert z _reprice_offers względem aktualnego katalogu
+    _REPRICE_CHANGED_SQL = '''
+        i.offer_id IN (SELECT id FROM _reprice_offers)
+        AND p.purchase_price_net IS NOT NULL
+        AND (i.purchase_price_net IS NULL OR abs(p.purchase_price_net - i.purchase_price_net) > 0.001)
+    '''
+    
+    def preview_reprice_offers(self, offer_ids: List[int]) -> List[Dict]:
+        """
+        Podgląd aktualizacji cen zapisanych ofert do bieżących cen katalogowych
+        
+        Jedno zapytanie łączące SavedOfferItems.product_id z Products dla wszystkich ofert.
+        
+        Returns:
+            Lista zmienionych pozycji: offer_id, offer_item_id, product_id, name, quantity, margin,
+            old_price / new_price (cena zakupu) oraz old_net_unit / new_net_unit
+            (cena sprzedaży netto przy zachowanej marży)
+        """
+        conn = self.get_connection()
+        try:
+            cursor = conn.cursor()
+            self._fill_temp_ids(cursor, '_reprice_offers', offer_ids)
+            cursor.execute(f'''
+                SELECT i.offer_id, i.id as offer_item_id, i.product_id, i.name, i.quantity, i.margin,
+                       i.purchase_price_net as old_price, p.purchase_price_net as new_price,
+                       ROUND(i.purchase_price_net * (1 + COALESCE(i.margin, 30.0) / 100), 2) as old_net_unit,
+                       ROUND(p.purchase_price_net * (1 + COALESCE(i.margin, 30.0) / 100), 2) as new_net_unit
+                FROM SavedOfferItems i
+                JOIN Products p ON p.id = i.product_id
+                WHERE {self._REPRICE_CHANGED_SQL}
+                ORDER BY i.offer_id, i.position, i.id
+            ''')
+            return [dict(row) for row in cursor.fetchall()]
+        finally:
+            conn.close()
+    
+    def preview_reprice_offer(self, offer_id: int) -> List[Dict]:
+        """Podgląd aktualizacji cen jednej oferty (patrz preview_reprice_offers)"""
+        return self.preview_reprice_offers([offer_id])
+    
+    def reprice_offers(self, offer_ids: List[int]) -> int:
+        """
+        Aktualizuje ceny zakupu w zapisanych ofertach do bieżących cen katalogowych
+        
+        Marża, ilość i pozostałe dane pozycji zostają bez zmian. Pozycje wszystkich
+        ofert aktualizowane są jednym zapytaniem UPDATE; sumy i data modyfikacji
+        zmienionych ofert są odświeżane w tej samej transakcji.
+        
+        Returns:
+            Liczba zaktualizowanych pozycji (0 w przypadku błędu)
+        """
+        conn = None
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            self._fill_temp_ids(cursor, '_reprice_offers', offer_ids)
+            
+            cursor.execute(f'''
+                SELECT DISTINCT i.offer_id
+                FROM SavedOfferItems i
+                JOIN Products p ON p.id = i.product_id
+                WHERE {self._REPRICE_CHANGED_SQL}
+            ''')
+            changed_offer_ids = [row['offer_id'] for row in cursor.fetchall()]
+            if not changed_offer_ids:
+                return 0
+            
+            cursor.execute(f'''
+                UPDATE SavedOfferItems
+                SET purchase_price_net = (SELECT p.purchase_price_net FROM Products p
+                                          WHERE p.id = SavedOfferItems.product_id)
+                WHERE id IN (
+                    SELECT i.id
+                    FROM SavedOfferItems i
+                    JOIN Products p ON p.id = i.product_id
+                    WHERE {self._REPRICE_CHANGED_SQL}
+                )
+            ''')
+            updated = cursor.rowcount
+            
+            now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            cursor.executemany('UPDATE SavedOffers SET modified_date = ? WHERE id = ?',
+                               ((now, offer_id) for offer_id in changed_offer_ids))
+            for offer_id in changed_offer_ids:
+                _refresh_offer_totals(cursor, offer_id)
+            
+            conn.commit()
+            return updated
+        except sqlite3.Error as e:
+            print(f"Błąd aktualizacji cen ofert: {e}")
+            if conn:
+                conn.rollback()
+            return 0
+        finally:
+            if conn:
+                conn.close()
+    
+    def reprice_offer(self, offer_id: int) -> int:
+        """Aktualizuje ceny jednej oferty do bieżących cen katalogowych (patrz reprice_offers)"""
+        return self.reprice_offers([offer_id])
+    
+    def clone_offer(self, offer_id: int, new_title: Optional[str] = None) -> int:
+        """
+        Kopiuje zapisaną ofertę (np. szablon) w całości po stronie bazy
+        
+        Oferta, pozycje i sumy kopiowane są przez INSERT ... SELECT w jednej transakcji -
+        pozycje nie są wczytywane do Pythona.
+        
+        Args:
+            new_title: Tytuł kopii (domyślnie tytuł oryginału z dopiskiem " (kopia)")
+        
+        Returns:
+            ID nowej oferty lub 0 w przypadku błędu
+        """
+        conn = None
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            
+            cursor.execute('''
+                INSERT INTO SavedOffers (title, created_date, modified_date, category_order,
+                                         items_count, total_net, total_vat, total_gross)
+                SELECT COALESCE(?, title || ' (kopia)'), ?, ?, category_order,
+                       items_count, total_net, total_vat, total_gross
+                FROM SavedOffers WHERE id = ?
+            ''', (new_title, now, now, offer_id))
+            if cursor.rowcount == 0:
+                return 0
+            new_offer_id = cursor.lastrowid
+            
+            cursor.execute('''
+                INSERT INTO SavedOfferItems (offer_id, product_id, name, category_name, unit,
+                                            purchase_price_net, vat_rate, margin, quantity, position)
+                SELECT ?, product_id, name, category_name, unit,
+                       purchase_price_net, vat_rate, margin, quantity, position
+                FROM SavedOfferItems WHERE offer_id = ?
+            ''', (new_offer_id, offer_id))
+            
+            cursor.execute('''
+                INSERT INTO SavedOfferTotals (offer_id, category_name, vat_rate, items_count,
+                                              total_net, total_vat, total_gross)
+                SELECT ?, category_name, vat_rate, items_count, total_net, total_vat, total_gross
+                FROM SavedOfferTotals WHERE offer_id = ?
+            ''', (new_offer_id, offer_id))
+            
+            conn.commit()
+            return new_offer_id
+        except sqlite3.Error as e:
+            print(f"Błąd kopiowania oferty: {e}")
+            if conn:
+                conn.rollback()
+            return 0
+        finally:
+            if conn:
+                conn.close()
+    
     def delete_offer(self, offer_id: int) -> bool:
         """Usuwa ofertę"""
         try:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('DELETE FROM SavedOffers WHERE id = ?', (offer_id,))
+                # foreign_keys nie jest włączone - sumy usuwamy jawnie
+                cursor.execute('DELETE FROM SavedOfferTotals WHERE offer_id = ?', (offer_id,))
                 conn.commit()
             return True
         except Exception as e:
             print(f"Błąd usuwania oferty: {e}")
             return False
     
-    def bulk_update_prices(self, updates: List[Dict]) -> bool:
+    def bulk_update_prices(self, updates: List[Dict], progress_callback=None) -> bool:
         """
         Masowa aktualizacja cen produktów
         
+        Aktualizacje wykonywane są przez executemany i zatwierdzane porcjami po
+        BULK_WRITE_CHUNK_ROWS wierszy, więc duży import cen nie blokuje zapisu na długo.
+        W razie błędu zatwierdzone porcje pozostają w bazie.
+        
         Args:
             updates: Lista słowników z kluczami 'id' i 'purchase_price_net'
+            progress_callback: Opcjonalna funkcja callback(current, total) wywoływana po każdej porcji
         
         Returns:
             bool - True jeśli sukces
@@ -639,14 +2206,22 @@ class Database:
             cursor = conn.cursor()
             now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
             
-            for update in updates:
-                cursor.execute('''
+            rows = ((update['purchase_price_net'], now, update['id']) for update in updates)
+            done = 0
+            for chunk in _chunked(rows, BULK_WRITE_CHUNK_ROWS):
+                cursor.executemany('''
                     UPDATE Products 
                     SET purchase_price_net = ?, price_update_date = ?
                     WHERE id = ?
-                ''', (update['purchase_price_net'], now, update['id']))
+                ''', chunk)
+                self._bump_change_counter(cursor)
+                conn.commit()
+                done += len(chunk)
+                if progress_callback:
+                    progress_callback(done, len(updates))
             
-            conn.commit()
+            if len(updates) >= CHECKPOINT_AFTER_ROWS:
+                self._passive_checkpoint(conn)
             return True
         except Exception as e:
             print(f"Błąd aktualizacji cen: {e}")
@@ -657,8 +2232,60 @@ class Database:
             if conn:
                 conn.close()
     
+    def checkpoint(self, mode: str = 'PASSIVE') -> Optional[Tuple[int, int, int]]:
+        """
+        Przenosi zawartość pliku WAL do bazy
+        
+        Args:
+            mode: PASSIVE (nie czeka na czytelników), FULL, RESTART lub TRUNCATE
+        
+        Returns:
+            (busy, strony w WAL, strony przeniesione) lub None gdy baza nie działa w trybie WAL
+        """
+        conn = self.get_connection()
+        try:
+            if conn.execute('PRAGMA journal_mode').fetchone()[0].lower() != 'wal':
+                return None
+            return tuple(conn.execute(f'PRAGMA wal_checkpoint({mode})').fetchone())
+        finally:
+            conn.close()
+    
+    def optimize(self) -> None:
+        """Aktualizuje statystyki planera (PRAGMA optimize - ANALYZE tylko tam, gdzie potrzeba)"""
+        conn = self.get_connection()
+        try:
+            conn.execute('PRAGMA optimize')
+        finally:
+            conn.close()
+    
+    def vacuum(self) -> None:
+        """Przebudowuje plik bazy i zwalnia puste strony (wymaga wyłącznego dostępu)"""
+        conn = self.get_connection()
+        try:
+            conn.execute('VACUUM')
+        finally:
+            conn.close()
+    
+    def integrity_check(self) -> List[str]:
+        """PRAGMA integrity_check - lista problemów (pusta gdy baza jest spójna)"""
+        conn = self.get_connection()
+        try:
+            problems = [row[0] for row in conn.execute('PRAGMA integrity_check')]
+            return [] if problems == ['ok'] else problems
+        finally:
+            conn.close()
+    
+    @staticmethod
+    def _passive_checkpoint(conn):
+        """Pasywny checkpoint po dużym zapisie - nie blokuje trwających odczytów"""
+        try:
+            conn.execute('PRAGMA wal_checkpoint(PASSIVE)')
+        except sqlite3.Error as e:
+            print(f"Checkpoint WAL nie powiódł się: {e}")
+    
     def close(self):
-        """Zamyka wszystkie połączenia z bazą danych"""
-        # SQLite nie wymaga jawnego zamykania trwałego połączenia
-        # Wszystkie połączenia są tworzone per-operacja w get_connection()
-        pass
+        """Zamyka bazę - skraca plik WAL (połączenia są tworzone per-operacja w get_connection())"""
+        try:
+            self.checkpoint('TRUNCATE')
+        except sqlite3.Error as e:
+            print(f"Checkpoint WAL przy zamykaniu nie powiódł się: {e}")
@@ -0,0 +1,308 @@
+"""
+Instrumentacja bazy danych Ofertomat 2.0
+Mierzy czas każdej publicznej metody Database i każdego zapytania SQL,
+trzyma ostatnie pomiary w buforze cyklicznym, a wolne zapytania (wraz z
+EXPLAIN QUERY PLAN) zapisuje do rotowanego pliku logu.
+
+Włączanie: zmienna środowiskowa OFERTOMAT_DB_PROFILE=1
+    OFERTOMAT_DB_SLOW_MS - próg wolnego zapytania w ms (domyślnie 100)
+    OFERTOMAT_DIAGNOSTICS_DIR - katalog na logi i zrzuty (domyślnie "diagnostics")
+"""
+
+import functools
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+from typing import Dict, List, Optional
+
+# Co ile instrukcji maszyny wirtualnej SQLite wywoływany jest progress handler
+PROGRESS_HANDLER_STEPS = 1000
+
+# Metody Database, których nie opakowujemy (infrastruktura, nie operacje)
+SKIPPED_METHODS = {'get_connection', 'close'}
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    """Percentyl metodą najbliższego rangi (wartości muszą być posortowane)"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def _count_rows(result) -> Optional[int]:
+    """Liczba wierszy zwróconych przez metodę Database (lista lub (lista, total))"""
+    if isinstance(result, list):
+        return len(result)
+    if isinstance(result, tuple) and result and isinstance(result[0], list):
+        return len(result[0])
+    if isinstance(result, dict):
+        return 1
+    return None
+
+
+class DatabaseInstrumentation:
+    """Zbiera pomiary metod Database i zapytań SQL"""
+    
+    def __init__(self, slow_query_ms: float = 100.0, buffer_size: int = 5000,
+                 log_dir: str = "diagnostics", log_max_bytes: int = 1_000_000, log_backups: int = 3):
+        self.slow_query_ms = slow_query_ms
+        self.log_dir = log_dir
+        self.samples = deque(maxlen=buffer_size)
+        self.totals: Dict[tuple, Dict] = {}
+        self.lock = threading.Lock()
+        self.started_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        
+        self.slow_log = logging.getLogger(f"ofertomat.slow_queries.{id(self)}")
+        self.slow_log.propagate = False
+        self.slow_log.setLevel(logging.INFO)
+        self._log_max_bytes = log_max_bytes
+        self._log_backups = log_backups
+        
+        # Klasa połączenia (factory dla sqlite3.connect) powiązana z tą instrumentacją
+        self.connection_class = type('BoundInstrumentedConnection', (InstrumentedConnection,),
+                                     {'instrumentation': self})
+    
+    @classmethod
+    def from_env(cls) -> Optional['DatabaseInstrumentation']:
+        """Tworzy instrumentację jeśli włączono ją zmienną OFERTOMAT_DB_PROFILE"""
+        if os.environ.get('OFERTOMAT_DB_PROFILE', '').lower() not in ('1', 'true', 'yes', 'tak'):
+            return None
+        return cls(
+            slow_query_ms=float(os.environ.get('OFERTOMAT_DB_SLOW_MS', 100)),
+            log_dir=os.environ.get('OFERTOMAT_DIAGNOSTICS_DIR', 'diagnostics')
+        )
+    
+    # === REJESTRACJA POMIARÓW ===
+    
+    def record(self, kind: str, name: str, duration_ms: float, rows: Optional[int] = None, **extra) -> Dict:
+        """Dodaje pomiar do bufora i liczników; zwraca próbkę (można ją później uzupełnić)"""
+        sample = {
+            'kind': kind,
+            'name': name,
+            'ms': duration_ms,
+            'rows': rows,
+            'at': time.time(),
+            **extra
+        }
+        with self.lock:
+            self.samples.append(sample)
+            total = self.totals.setdefault((kind, name), {'count': 0, 'total_ms': 0.0, 'rows': 0})
+            total['count'] += 1
+            total['total_ms'] += duration_ms
+            total['rows'] += rows or 0
+        return sample
+    
+    def update_sample(self, sample: Dict, extra_ms: float, extra_rows: int):
+        """Dolicza czas i wiersze pobrane po execute() (fetch*)"""
+        with self.lock:
+            sample['ms'] += extra_ms
+            sample['rows'] = (sample['rows'] or 0) + extra_rows
+            total = self.totals.get((sample['kind'], sample['name']))
+            if total:
+                total['total_ms'] += extra_ms
+                total['rows'] += extra_rows
+    
+    def wrap_methods(self, db) -> None:
+        """Opakowuje wszystkie publiczne metody obiektu Database pomiarem czasu"""
+        for attr_name in dir(type(db)):
+            if attr_name.startswith('_') or attr_name in SKIPPED_METHODS:
+                continue
+            method = getattr(db, attr_name)
+            if callable(method):
+                setattr(db, attr_name, self._timed_method(attr_name, method))
+    
+    def _timed_method(self, name: str, method):
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return_value = method(*args, **kwargs)
+            except Exception:
+                self.record('method', name, (time.perf_counter() - start) * 1000, error=True)
+                raise
+            self.record('method', name, (time.perf_counter() - start) * 1000, _count_rows(return_value))
+            return return_value
+        return wrapper
+    
+    def attach(self, conn: sqlite3.Connection) -> None:
+        """Podpina callbacki sqlite3 (trace + progress) do połączenia"""
+        def on_trace(statement):
+            conn.last_expanded_sql = statement
+        
+        def on_progress():
+            conn.vm_steps += PROGRESS_HANDLER_STEPS
+            return 0  # 0 = kontynuuj wykonywanie
+        
+        conn.last_expanded_sql = None
+        conn.vm_steps = 0
+        conn.set_trace_callback(on_trace)
+        conn.set_progress_handler(on_progress, PROGRESS_HANDLER_STEPS)
+    
+    # === WOLNE ZAPYTANIA ===
+    
+    def _get_slow_log(self) -> logging.Logger:
+        if not self.slow_log.handlers:
+            os.makedirs(self.log_dir, exist_ok=True)
+            handler = RotatingFileHandler(
+                os.path.join(self.log_dir, "slow_queries.log"),
+                maxBytes=self._log_max_bytes,
+                backupCount=self._log_backups,
+                encoding='utf-8'
+            )
+            handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+            self.slow_log.addHandler(handler)
+        return self.slow_log
+    
+    def check_slow(self, conn: sqlite3.Connection, sample: Dict, sql: str, params) -> None:
+        """Zapisuje zapytanie do logu wolnych zapytań (raz na próbkę) wraz z planem"""
+        if sample.get('logged') or sample['ms'] < self.slow_query_ms:
+            return
+        sample['logged'] = True
+        
+        plan = []
+        if sql.lstrip().upper().startswith(('SELECT', 'WITH', 'UPDATE', 'DELETE', 'INSERT')):
+            try:
+                # Zwykły kursor sqlite3 - bez ponownej instrumentacji
+                plan_cursor = sqlite3.Connection.cursor(conn)
+                plan_cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params or ())
+                plan = [row[3] for row in plan_cursor.fetchall()]
+            except sqlite3.Error as e:
+                plan = [f"(brak planu: {e})"]
+        
+        self._get_slow_log().info(json.dumps({
+            'ms': round(sample['ms'], 2),
+            'rows': sample['rows'],
+            'vm_steps': sample.get('vm_steps'),
+            'sql': ' '.join((sample.get('expanded_sql') or sql).split()),
+            'plan': plan
+        }, ensure_ascii=False))
+    
+    # === RAPORT ===
+    
+    def summary(self) -> List[Dict]:
+        """Statystyki per metoda/zapytanie: liczba wywołań, p50/p95/max, wiersze"""
+        with self.lock:
+            samples = list(self.samples)
+            totals = {key: dict(value) for key, value in self.totals.items()}
+        
+        durations: Dict[tuple, List[float]] = {}
+        for sample in samples:
+            durations.setdefault((sample['kind'], sample['name']), []).append(sample['ms'])
+        
+        report = []
+        for (kind, name), total in totals.items():
+            recent = sorted(durations.get((kind, name), []))
+            report.append({
+                'kind': kind,
+                'name': name,
+                'count': total['count'],
+                'total_ms': round(total['total_ms'], 2),
+                'rows': total['rows'],
+                'p50_ms': round(_percentile(recent, 0.50), 3),
+                'p95_ms': round(_percentile(recent, 0.95), 3),
+                'max_ms': round(recent[-1], 3) if recent else 0.0
+            })
+        report.sort(key=lambda entry: entry['total_ms'], reverse=True)
+        return report
+    
+    def dump(self, path: Optional[str] = None) -> str:
+        """Zapisuje statystyki i ostatnie próbki do pliku JSON (do załączenia w zgłoszeniu błędu)"""
+        if path is None:
+            os.makedirs(self.log_dir, exist_ok=True)
+            path = os.path.join(self.log_dir, f"db_profile_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+        
+        with self.lock:
+            recent = [dict(sample) for sample in self.samples]
+        
+        data = {
+            'started_at': self.started_at,
+            'dumped_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'sqlite_version': sqlite3.sqlite_version,
+            'slow_query_ms': self.slow_query_ms,
+            'summary': self.summary(),
+            'recent_samples': recent
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        return path
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """Kursor mierzący czas execute/fetch i liczbę pobranych wierszy"""
+    
+    _sample = None
+    _sql = None
+    _params = None
+    
+    def _record_execute(self, kind: str, sql: str, params, start: float, rows: Optional[int] = None):
+        conn = self.connection
+        self._sql = sql
+        self._params = params
+        self._sample = conn.instrumentation.record(
+            kind, ' '.join(sql.split()), (time.perf_counter() - start) * 1000, rows,
+            expanded_sql=conn.last_expanded_sql, vm_steps=conn.vm_steps
+        )
+        conn.instrumentation.check_slow(conn, self._sample, sql, params)
+    
+    def _record_fetch(self, start: float, rows: int):
+        if self._sample is None:
+            return
+        conn = self.connection
+        conn.instrumentation.update_sample(self._sample, (time.perf_counter() - start) * 1000, rows)
+        self._sample['vm_steps'] = conn.vm_steps
+        conn.instrumentation.check_slow(conn, self._sample, self._sql, self._params)
+    
+    def execute(self, sql, parameters=()):
+        self.connection.vm_steps = 0
+        start = time.perf_counter()
+        result = super().execute(sql, parameters)
+        self._record_execute('sql', sql, parameters, start)
+        return result
+    
+    def executemany(self, sql, seq_of_parameters):
+        self.connection.vm_steps = 0
+        start = time.perf_counter()
+        result = super().executemany(sql, seq_of_parameters)
+        self._record_execute('sql', sql, None, start, rows=self.rowcount)
+        return result
+    
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        self._record_fetch(start, 1 if row is not None else 0)
+        return row
+    
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        rows = super().fetchmany(size if size is not None else self.arraysize)
+        self._record_fetch(start, len(rows))
+        return rows
+    
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self._record_fetch(start, len(rows))
+        return rows
+    
+    def __next__(self):
+        start = time.perf_counter()
+        row = super().__next__()
+        self._record_fetch(start, 1)
+        return row
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """Połączenie tworzące kursory z pomiarem (factory dla sqlite3.connect)"""
+    
+    instrumentation: DatabaseInstrumentation = None
+    
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
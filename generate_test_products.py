@@ -1,10 +1,25 @@
 """
-Generator testowych produktów CSV dla Ofertomat 2.0
-Generuje 2000 produktów w różnych kategoriach
+Generator testowych danych dla Ofertomat 2.0 - deterministyczny (seed) i strumieniowy
+
+Katalog produktów dowolnej wielkości trafia do CSV, XLSX albo bezpośrednio do bazy
+SQLite; produkty generowane są pojedynczo, więc 10M wierszy nie wymaga 10M wierszy
+w pamięci. Do bazy można też dopisać zapisane oferty z produktami z katalogu
+(benchmarki ofert i PDF).
+
+Użycie:
+    python generate_test_products.py                                  # test_produkty_2000.csv
+    python generate_test_products.py --rows 1000000 --output katalog.csv --seed 7
+    python generate_test_products.py --rows 200000 --format xlsx --output katalog.xlsx
+    python generate_test_products.py --rows 200000 --output bench.db --categories 40 --offers 5
 """
 
+import argparse
 import csv
+import itertools
+import os
 import random
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
 
 # Kategorie produktów z prefiksami
 CATEGORIES = {
@@ -94,122 +109,235 @@ UNITS = ['kg', 'szt.', 'l', 'op.', 'rolka', 'puszka', 'butelka', 'opak.', 'gram'
 # Stawki VAT
 VAT_RATES = ['8%', '23%', '5%']
 
-def generate_product_name(base_name, index):
-    """Generuje unikalną nazwę produktu"""
-    variants = []
+# Rozkład długości nazw - wagi dla 0, 1, 2, ... dodatkowych członów (wariant, potem cechy)
+NAME_LENGTH_PROFILES = {
+    'short': (0.7, 0.3),
+    'mixed': (0.4, 0.3, 0.2, 0.1),
+    'long': (0.0, 0.1, 0.2, 0.3, 0.2, 0.2),
+}
+
+SEED_BATCH_ROWS = 5000
+DEFAULT_MARGIN = 30.0
+
+
+def category_names(count: int) -> List[Tuple[str, str]]:
+    """(prefiks kodu, nazwa) dla `count` kategorii - powyżej 10 kolejne serie z numerem"""
+    base = list(CATEGORIES.items())
+    result = []
+    for index in range(count):
+        prefix, (name, _) = base[index % len(base)]
+        series = index // len(base)
+        result.append((prefix, name if series == 0 else f"{name} {series + 1}"))
+    return result
+
+
+def generate_product_name(rnd: random.Random, base_name: str, index: int, extra_parts: int) -> str:
+    """Nazwa produktu: nazwa bazowa, wariant i (extra_parts - 1) cech, np. "z pikantny" """
+    words = [base_name]
+    if extra_parts:
+        words.append(rnd.choice(VARIANTS))
+    for _ in range(extra_parts - 1):
+        words.append(rnd.choice(FEATURES))
+        words.append(rnd.choice(ADDITIONAL_WORDS))
+    # Numer odróżnia produkty o tej samej nazwie
+    if extra_parts < 2 or rnd.random() < 0.2:
+        words.append(f"#{index}")
+    return ' '.join(words)
+
+
+def iter_products(count: int, categories: int = len(CATEGORIES), seed: int = 42,
+                  names: str = 'mixed') -> Iterator[Dict]:
+    """
+    Strumień `count` produktów (ten sam seed -> te same dane)
     
-    # Dodaj wariant (30% szans)
-    if random.random() < 0.3:
-        variants.append(random.choice(VARIANTS))
+    Returns: słowniki z kluczami code, name, unit, purchase_price_net, vat_rate (liczby),
+             category (nazwa kategorii z category_names)
+    """
+    rnd = random.Random(seed)
+    cats = category_names(categories)
+    weights = NAME_LENGTH_PROFILES[names]
+    part_counts = range(len(weights))
+    for index in range(count):
+        prefix, category = cats[index % len(cats)]
+        base_name = rnd.choice(CATEGORIES[prefix][1])
+        extra_parts = rnd.choices(part_counts, weights)[0]
+        
+        # Cena (od 0.50 do 150 zł) - akcesoria i napoje droższe, mięso i desery średnio
+        if prefix in ('A', 'B'):
+            price = rnd.uniform(5.0, 150.0)
+        elif prefix in ('M', 'D'):
+            price = rnd.uniform(10.0, 100.0)
+        else:
+            price = rnd.uniform(0.5, 50.0)
+        
+        # VAT - 8% dla żywności, dla akcesoriów i napojów różnie
+        if prefix in ('A', 'B') or rnd.random() < 0.1:
+            vat = float(rnd.choice(VAT_RATES).rstrip('%'))
+        else:
+            vat = 8.0
+        
+        yield {
+            'code': f"{prefix}{index + 1:08d}",
+            'name': generate_product_name(rnd, base_name, index + 1, extra_parts),
+            'unit': rnd.choice(UNITS),
+            'purchase_price_net': round(price, 2),
+            'vat_rate': vat,
+            'category': category
+        }
+
+
+def _file_row(product: Dict) -> Tuple:
+    """Wiersz pliku w formacie importu (przecinek dziesiętny, VAT z procentem)"""
+    return (product['code'], product['name'], product['unit'],
+            f"{product['purchase_price_net']:.2f}".replace('.', ','),
+            f"{product['vat_rate']:g}%", product['category'])
+
+
+FILE_COLUMNS = ('Kod', 'Nazwa', 'Jednostka', 'Cena zakupu netto', 'VAT', 'Kategoria')
+
+
+def write_csv(products: Iterator[Dict], filename: str, delimiter: str = ',') -> int:
+    """Zapisuje produkty do CSV (wiersz po wierszu); zwraca liczbę wierszy"""
+    count = 0
+    with open(filename, 'w', newline='', encoding='utf-8-sig') as csvfile:
+        writer = csv.writer(csvfile, delimiter=delimiter)
+        writer.writerow(FILE_COLUMNS)
+        for product in products:
+            writer.writerow(_file_row(product))
+            count += 1
+    return count
+
+
+def write_xlsx(products: Iterator[Dict], filename: str) -> int:
+    """Zapisuje produkty do XLSX (openpyxl w trybie write_only - strumieniowo)"""
+    from openpyxl import Workbook
     
-    # Dodaj cechę (40% szans)
-    if random.random() < 0.4:
-        variants.append(random.choice(FEATURES))
-        variants.append(random.choice(ADDITIONAL_WORDS))
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Produkty")
+    sheet.append(FILE_COLUMNS)
+    count = 0
+    for product in products:
+        sheet.append(_file_row(product))
+        count += 1
+    workbook.save(filename)
+    return count
+
+
+def seed_database(db, products: Iterator[Dict], margin: float = DEFAULT_MARGIN) -> int:
+    """
+    Wstawia produkty do bazy porcjami (Database.import_products_batch)
     
-    # Buduj nazwę
-    if variants:
-        name = f"{base_name} {' '.join(variants)}"
-    else:
-        name = base_name
+    Brakujące kategorie są zakładane z marżą `margin`. Zwraca liczbę produktów.
+    """
+    category_ids = {category['name']: category['id'] for category in db.get_categories()}
+    count = 0
+    while True:
+        batch = list(itertools.islice(products, SEED_BATCH_ROWS))
+        if not batch:
+            return count
+        for product in batch:
+            name = product['category']
+            if name not in category_ids:
+                category_ids[name] = db.add_category(name, margin)
+            product['category_id'] = category_ids[name]
+        db.import_products_batch(batch)
+        count += len(batch)
+
+
+def sample_offer_items(db, lines: int, rnd: random.Random) -> List[Dict]:
+    """
+    `lines` pozycji oferty z losowych produktów katalogu (format Database.save_offer)
     
-    # Dodaj numer jeśli nazwa jest zbyt prosta
-    if len(name) < 15 or random.random() < 0.2:
-        name += f" #{index}"
+    Przy ofercie większej niż katalog produkty się powtarzają.
+    """
+    conn = db.get_connection()
+    try:
+        max_id = conn.execute('SELECT MAX(id) FROM Products').fetchone()[0]
+        if not max_id:
+            raise ValueError("Katalog jest pusty - najpierw wygeneruj produkty")
+        if lines <= max_id:
+            product_ids = rnd.sample(range(1, max_id + 1), lines)
+        else:
+            product_ids = [rnd.randint(1, max_id) for _ in range(lines)]
+        
+        rows = {}
+        unique_ids = list(dict.fromkeys(product_ids))
+        for start in range(0, len(unique_ids), 900):
+            chunk = unique_ids[start:start + 900]
+            cursor = conn.execute(f'''
+                SELECT p.id, p.name, p.unit, p.purchase_price_net, p.vat_rate,
+                       c.name AS category_name, c.default_margin
+                FROM Products p
+                LEFT JOIN Categories c ON p.category_id = c.id
+                WHERE p.id IN ({', '.join('?' * len(chunk))})
+            ''', chunk)
+            rows.update((row['id'], row) for row in cursor)
+    finally:
+        conn.close()
     
-    return name
+    return [{
+        'product_id': row['id'],
+        'name': row['name'],
+        'category_name': row['category_name'] or 'Bez kategorii',
+        'unit': row['unit'],
+        'purchase_price_net': row['purchase_price_net'],
+        'vat_rate': row['vat_rate'],
+        'margin': row['default_margin'] if row['default_margin'] is not None else DEFAULT_MARGIN,
+        'quantity': float(rnd.randint(1, 20))
+    } for row in (rows[product_id] for product_id in product_ids if product_id in rows)]
+
+
+def generate_offers(db, count: int, lines: int, seed: int = 42) -> List[int]:
+    """Zapisuje `count` ofert po `lines` pozycji z produktów katalogu; zwraca ID ofert"""
+    rnd = random.Random(seed)
+    offer_ids = []
+    for index in range(count):
+        items = sample_offer_items(db, lines, rnd)
+        category_order = {name: position for position, name in enumerate(dict.fromkeys(
+            item['category_name'] for item in items))}
+        offer_ids.append(db.save_offer(f"Oferta testowa {index + 1} ({lines} poz.)", items, category_order))
+    return offer_ids
 
-def generate_products(count=2000):
-    """Generuje listę produktów"""
-    products = []
-    products_per_category = count // len(CATEGORIES)
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Generator testowych danych Ofertomat 2.0")
+    parser.add_argument('--rows', type=int, default=2000, help="liczba produktów (domyślnie 2000)")
+    parser.add_argument('--categories', type=int, default=len(CATEGORIES), help="liczba kategorii")
+    parser.add_argument('--seed', type=int, default=42, help="ziarno generatora (te same dane dla tego samego ziarna)")
+    parser.add_argument('--names', choices=list(NAME_LENGTH_PROFILES), default='mixed',
+                        help="rozkład długości nazw")
+    parser.add_argument('--format', choices=('csv', 'xlsx', 'sqlite'), default=None,
+                        help="format wyjścia (domyślnie z rozszerzenia pliku)")
+    parser.add_argument('--output', default="test_produkty_2000.csv", help="plik wyjściowy")
+    parser.add_argument('--offers', type=int, default=0, help="liczba zapisanych ofert (tylko sqlite)")
+    parser.add_argument('--offer-lines', type=int, default=1000, help="pozycji w każdej ofercie")
+    args = parser.parse_args(argv)
     
-    for prefix, (category_name, base_names) in CATEGORIES.items():
-        for i in range(products_per_category):
-            # Generuj kod
-            code = f"{prefix}{str(i+1).zfill(4)}"
-            
-            # Wybierz bazową nazwę i wygeneruj wariant
-            base_name = random.choice(base_names)
-            name = generate_product_name(base_name, i+1)
-            
-            # Jednostka
-            unit = random.choice(UNITS)
-            
-            # Cena (od 0.50 do 500 zł)
-            if prefix in ['A', 'B']:  # Akcesoria i napoje często droższe
-                price = round(random.uniform(5.0, 150.0), 2)
-            elif prefix in ['M', 'D']:  # Mięso i desery średnio drogie
-                price = round(random.uniform(10.0, 100.0), 2)
-            else:
-                price = round(random.uniform(0.5, 50.0), 2)
-            
-            # VAT - 8% dla żywności, 23% dla reszty głównie
-            if prefix in ['A', 'B'] or random.random() < 0.1:
-                vat = random.choice(VAT_RATES)
-            else:
-                vat = '8%'
-            
-            products.append({
-                'Kod': code,
-                'Nazwa': name,
-                'Jednostka': unit,
-                'Cena zakupu netto': f"{price:.2f}".replace('.', ','),
-                'VAT': vat
-            })
+    output_format = args.format or {'.xlsx': 'xlsx', '.db': 'sqlite', '.sqlite': 'sqlite'}.get(
+        os.path.splitext(args.output)[1].lower(), 'csv')
+    if args.offers and output_format != 'sqlite':
+        parser.error("--offers wymaga formatu sqlite")
     
-    # Jeśli potrzebujemy więcej produktów, dodaj losowe
-    remaining = count - len(products)
-    if remaining > 0:
-        for i in range(remaining):
-            prefix = random.choice(list(CATEGORIES.keys()))
-            category_name, base_names = CATEGORIES[prefix]
-            
-            code = f"{prefix}{str(1000+i).zfill(4)}"
-            base_name = random.choice(base_names)
-            name = generate_product_name(base_name, 1000+i)
-            unit = random.choice(UNITS)
-            price = round(random.uniform(0.5, 200.0), 2)
-            vat = '8%' if prefix not in ['A', 'B'] else random.choice(VAT_RATES)
-            
-            products.append({
-                'Kod': code,
-                'Nazwa': name,
-                'Jednostka': unit,
-                'Cena zakupu netto': f"{price:.2f}".replace('.', ','),
-                'VAT': vat
-            })
+    start = time.perf_counter()
+    products = iter_products(args.rows, args.categories, args.seed, args.names)
+    if output_format == 'csv':
+        count = write_csv(products, args.output)
+    elif output_format == 'xlsx':
+        count = write_xlsx(products, args.output)
+    else:
+        from database import Database
+        db = Database(args.output)
+        try:
+            count = seed_database(db, products)
+            if args.offers:
+                offer_ids = generate_offers(db, args.offers, args.offer_lines, args.seed)
+                print(f"✅ Zapisano {len(offer_ids)} ofert po {args.offer_lines} pozycji")
+        finally:
+            db.close()
     
-    return products
+    print(f"✅ Wygenerowano {count} produktów do pliku: {args.output} "
+          f"({time.perf_counter() - start:.1f} s)")
 
-def save_to_csv(products, filename='test_produkty_2000.csv'):
-    """Zapisuje produkty do pliku CSV"""
-    with open(filename, 'w', newline='', encoding='utf-8-sig') as csvfile:
-        fieldnames = ['Kod', 'Nazwa', 'Jednostka', 'Cena zakupu netto', 'VAT']
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        
-        writer.writeheader()
-        for product in products:
-            writer.writerow(product)
-    
-    print(f"✅ Wygenerowano {len(products)} produktów do pliku: {filename}")
 
 if __name__ == "__main__":
-    # Generuj 2000 produktów
-    products = generate_products(2000)
-    save_to_csv(products, 'test_produkty_2000.csv')
-    
-    # Statystyki
-    print(f"\n📊 Statystyki:")
-    print(f"   Całkowita liczba produktów: {len(products)}")
-    
-    # Policz produkty per kategoria
-    category_counts = {}
-    for product in products:
-        prefix = product['Kod'][0]
-        category_counts[prefix] = category_counts.get(prefix, 0) + 1
-    
-    print(f"\n   Produkty per kategoria:")
-    for prefix, count in sorted(category_counts.items()):
-        category_name = CATEGORIES[prefix][0]
-        print(f"   {prefix} - {category_name}: {count}")
+    main()
@@ -1,7 +1,51 @@
 import pandas as pd
-from typing import List, Dict, Optional
+import openpyxl
+from itertools import islice
+from typing import Iterator, List, Dict, Optional
 import re
 
+# Liczba wierszy w porcji importu strumieniowego (iter_import_batches)
+IMPORT_BATCH_ROWS = 5000
+
+# Mapowanie nazw kolumn pliku importu (elastyczne dopasowanie)
+COLUMN_MAPPING = {
+    'Nr': 'code',
+    'nr': 'code',
+    'Indeks': 'code',
+    'Kod': 'code',
+    'kod': 'code',
+    'Opis': 'name',
+    'opis': 'name',
+    'Nazwa': 'name',
+    'nazwa': 'name',
+    'Podst. jednostka miary': 'unit',
+    'Jednostka': 'unit',
+    'jednostka': 'unit',
+    'JM': 'unit',
+    'Ostatni koszt bezpośredni': 'purchase_price_net',
+    'Cena zakupu': 'purchase_price_net',
+    'Cena zakupu netto': 'purchase_price_net',
+    'cena zakupu': 'purchase_price_net',
+    'cena zakupu netto': 'purchase_price_net',
+    'Cena': 'purchase_price_net',
+    'cena': 'purchase_price_net',
+    'Koszt': 'purchase_price_net',
+    'koszt': 'purchase_price_net',
+    'Koszt jednostkowy': 'purchase_price_net',
+    'koszt jednostkowy': 'purchase_price_net',
+    'Cena netto': 'purchase_price_net',
+    'cena netto': 'purchase_price_net',
+    'Wartość': 'purchase_price_net',
+    'wartość': 'purchase_price_net',
+    'Tow. grupa księgowa VAT': 'vat_rate',
+    'VAT': 'vat_rate',
+    'Vat': 'vat_rate',
+    'vat': 'vat_rate',
+    'Stawka VAT': 'vat_rate',
+    'stawka vat': 'vat_rate'
+}
+
+
 class DataImporter:
     """Klasa do importu danych z plików CSV/Excel"""
     
@@ -72,87 +116,130 @@ class DataImporter:
         Returns:
             Lista słowników z danymi produktów
         """
-        # Wykryj typ pliku i wczytaj dane
+        products = []
+        for batch in DataImporter.iter_import_batches(file_path, category_id):
+            products.extend(batch)
+        return products
+    
+    @staticmethod
+    def iter_import_batches(file_path: str, category_id: Optional[int] = None,
+                            batch_size: Optional[int] = None) -> Iterator[List[Dict]]:
+        """
+        Importuje produkty strumieniowo - porcje po najwyżej batch_size wierszy
+        
+        CSV czytany jest kawałkami (pandas chunksize), XLSX wierszami (openpyxl
+        w trybie read_only), więc pamięć nie zależy od rozmiaru pliku. Kolumny
+        mapowane są jak w import_from_file.
+        
+        Args:
+            batch_size: Wierszy w porcji (domyślnie IMPORT_BATCH_ROWS)
+        """
+        renamed_columns = None
+        for df in DataImporter._read_frames(file_path, batch_size or IMPORT_BATCH_ROWS):
+            if renamed_columns is None:
+                renamed_columns = DataImporter._map_columns(list(df.columns))
+            df = df.rename(columns=renamed_columns)
+            
+            # Ustaw domyślne wartości dla brakujących kolumn
+            if 'unit' not in df.columns:
+                df['unit'] = 'szt.'
+            if 'purchase_price_net' not in df.columns:
+                df['purchase_price_net'] = 0.0
+            if 'vat_rate' not in df.columns:
+                df['vat_rate'] = 23.0
+            
+            # Przetwórz dane
+            products = []
+            for code, name, unit, price, vat in df[['code', 'name', 'unit', 'purchase_price_net', 'vat_rate']].itertuples(index=False):
+                # Pomiń puste wiersze
+                if pd.isna(code) or str(code).strip() == '':
+                    continue
+                
+                products.append({
+                    'code': str(code).strip(),
+                    'name': str(name).strip() if not pd.isna(name) else '',
+                    'unit': str(unit).strip() if not pd.isna(unit) else 'szt.',
+                    'purchase_price_net': DataImporter.parse_price_value(price),
+                    'vat_rate': DataImporter.parse_vat_rate(vat),
+                    'category_id': category_id
+                })
+            
+            if products:
+                yield products
+    
+    @staticmethod
+    def _read_frames(file_path: str, chunk_size: int) -> Iterator[pd.DataFrame]:
+        """Czyta plik CSV/Excel kolejnymi ramkami danych po chunk_size wierszy"""
         if file_path.endswith('.csv'):
-            # Próbuj najpierw z separatorem średnik
+            # Separator: średnik, a jeśli daje tylko jedną kolumnę - przecinek.
+            # Wszystkie kolumny jako tekst - typ nie zależy od zawartości porcji
+            # (np. kody liczbowe w porcji z pustą komórką nie stają się "123.0")
+            try:
+                sep = ';'
+                if len(pd.read_csv(file_path, encoding='utf-8-sig', sep=';', nrows=0).columns) == 1:
+                    sep = ','
+            except Exception:
+                sep = ','
+            reader = pd.read_csv(file_path, encoding='utf-8-sig', sep=sep, dtype=str, chunksize=chunk_size)
+            with reader:
+                yield from reader
+        elif file_path.endswith('.xlsx'):
             try:
-                df = pd.read_csv(file_path, encoding='utf-8-sig', sep=';')
-                # Jeśli mamy tylko jedną kolumnę, spróbuj z przecinkiem
-                if len(df.columns) == 1:
-                    df = pd.read_csv(file_path, encoding='utf-8-sig', sep=',')
-            except:
-                df = pd.read_csv(file_path, encoding='utf-8-sig')
-        elif file_path.endswith(('.xlsx', '.xls')):
-            # Obsługa plików Excel z różnymi silnikami
+                workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+            except Exception as e:
+                raise ValueError(f"Nie można odczytać pliku Excel: {str(e)}\n"
+                                 f"Upewnij się, że plik nie jest otwarty w innym programie.")
             try:
-                # Dla .xlsx używamy openpyxl (domyślnie)
-                if file_path.endswith('.xlsx'):
+                rows = workbook.active.iter_rows(values_only=True)
+                header = next(rows, None)
+                if header is None:
+                    return
+                columns = [str(col) if col is not None else f"Unnamed: {idx}" for idx, col in enumerate(header)]
+                while True:
+                    chunk = [[DataImporter._excel_value(value) for value in row]
+                             for row in islice(rows, chunk_size)]
+                    if not chunk:
+                        break
+                    yield pd.DataFrame(chunk, columns=columns, dtype=object)
+            finally:
+                workbook.close()
+        elif file_path.endswith('.xls'):
+            # Starszy format - bez odczytu strumieniowego, dzielimy całą ramkę
+            try:
+                try:
+                    df = pd.read_excel(file_path, engine='xlrd')
+                except:
+                    # Jeśli xlrd nie zadziała, spróbuj openpyxl (może być .xls zapisany jako .xlsx)
                     df = pd.read_excel(file_path, engine='openpyxl')
-                else:
-                    # Dla starszych .xls próbujemy różnych silników
-                    try:
-                        df = pd.read_excel(file_path, engine='xlrd')
-                    except:
-                        # Jeśli xlrd nie zadziała, spróbuj openpyxl (może być .xls zapisany jako .xlsx)
-                        df = pd.read_excel(file_path, engine='openpyxl')
             except Exception as e:
                 raise ValueError(f"Nie można odczytać pliku Excel: {str(e)}\n"
-                               f"Upewnij się, że plik nie jest otwarty w innym programie.")
+                                 f"Upewnij się, że plik nie jest otwarty w innym programie.")
+            for start in range(0, len(df), chunk_size):
+                yield df.iloc[start:start + chunk_size]
         else:
             raise ValueError("Nieobsługiwany format pliku. Użyj CSV, XLS lub XLSX.")
-        
-        # Mapowanie nazw kolumn (elastyczne dopasowanie)
-        column_mapping = {
-            'Nr': 'code',
-            'nr': 'code',
-            'Indeks': 'code',
-            'Kod': 'code',
-            'kod': 'code',
-            'Opis': 'name',
-            'opis': 'name',
-            'Nazwa': 'name',
-            'nazwa': 'name',
-            'Podst. jednostka miary': 'unit',
-            'Jednostka': 'unit',
-            'jednostka': 'unit',
-            'JM': 'unit',
-            'Ostatni koszt bezpośredni': 'purchase_price_net',
-            'Cena zakupu': 'purchase_price_net',
-            'Cena zakupu netto': 'purchase_price_net',
-            'cena zakupu': 'purchase_price_net',
-            'cena zakupu netto': 'purchase_price_net',
-            'Cena': 'purchase_price_net',
-            'cena': 'purchase_price_net',
-            'Koszt': 'purchase_price_net',
-            'koszt': 'purchase_price_net',
-            'Koszt jednostkowy': 'purchase_price_net',
-            'koszt jednostkowy': 'purchase_price_net',
-            'Cena netto': 'purchase_price_net',
-            'cena netto': 'purchase_price_net',
-            'Wartość': 'purchase_price_net',
-            'wartość': 'purchase_price_net',
-            'Tow. grupa księgowa VAT': 'vat_rate',
-            'VAT': 'vat_rate',
-            'Vat': 'vat_rate',
-            'vat': 'vat_rate',
-            'Stawka VAT': 'vat_rate',
-            'stawka vat': 'vat_rate'
-        }
-        
+    
+    @staticmethod
+    def _excel_value(value):
+        """Wartość komórki jak w pandas.read_excel: liczby całkowite zapisane jako float -> int"""
+        if isinstance(value, float) and value.is_integer():
+            return int(value)
+        return value
+    
+    @staticmethod
+    def _map_columns(original_columns: List[str]) -> Dict[str, str]:
+        """Mapuje nazwy kolumn pliku na pola produktu; błąd gdy brak kolumn wymaganych"""
         # Znajdź i zmapuj kolumny
         renamed_columns = {}
-        original_columns = list(df.columns)
-        
-        for col in df.columns:
-            col_clean = col.strip()
-            if col_clean in column_mapping:
-                renamed_columns[col] = column_mapping[col_clean]
-        
-        df = df.rename(columns=renamed_columns)
+        for col in original_columns:
+            col_clean = str(col).strip()
+            # Kilka pasujących kolumn (np. "Cena" i "Koszt") - liczy się pierwsza
+            if col_clean in COLUMN_MAPPING and COLUMN_MAPPING[col_clean] not in renamed_columns.values():
+                renamed_columns[col] = COLUMN_MAPPING[col_clean]
         
         # Sprawdź czy mamy wymagane kolumny
         required_columns = ['code', 'name']
-        missing_columns = [col for col in required_columns if col not in df.columns]
+        missing_columns = [col for col in required_columns if col not in renamed_columns.values()]
         
         if missing_columns:
             # Pokaż bardziej szczegółowy błąd z listą dostępnych kolumn
@@ -166,7 +253,7 @@ class DataImporter:
             raise ValueError(error_msg)
         
         # Informacja diagnostyczna - jeśli nie znaleziono kolumny z ceną
-        if 'purchase_price_net' not in df.columns:
+        if 'purchase_price_net' not in renamed_columns.values():
             import warnings
             available_cols = ', '.join([f'"{col}"' for col in original_columns])
             warnings.warn(
@@ -175,33 +262,7 @@ class DataImporter:
                 f"Ceny zostaną ustawione na 0.0"
             )
         
-        # Ustaw domyślne wartości dla brakujących kolumn
-        if 'unit' not in df.columns:
-            df['unit'] = 'szt.'
-        if 'purchase_price_net' not in df.columns:
-            df['purchase_price_net'] = 0.0
-        if 'vat_rate' not in df.columns:
-            df['vat_rate'] = 23.0
-        
-        # Przetwórz dane
-        products = []
-        for _, row in df.iterrows():
-            # Pomiń puste wiersze
-            if pd.isna(row['code']) or str(row['code']).strip() == '':
-                continue
-            
-            product = {
-                'code': str(row['code']).strip(),
-                'name': str(row['name']).strip() if not pd.isna(row['name']) else '',
-                'unit': str(row['unit']).strip() if not pd.isna(row['unit']) else 'szt.',
-                'purchase_price_net': DataImporter.parse_price_value(row['purchase_price_net']),
-                'vat_rate': DataImporter.parse_vat_rate(row['vat_rate']),
-                'category_id': category_id
-            }
-            
-            products.append(product)
-        
-        return products
+        return renamed_columns
     
     @staticmethod
     def validate_import_file(file_path: str) -> Dict[str, any]:
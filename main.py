@@ -3,17 +3,36 @@ Ofertomat 2.0 - Aplikacja do zarządzania ofertami handlowymi
 Interfejs GUI w CustomTkinter
 """
 
+import time
+
+# Początek pomiaru czasu startu (importy + budowa okna) - patrz startup_report.py
+STARTUP_START = time.perf_counter()
+
 import customtkinter as ctk
 from tkinter import messagebox, filedialog
+import json
 import os
+import re
 import threading
 from typing import List, Dict, Optional
 from datetime import datetime
 
-# Importy modułów backendu
+# Importy modułów backendu (pandas i reportlab ładują usługi przy pierwszym użyciu)
 from database import Database
-from importer import DataImporter
-from pdf_generator import PDFGenerator
+from db_instrumentation import DatabaseInstrumentation
+from offer_draft import OfferDraft, DraftAutosave
+from op_profiler import OperationProfiler, profiled
+from services import CatalogImportError, CatalogService, OfferService
+from startup_snapshot import build_snapshot, is_current, load_snapshot, save_snapshot, snapshot_path
+from ui_watchdog import StallWatchdog
+
+STARTUP_IMPORTS_DONE = time.perf_counter()
+
+# Opóźnienie wstępnego ładowania pandas/reportlab po pierwszym wyświetleniu okna
+WARMUP_DELAY_MS = 500
+
+# Rozmiar okna przy pierwszym uruchomieniu (potem przywracany z migawki startowej)
+DEFAULT_GEOMETRY = "1400x800"
 
 
 class App(ctk.CTk):
@@ -22,14 +41,37 @@ class App(ctk.CTk):
     def __init__(self):
         super().__init__()
         
-        # Inicjalizacja backendu
-        self.db = Database("ofertomat.db")
-        self.importer = DataImporter()
-        self.pdf_gen = PDFGenerator()
+        # Inicjalizacja backendu (instrumentacja bazy tylko gdy OFERTOMAT_DB_PROFILE=1)
+        self.db_instrumentation = DatabaseInstrumentation.from_env()
+        # OFERTOMAT_DB - inna baza (np. kopia robocza w pomiarach startup_report.py)
+        self.db = Database(os.environ.get('OFERTOMAT_DB', "ofertomat.db"), instrumentation=self.db_instrumentation)
+        # DataImporter (pandas) i PDFGenerator (reportlab) powstają przy pierwszym imporcie/PDF
+        # albo wcześniej w tle (warm_up_backends) - okno nie czeka na ich import
+        self.catalog_service = CatalogService(self.db)
+        self.offer_service = OfferService(self.db)
+        # Autozapisy otwartych kreatorów ofert - ich szkiców inne okna nie usuwają ani nie przywracają
+        self.open_autosaves = set()
+        self.startup_times = {'imports_s': round(STARTUP_IMPORTS_DONE - STARTUP_START, 3)}
+        
+        # Migawka poprzedniej sesji (pierwsza strona produktów, stan okna) - wyłączana OFERTOMAT_STARTUP_SNAPSHOT=0
+        self.snapshot_path = snapshot_path(self.db.db_path)
+        self.startup_snapshot = None
+        if os.environ.get('OFERTOMAT_STARTUP_SNAPSHOT', '1').lower() not in ('0', 'false', 'no', 'nie'):
+            self.startup_snapshot = load_snapshot(self.snapshot_path, self.db.db_path)
+        self.showing_snapshot = False  # True dopóki tabela pokazuje dane z migawki
+        
+        # Profilowanie operacji GUI (cProfile + tracemalloc) tylko gdy OFERTOMAT_PROFILE=1
+        self.profiler = OperationProfiler.from_env()
+        if self.profiler:
+            self.profiler.wrap(self, ('update_pagination',))
+            self.profiler.wrap(self.catalog_service, ('import_file',))
+            self.profiler.wrap(self.offer_service, ('render_draft_pdf', 'render_offer_pdf'))
         
         # Konfiguracja okna głównego
         self.title("Ofertomat 2.0 - Zarządzanie Ofertami")
-        self.geometry("1400x800")
+        self.geometry(DEFAULT_GEOMETRY)
+        if self.startup_snapshot:
+            self.restore_window_state(self.startup_snapshot['window'])
         
         # Ustawienie motywu Dark Mode
         ctk.set_appearance_mode("dark")
@@ -50,8 +92,132 @@ class App(ctk.CTk):
         # Budowanie interfejsu
         self.setup_ui()
         
-        # Ładowanie początkowych danych
-        self.load_products()
+        # Zamknięcie okna - checkpoint WAL przed wyjściem
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+        
+        # Zrzut statystyk bazy danych do zgłoszenia błędu (Ctrl+Shift+D)
+        if self.db_instrumentation:
+            self.bind('<Control-Shift-D>', lambda e: self.dump_db_profile())
+        
+        # Wykrywanie zawieszeń interfejsu (próbki stosu wątku głównego) tylko gdy OFERTOMAT_UI_WATCHDOG=1
+        self.ui_watchdog = StallWatchdog.from_env(self)
+        if self.ui_watchdog:
+            self.ui_watchdog.start()
+        
+        # Ładowanie początkowych danych - z migawki od razu, zgodność z bazą sprawdzana w tle
+        if not self.show_startup_snapshot():
+            self.load_products()
+        
+        self.startup_times['app_init_s'] = round(time.perf_counter() - STARTUP_START, 3)
+        self.after_idle(self.on_first_paint)
+    
+    def on_first_paint(self):
+        """Pierwsze wyświetlenie okna: czas startu, potem ładowanie modułów importu/PDF w tle"""
+        self.update_idletasks()
+        self.startup_times['first_window_s'] = round(time.perf_counter() - STARTUP_START, 3)
+        
+        # Uruchomienie pomiarowe (startup_report.py): zapisz czasy i zamknij okno
+        if os.environ.get('OFERTOMAT_STARTUP_PROBE'):
+            log_dir = os.environ.get('OFERTOMAT_DIAGNOSTICS_DIR', 'diagnostics')
+            os.makedirs(log_dir, exist_ok=True)
+            with open(os.path.join(log_dir, "startup.jsonl"), 'a', encoding='utf-8') as f:
+                f.write(json.dumps({'at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                                    **self.startup_times}) + "\n")
+            self.after(0, self.on_close)
+            return
+        
+        if self.showing_snapshot:
+            self.reconcile_startup_snapshot()
+        
+        if os.environ.get('OFERTOMAT_WARMUP', '1').lower() not in ('0', 'false', 'no', 'nie'):
+            self.after(WARMUP_DELAY_MS, self.warm_up_backends)
+    
+    def warm_up_backends(self):
+        """Importuje pandas i reportlab w tle, zanim użytkownik sięgnie po import lub PDF"""
+        def warm_up():
+            start = time.perf_counter()
+            try:
+                self.catalog_service.importer
+                self.offer_service.pdf_generator
+            except Exception as e:
+                print(f"Wstępne ładowanie modułów importu/PDF nie powiodło się: {e}")
+                return
+            self.startup_times['warmup_s'] = round(time.perf_counter() - start, 3)
+        
+        threading.Thread(target=warm_up, name="backend-warmup", daemon=True).start()
+    
+    def restore_window_state(self, window: Dict):
+        """Przywraca rozmiar, położenie i maksymalizację okna z poprzedniej sesji"""
+        match = re.match(r'(\d+)x(\d+)\+(-?\d+)\+(-?\d+)$', window.get('geometry', ''))
+        if not match:
+            return
+        width, height, x, y = (int(value) for value in match.groups())
+        screen_width, screen_height = self.winfo_screenwidth(), self.winfo_screenheight()
+        width, height = min(width, screen_width), min(height, screen_height)
+        # Położenie tylko gdy okno będzie widoczne (np. odłączony drugi monitor)
+        if -width // 2 < x < screen_width - 100 and 0 <= y < screen_height - 100:
+            self.geometry(f"{width}x{height}+{x}+{y}")
+        else:
+            self.geometry(f"{width}x{height}")
+        if window.get('state') == 'zoomed':
+            try:
+                self.state('zoomed')
+            except Exception:
+                pass  # Brak stanu 'zoomed' w menedżerach okien X11
+    
+    def show_startup_snapshot(self) -> bool:
+        """Wyświetla pierwszą stronę produktów z migawki; False gdy brak pasującej migawki"""
+        snapshot = self.startup_snapshot
+        if not snapshot or snapshot['page_size'] != self.items_per_page:
+            return False
+        self.current_page = 0
+        self.show_products_page(snapshot['products'], snapshot['total_products'])
+        self.showing_snapshot = True
+        return True
+    
+    def reconcile_startup_snapshot(self):
+        """Porównuje w tle licznik zmian bazy z migawką - nieaktualne dane zastępuje danymi z bazy"""
+        snapshot = self.startup_snapshot
+        
+        def reload():
+            # Po zmianie strony lub wyszukiwaniu tabela pokazuje już dane z bazy
+            if self.showing_snapshot:
+                self.load_products()
+        
+        def check():
+            if not is_current(snapshot, self.db):
+                self.after(0, reload)
+        
+        threading.Thread(target=check, name="snapshot-reconcile", daemon=True).start()
+    
+    def save_startup_snapshot(self):
+        """Zapisuje migawkę pierwszego ekranu i stan okna na potrzeby następnego startu"""
+        window = {'geometry': self.geometry(), 'state': self.state()}
+        try:
+            snapshot = build_snapshot(self.db, self.items_per_page, window)
+        except Exception as e:
+            print(f"Nie można przygotować migawki startowej: {e}")
+            return
+        save_snapshot(self.snapshot_path, snapshot)
+    
+    def on_close(self):
+        """Zamyka aplikację (zapisuje migawkę startową, porządkuje plik WAL bazy danych)"""
+        if self.ui_watchdog:
+            self.ui_watchdog.stop()
+            path = self.ui_watchdog.dump()
+            if path:
+                print(f"Zawieszenia interfejsu: {len(self.ui_watchdog.stalls)}, stosy zapisane w {path}")
+        self.save_startup_snapshot()
+        self.db.close()
+        self.destroy()
+    
+    def dump_db_profile(self):
+        """Zapisuje statystyki zapytań do pliku JSON w katalogu diagnostyki"""
+        try:
+            path = self.db_instrumentation.dump()
+            messagebox.showinfo("Diagnostyka", f"Zapisano statystyki bazy danych:\n{os.path.abspath(path)}")
+        except Exception as e:
+            messagebox.showerror("Błąd", f"Nie można zapisać statystyk:\n{str(e)}")
     
     def setup_ui(self):
         """Buduje kompletny interfejs użytkownika"""
@@ -395,37 +561,41 @@ class App(ctk.CTk):
                 page_size=self.items_per_page,
                 search_query=search_query
             )
-            
-            self.total_products = total_products
-            
-            # Oblicz liczbę stron
-            self.total_pages = max(1, (total_products + self.items_per_page - 1) // self.items_per_page)
-            
-            # Upewnij się że current_page jest w zakresie
-            if self.current_page >= self.total_pages:
-                self.current_page = self.total_pages - 1
-            if self.current_page < 0:
-                self.current_page = 0
-            
-            # Zaktualizuj licznik produktów
-            self.info_label.configure(text=f"Produkty: {total_products}")
-            
-            # Aktualizuj label paginacji
-            self.page_info_label.configure(
-                text=f"Strona {self.current_page + 1} z {self.total_pages} (wyświetlane: {len(page_products)} z {total_products})"
-            )
-            
-            # Aktualizuj stan przycisków
-            self.prev_btn.configure(state="normal" if self.current_page > 0 else "disabled")
-            self.next_btn.configure(state="normal" if self.current_page < self.total_pages - 1 else "disabled")
-            
-            # Wyświetl produkty dla bieżącej strony
-            start_idx = self.current_page * self.items_per_page
-            self.display_products(page_products, start_idx)
+            self.showing_snapshot = False
+            self.show_products_page(page_products, total_products)
             
         except Exception as e:
             messagebox.showerror("Błąd", f"Nie można załadować danych:\n{str(e)}")
     
+    def show_products_page(self, page_products: List[Dict], total_products: int):
+        """Wyświetla stronę produktów i aktualizuje licznik oraz przyciski paginacji"""
+        self.total_products = total_products
+        
+        # Oblicz liczbę stron
+        self.total_pages = max(1, (total_products + self.items_per_page - 1) // self.items_per_page)
+        
+        # Upewnij się że current_page jest w zakresie
+        if self.current_page >= self.total_pages:
+            self.current_page = self.total_pages - 1
+        if self.current_page < 0:
+            self.current_page = 0
+        
+        # Zaktualizuj licznik produktów
+        self.info_label.configure(text=f"Produkty: {total_products}")
+        
+        # Aktualizuj label paginacji
+        self.page_info_label.configure(
+            text=f"Strona {self.current_page + 1} z {self.total_pages} (wyświetlane: {len(page_products)} z {total_products})"
+        )
+        
+        # Aktualizuj stan przycisków
+        self.prev_btn.configure(state="normal" if self.current_page > 0 else "disabled")
+        self.next_btn.configure(state="normal" if self.current_page < self.total_pages - 1 else "disabled")
+        
+        # Wyświetl produkty dla bieżącej strony
+        start_idx = self.current_page * self.items_per_page
+        self.display_products(page_products, start_idx)
+    
     def previous_page(self):
         """Przechodzi do poprzedniej strony"""
         if self.current_page > 0:
@@ -607,21 +777,11 @@ class App(ctk.CTk):
                     category_id = cat['id']
                     break
             
-            # Zmień kategorię dla zaznaczonych produktów w bazie
-            success_count = 0
-            for product in self.selected_items:
-                # Aktualizuj w bazie danych
-                success = self.db.update_product(
-                    product['id'],
-                    None,  # kod
-                    product['name'],
-                    product['unit'],
-                    product['purchase_price_net'],
-                    product['vat_rate'],
-                    category_id
-                )
-                if success:
-                    success_count += 1
+            # Zmień kategorię dla zaznaczonych produktów w bazie (jedno zapytanie)
+            success_count = self.db.move_products_to_category(
+                [product['id'] for product in self.selected_items],
+                category_id
+            )
             
             cat_dialog.destroy()
             
@@ -1042,8 +1202,11 @@ class App(ctk.CTk):
         
         # Zmienne stanu
         offer_title_var = ctk.StringVar(value="Oferta handlowa")
-        selected_offer_items = []  # Lista wybranych produktów do oferty
-        category_order_list = []  # Kolejność kategorii
+        offer_draft = OfferDraft()  # Model oferty - wszystkie zmiany przez jego metody (autozapis)
+        selected_offer_items = offer_draft.items  # Lista wybranych produktów do oferty
+        category_order_list = offer_draft.category_order  # Kolejność kategorii
+        autosave = [None]  # DraftAutosave bieżącego szkicu (lista dla nonlocal)
+        saved_offer_id = [existing_offer_id]  # Oferta w bazie, którą aktualizuje "Zapisz szablon"
         search_job_offer = [None]  # Job ID dla debounce wyszukiwania w generatorze ofert (lista dla nonlocal)
         
         # === GÓRNY PANEL: Tytuł i przyciski akcji ===
@@ -1074,6 +1237,29 @@ class App(ctk.CTk):
         actions_frame = ctk.CTkFrame(top_frame, fg_color="transparent")
         actions_frame.pack(side="right", padx=10, pady=10)
         
+        def attach_autosave(draft_autosave):
+            """Podpina dziennik autozapisu do modelu i rejestruje szkic jako używany przez to okno"""
+            autosave[0] = draft_autosave
+            offer_draft.add_listener(draft_autosave)
+            self.open_autosaves.add(draft_autosave)
+        
+        def start_autosave(source_offer_id):
+            """Podpina dziennik autozapisu - szkic (odnośnik do oferty + dziennik) powstaje przy pierwszej zmianie"""
+            attach_autosave(DraftAutosave(self.db, title=offer_draft.title, source_offer_id=source_offer_id))
+        
+        def stop_autosave(discard):
+            """Kończy autozapis (zapisuje operacje z kolejki); discard=True usuwa szkic"""
+            if autosave[0] is not None:
+                offer_draft.remove_listener(autosave[0])
+                self.open_autosaves.discard(autosave[0])
+                autosave[0].close(discard=discard)
+                autosave[0] = None
+        
+        def close_creator():
+            """Zamknięcie okna - szkic zostaje tylko gdy są niezapisane zmiany"""
+            stop_autosave(discard=autosave[0] is not None and autosave[0].operations == 0)
+            creator.destroy()
+        
         def save_as_template():
             """Zapisuje ofertę jako szablon bez generowania PDF"""
             title = offer_title_var.get().strip() or "Oferta handlowa"
@@ -1082,32 +1268,16 @@ class App(ctk.CTk):
                 messagebox.showwarning("Uwaga", "Dodaj produkty do oferty!")
                 return
             
-            # Przygotuj dane
-            items_to_save = []
-            cat_order = {cat: idx for idx, cat in enumerate(category_order_list)}
-            
-            for item in selected_offer_items:
-                items_to_save.append({
-                    'product_id': item.get('id'),
-                    'name': item['name'],
-                    'category_name': item.get('category_name', 'Bez kategorii'),
-                    'unit': item.get('unit', 'szt.'),
-                    'purchase_price_net': item.get('purchase_price_net', 0),
-                    'vat_rate': item.get('vat_rate', 23),
-                    'margin': item.get('margin', item.get('default_margin', 30.0)),
-                    'quantity': 1.0
-                })
-            
-            # Zapisz
-            if existing_offer_id:
-                success = self.db.update_offer(existing_offer_id, title, items_to_save, cat_order)
-                msg = "Szablon został zaktualizowany!"
-            else:
-                offer_id = self.db.save_offer(title, items_to_save, cat_order)
-                success = offer_id > 0
-                msg = "Szablon został zapisany!"
+            # Zapisz (aktualizacja istniejącej oferty albo nowa)
+            offer_id = self.offer_service.save_offer(offer_draft, title, saved_offer_id[0])
+            msg = "Szablon został zaktualizowany!" if saved_offer_id[0] else "Szablon został zapisany!"
             
-            if success:
+            if offer_id:
+                # Kolejny zapis aktualizuje tę samą ofertę zamiast tworzyć nową
+                saved_offer_id[0] = offer_id
+                # Zmiany są w bazie - nowy szkic (zakładany przy pierwszej zmianie) względem zapisanej oferty
+                stop_autosave(discard=True)
+                start_autosave(offer_id)
                 messagebox.showinfo("Sukces", msg)
             else:
                 messagebox.showerror("Błąd", "Nie udało się zapisać szablonu.")
@@ -1180,20 +1350,10 @@ class App(ctk.CTk):
             def pdf_generation_task():
                 """Zadanie generowania PDF wykonywane w tle"""
                 try:
-                    business_card = self.db.get_business_card()
-                    cat_order = {cat: idx for idx, cat in enumerate(category_order_list)}
-                    
-                    offer_data = {
-                        'title': title,
-                        'date': datetime.now().strftime('%d.%m.%Y'),
-                        'items': selected_offer_items,
-                        'business_card': business_card,
-                        'category_order': cat_order
-                    }
-                    
                     # Generuj PDF z progress callback
-                    success = self.pdf_gen.generate_offer_pdf(
-                        offer_data, 
+                    success = self.offer_service.render_draft_pdf(
+                        offer_draft,
+                        title,
                         save_path,
                         progress_callback=update_progress if len(selected_offer_items) > 200 else None
                     )
@@ -1209,6 +1369,7 @@ class App(ctk.CTk):
                             if messagebox.askyesno("Zapisać szablon?", "PDF wygenerowano!\n\nCzy zapisać tę ofertę jako szablon do bazy?"):
                                 save_as_template()
                             messagebox.showinfo("Sukces", f"PDF wygenerowano:\n{save_path}")
+                            stop_autosave(discard=True)
                             creator.destroy()
                         else:
                             messagebox.showerror("Błąd", "Nie udało się wygenerować PDF.")
@@ -1449,6 +1610,7 @@ class App(ctk.CTk):
         # Podłącz callback do pola wyszukiwania
         search_var.trace_add('write', on_search_change)
         
+        @profiled(self.profiler, 'select_category')
         def select_category(category, keep_search=False):
             """Wyświetla produkty wybranej kategorii z optymalizacją dla dużych zbiorów"""
             nonlocal current_category_products
@@ -1479,6 +1641,23 @@ class App(ctk.CTk):
             # Wyświetl produkty z aktualnym filtrem wyszukiwania
             display_filtered_products(search_var.get())
         
+        def add_products_from_list(products):
+            """
+            Dodaje produkty z listy środkowej (cała kategoria albo wynik wyszukiwania w niej)
+            
+            Produkty trafiają do szkicu w bazie jednym INSERT ... SELECT (OfferService.add_category),
+            model dostaje je odczytane ze szkicu. Bez szkicu - dodawanie w samym modelu.
+            """
+            draft_id = autosave[0].sync() if autosave[0] is not None else None
+            if not draft_id:
+                return self.offer_service.add_products(offer_draft, products)
+            whole_category = not search_var.get().strip()
+            return self.offer_service.add_category(
+                offer_draft, selected_category_id[0], draft_id=draft_id,
+                product_ids=None if whole_category else [product['id'] for product in products]
+            )
+        
+        @profiled(self.profiler, 'add_all_products_from_category')
         def add_all_products_from_category(products):
             """Dodaje wszystkie produkty z kategorii do oferty z progress bar"""
             if len(products) > 100:
@@ -1510,33 +1689,14 @@ class App(ctk.CTk):
                 
                 progress_dialog.update()
                 
-                # Dodawanie w batch'ach
-                added = []
-                already_in = []
-                batch_size = 50
+                # Dodawanie jednym INSERT ... SELECT w szkicu (sprawdzanie duplikatów po stronie bazy)
+                added_items, already_items = add_products_from_list(products)
+                added = [item['name'] for item in added_items]
+                already_in = [product['name'] for product in already_items]
                 
-                for i, product in enumerate(products):
-                    # Sprawdź czy produkt już jest w ofercie
-                    if any(item.get('id') == product['id'] for item in selected_offer_items):
-                        already_in.append(product['name'])
-                    else:
-                        # Dodaj produkt
-                        product_copy = product.copy()
-                        product_copy['margin'] = product.get('default_margin', 30.0)
-                        selected_offer_items.append(product_copy)
-                        added.append(product['name'])
-                        
-                        # Dodaj kategorię do kolejności jeśli jeszcze nie ma
-                        cat_name = product.get('category_name', 'Bez kategorii')
-                        if cat_name not in category_order_list:
-                            category_order_list.append(cat_name)
-                    
-                    # Aktualizuj progress co batch_size
-                    if (i + 1) % batch_size == 0 or i == len(products) - 1:
-                        progress = (i + 1) / len(products)
-                        progress_bar.set(progress)
-                        progress_label.configure(text=f"{int(progress * 100)}%")
-                        progress_dialog.update()
+                progress_bar.set(1)
+                progress_label.configure(text="100%")
+                progress_dialog.update()
                 
                 # Zmień tytuł na renderowanie
                 progress_label.configure(text="Renderowanie widoku...")
@@ -1577,21 +1737,9 @@ class App(ctk.CTk):
                 
             else:
                 # Standardowe dodawanie dla małych zbiorów
-                added = []
-                already_in = []
-                
-                for product in products:
-                    if any(item.get('id') == product['id'] for item in selected_offer_items):
-                        already_in.append(product['name'])
-                    else:
-                        product_copy = product.copy()
-                        product_copy['margin'] = product.get('default_margin', 30.0)
-                        selected_offer_items.append(product_copy)
-                        added.append(product['name'])
-                        
-                        cat_name = product.get('category_name', 'Bez kategorii')
-                        if cat_name not in category_order_list:
-                            category_order_list.append(cat_name)
+                added_items, already_items = add_products_from_list(products)
+                added = [item['name'] for item in added_items]
+                already_in = [product['name'] for product in already_items]
                 
                 # Dla małych zbiorów - standardowe odświeżanie
                 refresh_offer_items()
@@ -1686,23 +1834,14 @@ class App(ctk.CTk):
                         category_id = cat['id']
                         break
                 
-                # Zmień kategorię dla zaznaczonych
-                for item in selected_items_for_category_change[:]:
-                    # Usuń ze starej kategorii w kolejności
-                    old_cat = item.get('category_name', 'Bez kategorii')
-                    
-                    # Zaktualizuj kategorię
-                    item['category_name'] = new_category
-                    item['category_id'] = category_id
-                    
-                    # Dodaj nową kategorię do kolejności jeśli nie ma
-                    if new_category not in category_order_list:
-                        category_order_list.append(new_category)
+                # Zmień kategorię dla zaznaczonych - jedna operacja (nowa kategoria trafia na koniec kolejności)
+                self.offer_service.change_category(offer_draft, selected_items_for_category_change,
+                                                   new_category, category_id)
                 
                 # Wyczyść zaznaczenie
                 selected_items_for_category_change.clear()
                 
-                # Odśwież widok
+                # Odśwież widok (jednokrotnie, po wszystkich zmianach)
                 refresh_offer_items()
                 
                 cat_dialog.destroy()
@@ -1759,9 +1898,7 @@ class App(ctk.CTk):
             
             if result:
                 # Usuń zaznaczone produkty z oferty
-                for item in selected_items_for_category_change[:]:
-                    if item in selected_offer_items:
-                        selected_offer_items.remove(item)
+                offer_draft.remove_items(selected_items_for_category_change)
                 
                 # Wyczyść zaznaczenie
                 selected_items_for_category_change.clear()
@@ -1790,27 +1927,92 @@ class App(ctk.CTk):
         )
         delete_selected_btn.pack(pady=(0, 5), padx=5, fill="x")
         
+        # Cofnij / ponów (Ctrl+Z / Ctrl+Y)
+        undo_frame = ctk.CTkFrame(right_panel, fg_color="transparent")
+        undo_frame.pack(pady=(0, 5), padx=5, fill="x")
+        
+        undo_btn = ctk.CTkButton(
+            undo_frame,
+            text="↶ Cofnij",
+            height=30,
+            font=ctk.CTkFont(size=12),
+            fg_color="gray30",
+            hover_color="gray40",
+            state="disabled",
+            command=lambda: undo_offer_change()
+        )
+        undo_btn.pack(side="left", expand=True, fill="x", padx=(0, 2))
+        
+        redo_btn = ctk.CTkButton(
+            undo_frame,
+            text="↷ Ponów",
+            height=30,
+            font=ctk.CTkFont(size=12),
+            fg_color="gray30",
+            hover_color="gray40",
+            state="disabled",
+            command=lambda: redo_offer_change()
+        )
+        redo_btn.pack(side="left", expand=True, fill="x", padx=(2, 0))
+        
         offer_items_scroll = ctk.CTkScrollableFrame(right_panel, fg_color="gray15")
         offer_items_scroll.pack(fill="both", expand=True, padx=5, pady=(0, 5))
         
+        def update_undo_buttons():
+            """Włącza/wyłącza przyciski cofania zależnie od historii zmian"""
+            undo_btn.configure(state="normal" if offer_draft.can_undo else "disabled")
+            redo_btn.configure(state="normal" if offer_draft.can_redo else "disabled")
+        
+        def apply_history_step(step):
+            """Odświeża widok po cofnięciu/ponowieniu - tylko sekcje zmienionych kategorii"""
+            if step is None:
+                return
+            # Zaznaczenie może wskazywać pozycje, których po cofnięciu nie ma w ofercie
+            present = {id(item) for item in selected_offer_items}
+            selected_items_for_category_change[:] = [
+                item for item in selected_items_for_category_change if id(item) in present
+            ]
+            refresh_offer_items(changed_categories=step['categories'])
+            
+            # Odśwież listę produktów w środkowej sekcji (dodane/usunięte produkty), zachowaj wyszukiwanie
+            if step['categories'] != set() and selected_category_id[0] is not None:
+                categories = self.db.get_categories()
+                for cat in categories:
+                    if cat['id'] == selected_category_id[0]:
+                        select_category(cat, keep_search=True)
+                        break
+        
+        def undo_offer_change():
+            """Cofa ostatnią zmianę oferty"""
+            apply_history_step(offer_draft.undo())
+        
+        def redo_offer_change():
+            """Ponawia ostatnio cofniętą zmianę oferty"""
+            apply_history_step(offer_draft.redo())
+        
+        def on_history_shortcut(action):
+            """Skróty Ctrl+Z / Ctrl+Y - pomijane podczas pisania w polach tekstowych"""
+            focused = creator.focus_get()
+            if focused is not None and focused.winfo_class() in ('Entry', 'Text'):
+                return None
+            action()
+            return "break"
+        
+        creator.bind('<Control-z>', lambda e: on_history_shortcut(undo_offer_change))
+        creator.bind('<Control-y>', lambda e: on_history_shortcut(redo_offer_change))
+        creator.bind('<Control-Shift-Z>', lambda e: on_history_shortcut(redo_offer_change))
+        
         def add_product_to_offer(product):
             """Dodaje produkt do oferty (prawy panel)"""
             # Sprawdź czy produkt już jest w ofercie
-            if any(item.get('id') == product['id'] for item in selected_offer_items):
+            if offer_draft.contains(product):
                 messagebox.showinfo("Info", f"Produkt '{product['name']}' już jest w ofercie!")
                 return
             
-            # Dodaj produkt
-            product_copy = product.copy()
-            product_copy['margin'] = product.get('default_margin', 30.0)
-            selected_offer_items.append(product_copy)
+            # Dodaj produkt (kategoria trafia do kolejności jeśli jeszcze jej nie ma)
+            added_items, _ = self.offer_service.add_products(offer_draft, [product])
             
-            # Dodaj kategorię do kolejności jeśli jeszcze nie ma
-            cat_name = product.get('category_name', 'Bez kategorii')
-            if cat_name not in category_order_list:
-                category_order_list.append(cat_name)
-            
-            refresh_offer_items()
+            refresh_offer_items(changed_categories={item['category_name'] for item in added_items})
             
             # Odśwież listę produktów w środkowej sekcji (ukryj dodany produkt), zachowaj wyszukiwanie
             if selected_category_id[0] is not None:
@@ -1823,8 +2025,8 @@ class App(ctk.CTk):
         
         def remove_product_from_offer(product):
             """Usuwa produkt z oferty"""
-            selected_offer_items.remove(product)
-            refresh_offer_items()
+            offer_draft.remove_items([product])
+            refresh_offer_items(changed_categories={product['category_name']})
             
             # Odśwież listę produktów w środkowej sekcji (pokaż usunięty produkt), zachowaj wyszukiwanie
             if selected_category_id[0] is not None:
@@ -1835,13 +2037,292 @@ class App(ctk.CTk):
                         select_category(cat, keep_search=True)
                         break
         
-        def refresh_offer_items():
-            """Odświeża listę wybranych produktów z optymalizacją dla dużych zbiorów"""
+        offer_sections = {}  # Widok szczegółowy: kategoria -> ramka sekcji (nagłówek + pozycje)
+        offer_view_mode = [None]  # 'empty' / 'summary' / 'details' - aktualnie wyrenderowany widok
+        
+        def render_category_header(section, cat_name, count):
+            """(Re)renderuje nagłówek sekcji kategorii - strzałki zależą od miejsca w kolejności"""
+            for widget in section.header_holder.winfo_children():
+                widget.destroy()
+            
+            cat_header = ctk.CTkFrame(section.header_holder, fg_color="#C8102E", height=40)
+            cat_header.pack(fill="x", pady=(10, 5), padx=5)
+            cat_header.pack_propagate(False)  # Wymuś stały rozmiar
+            
+            ctk.CTkLabel(
+                cat_header,
+                text=f"{cat_name} ({count})",
+                font=ctk.CTkFont(size=14, weight="bold"),
+                text_color="white"
+            ).pack(side="left", padx=10, pady=8)
+            
+            # Przyciski kolejności kategorii
+            cat_btn_frame = ctk.CTkFrame(cat_header, fg_color="transparent")
+            cat_btn_frame.pack(side="right", padx=5)
+            
+            idx = category_order_list.index(cat_name)
+            if idx > 0:
+                ctk.CTkButton(
+                    cat_btn_frame,
+                    text="⬆",
+                    width=30,
+                    height=25,
+                    fg_color="gray30",
+                    hover_color="gray40",
+                    command=lambda c=cat_name: move_category_up(c)
+                ).pack(side="left", padx=2)
+            
+            if idx < len(category_order_list) - 1:
+                ctk.CTkButton(
+                    cat_btn_frame,
+                    text="⬇",
+                    width=30,
+                    height=25,
+                    fg_color="gray30",
+                    hover_color="gray40",
+                    command=lambda c=cat_name: move_category_down(c)
+                ).pack(side="left", padx=2)
+        
+        def render_category_section(cat_name, cat_items):
+            """Tworzy sekcję kategorii (nagłówek + pozycje); pakowanie w kolejności - refresh_offer_items"""
+            BATCH_SIZE = 100  # Przetwarzaj po 100 produktów na raz
+            
+            section = ctk.CTkFrame(offer_items_scroll, fg_color="transparent")
+            section.header_holder = ctk.CTkFrame(section, fg_color="transparent")
+            section.header_holder.pack(fill="x")
+            render_category_header(section, cat_name, len(cat_items))
+            
+            # Produkty w kategorii - kompaktowy widok z batchingiem
+            for idx, item in enumerate(cat_items):
+                # Co BATCH_SIZE produktów - odśwież UI aby zapobiec zawieszeniu
+                if (idx + 1) % BATCH_SIZE == 0 and len(selected_offer_items) > 500:
+                    offer_items_scroll.update()
+                item_frame = ctk.CTkFrame(section, fg_color="gray25", height=35)
+                item_frame.pack(fill="x", pady=1, padx=5)
+                
+                # Wszystko w jednej linii
+                # Checkbox do zaznaczania
+                checkbox_var = ctk.BooleanVar(value=item in selected_items_for_category_change)
+                
+                def on_checkbox_change(itm=item, var=checkbox_var):
+                    if var.get():
+                        if itm not in selected_items_for_category_change:
+                            selected_items_for_category_change.append(itm)
+                    else:
+                        if itm in selected_items_for_category_change:
+                            selected_items_for_category_change.remove(itm)
+                
+                checkbox = ctk.CTkCheckBox(
+                    item_frame,
+                    text="",
+                    variable=checkbox_var,
+                    width=20,
+                    command=on_checkbox_change
+                )
+                checkbox.pack(side="left", padx=(3, 3), pady=3)
+                
+                # Kontener na nazwę i ceny
+                info_frame = ctk.CTkFrame(item_frame, fg_color="transparent")
+                info_frame.pack(side="left", fill="x", expand=True, padx=3)
+                
+                # Nazwa produktu (skrócona jeśli za długa)
+                name_text = item['name'] if len(item['name']) <= 30 else item['name'][:27] + "..."
+                name_label = ctk.CTkLabel(
+                    info_frame,
+                    text=name_text,
+                    font=ctk.CTkFont(size=10),
+                    anchor="w"
+                )
+                name_label.pack(side="left", padx=(0, 10))
+                
+                # Oblicz cenę netto po marży
+                purchase_price = item['purchase_price_net']
+                margin = item.get('margin', 30)
+                offer_price = purchase_price * (1 + margin / 100)
+                
+                # CENA NA OFERCIE - wyróżniona jako najważniejsza informacja
+                offer_price_label = ctk.CTkLabel(
+                    info_frame,
+                    text=f"➜ {offer_price:.2f} zł",
+                    font=ctk.CTkFont(size=12, weight="bold"),
+                    text_color="#3B8ED0"
+                )
+                offer_price_label.pack(side="left", padx=(0, 5))
+                
+                # Szczegóły pomocnicze (cena zakupu i marża)
+                detail_text = f"(zakup: {purchase_price:.2f} zł | M:{margin:.0f}%)"
+                detail_label = ctk.CTkLabel(
+                    info_frame,
+                    text=detail_text,
+                    font=ctk.CTkFont(size=8),
+                    text_color="gray60"
+                )
+                detail_label.pack(side="left", padx=2)
+                
+                # Przyciski - kompaktowe
+                btn_frame = ctk.CTkFrame(item_frame, fg_color="transparent")
+                btn_frame.pack(side="right", padx=2)
+                
+                # Przyciski kolejności produktu
+                if idx > 0:
+                    ctk.CTkButton(
+                        btn_frame,
+                        text="⬆",
+                        width=22,
+                        height=22,
+                        font=ctk.CTkFont(size=10),
+                        fg_color="gray30",
+                        hover_color="gray40",
+                        command=lambda c=cat_name, i=item: move_product_up_in_category(c, i)
+                    ).pack(side="left", padx=1)
+                
+                if idx < len(cat_items) - 1:
+                    ctk.CTkButton(
+                        btn_frame,
+                        text="⬇",
+                        width=22,
+                        height=22,
+                        font=ctk.CTkFont(size=10),
+                        fg_color="gray30",
+                        hover_color="gray40",
+                        command=lambda c=cat_name, i=item: move_product_down_in_category(c, i)
+                    ).pack(side="left", padx=1)
+                
+                # Przycisk edytuj
+                ctk.CTkButton(
+                    btn_frame,
+                    text="✏️",
+                    width=24,
+                    height=22,
+                    font=ctk.CTkFont(size=9),
+                    fg_color="gray30",
+                    hover_color="#3B8ED0",
+                    command=lambda i=item: edit_item_in_offer(i)
+                ).pack(side="left", padx=1)
+                
+                # Przycisk usuń
+                ctk.CTkButton(
+                    btn_frame,
+                    text="🗑️",
+                    width=24,
+                    height=22,
+                    font=ctk.CTkFont(size=9),
+                    fg_color="gray30",
+                    hover_color="#C8102E",
+                    command=lambda i=item: remove_product_from_offer(i)
+                ).pack(side="left", padx=1)
+            
+            return section
+        
+        DRAFT_WINDOW_SIZE = 50  # Pozycji w jednym oknie widoku sumarycznego
+        
+        def render_draft_window(holder, draft_id, cat_name, count, offset):
+            """Okno pozycji kategorii ze szkicu w bazie (get_draft_items) z przewijaniem porcjami"""
+            for widget in holder.winfo_children():
+                widget.destroy()
+            
+            rows = self.db.get_draft_items(draft_id, cat_name, offset, DRAFT_WINDOW_SIZE)
+            for number, row in enumerate(rows, start=offset + 1):
+                margin = row['margin'] if row['margin'] is not None else 30.0
+                offer_price = (row['purchase_price_net'] or 0) * (1 + margin / 100)
+                ctk.CTkLabel(
+                    holder,
+                    text=f"{number}. {row['name']}  ➜ {offer_price:.2f} zł (M:{margin:.0f}%)",
+                    font=ctk.CTkFont(size=10),
+                    anchor="w"
+                ).pack(fill="x")
+            
+            nav_frame = ctk.CTkFrame(holder, fg_color="transparent")
+            nav_frame.pack(fill="x", pady=(2, 6))
+            if offset > 0:
+                ctk.CTkButton(
+                    nav_frame,
+                    text="◀",
+                    width=30,
+                    height=22,
+                    fg_color="gray30",
+                    hover_color="gray40",
+                    command=lambda: render_draft_window(holder, draft_id, cat_name, count,
+                                                       max(0, offset - DRAFT_WINDOW_SIZE))
+                ).pack(side="left", padx=2)
+            ctk.CTkLabel(
+                nav_frame,
+                text=f"{offset + 1}-{offset + len(rows)} z {count}",
+                font=ctk.CTkFont(size=10),
+                text_color="gray60"
+            ).pack(side="left", padx=5)
+            if offset + len(rows) < count:
+                ctk.CTkButton(
+                    nav_frame,
+                    text="▶",
+                    width=30,
+                    height=22,
+                    fg_color="gray30",
+                    hover_color="gray40",
+                    command=lambda: render_draft_window(holder, draft_id, cat_name, count,
+                                                       offset + DRAFT_WINDOW_SIZE)
+                ).pack(side="left", padx=2)
+            ctk.CTkButton(
+                nav_frame,
+                text="Ukryj",
+                width=60,
+                height=22,
+                fg_color="gray30",
+                hover_color="gray40",
+                command=lambda: [widget.destroy() for widget in holder.winfo_children()]
+            ).pack(side="right", padx=2)
+        
+        @profiled(self.profiler, 'refresh_offer_items')
+        def refresh_offer_items(changed_categories=None):
+            """
+            Odświeża listę wybranych produktów z optymalizacją dla dużych zbiorów
+            
+            Args:
+                changed_categories: zbiór kategorii, których pozycje się zmieniły - w widoku
+                    szczegółowym renderowane są ponownie tylko ich sekcje (pozostałe są
+                    jedynie układane w kolejności). None = pełne odświeżenie.
+            """
+            update_undo_buttons()
+            
+            # Grupuj po kategoriach
+            items_by_category = {}
+            for item in selected_offer_items:
+                cat = item.get('category_name', 'Bez kategorii')
+                if cat not in items_by_category:
+                    items_by_category[cat] = []
+                items_by_category[cat].append(item)
+            
+            if not selected_offer_items:
+                view_mode = 'empty'
+            elif len(selected_offer_items) > 1000:
+                view_mode = 'summary'
+            else:
+                view_mode = 'details'
+            
+            # Częściowe odświeżenie widoku szczegółowego
+            if changed_categories is not None and view_mode == 'details' and offer_view_mode[0] == 'details':
+                for cat_name in list(offer_sections):
+                    if cat_name in changed_categories or cat_name not in items_by_category:
+                        offer_sections.pop(cat_name).destroy()
+                for section in offer_sections.values():
+                    section.pack_forget()
+                for cat_name in category_order_list:
+                    if cat_name not in items_by_category:
+                        continue
+                    if cat_name in offer_sections:
+                        render_category_header(offer_sections[cat_name], cat_name, len(items_by_category[cat_name]))
+                    else:
+                        offer_sections[cat_name] = render_category_section(cat_name, items_by_category[cat_name])
+                    offer_sections[cat_name].pack(fill="x")
+                return
+            
             # Wyczyść wszystkie widgety
             for widget in offer_items_scroll.winfo_children():
                 widget.destroy()
+            offer_sections.clear()
+            offer_view_mode[0] = view_mode
             
-            if not selected_offer_items:
+            if view_mode == 'empty':
                 ctk.CTkLabel(
                     offer_items_scroll,
                     text="Brak produktów\n\nDodaj produkty z lewej strony",
@@ -1851,15 +2332,7 @@ class App(ctk.CTk):
                 return
             
             # KRYTYCZNA OPTYMALIZACJA: Dla >1000 produktów - tylko widok sumaryczny
-            if len(selected_offer_items) > 1000:
-                # Grupuj po kategoriach
-                items_by_category = {}
-                for item in selected_offer_items:
-                    cat = item.get('category_name', 'Bez kategorii')
-                    if cat not in items_by_category:
-                        items_by_category[cat] = []
-                    items_by_category[cat].append(item)
-                
+            if view_mode == 'summary':
                 # Pokaż tylko podsumowanie
                 summary_frame = ctk.CTkFrame(offer_items_scroll, fg_color="gray20")
                 summary_frame.pack(fill="both", expand=True, padx=10, pady=10)
@@ -1872,7 +2345,7 @@ class App(ctk.CTk):
                 
                 ctk.CTkLabel(
                     summary_frame,
-                    text="⚠️ Zbyt duża liczba produktów do wyświetlenia szczegółów\n\nWidok szczegółowy dostępny dla ofert < 1000 pozycji",
+                    text=f"⚠️ Zbyt duża liczba produktów do wyświetlenia szczegółów\n\nWidok szczegółowy dostępny dla ofert < 1000 pozycji - tu pozycje kategorii\noglądasz porcjami po {DRAFT_WINDOW_SIZE} (Pokaż pozycje)",
                     font=ctk.CTkFont(size=12),
                     text_color="orange",
                     justify="center"
@@ -1888,16 +2361,44 @@ class App(ctk.CTk):
                     font=ctk.CTkFont(size=14, weight="bold")
                 ).pack(pady=10)
                 
-                for cat_name in category_order_list:
-                    if cat_name in items_by_category:
-                        count = len(items_by_category[cat_name])
-                        cat_label = ctk.CTkLabel(
-                            summary_text_frame,
-                            text=f"• {cat_name}: {count} produktów",
-                            font=ctk.CTkFont(size=12),
-                            anchor="w"
-                        )
-                        cat_label.pack(fill="x", padx=20, pady=2)
+                # Liczby i wartości kategorii z zapytania na szkicu w bazie, pozycje kategorii
+                # oglądane oknami (LIMIT/OFFSET) - widżety powstają tylko dla jednego okna
+                draft_id = autosave[0].sync() if autosave[0] is not None else None
+                if draft_id:
+                    draft_categories = self.db.get_draft_categories(draft_id)
+                else:
+                    draft_categories = [{'category_name': cat_name, 'items_count': len(items_by_category[cat_name]),
+                                         'total_net': None}
+                                        for cat_name in category_order_list if cat_name in items_by_category]
+                
+                for draft_category in draft_categories:
+                    if not draft_category['items_count']:
+                        continue
+                    cat_name, count = draft_category['category_name'], draft_category['items_count']
+                    cat_row = ctk.CTkFrame(summary_text_frame, fg_color="transparent")
+                    cat_row.pack(fill="x", padx=20, pady=2)
+                    
+                    total_text = f" | {draft_category['total_net']:.2f} zł netto" if draft_category['total_net'] is not None else ""
+                    ctk.CTkLabel(
+                        cat_row,
+                        text=f"• {cat_name}: {count} produktów{total_text}",
+                        font=ctk.CTkFont(size=12),
+                        anchor="w"
+                    ).pack(side="left")
+                    
+                    if draft_id:
+                        window_holder = ctk.CTkFrame(summary_text_frame, fg_color="transparent")
+                        window_holder.pack(fill="x", padx=30)
+                        ctk.CTkButton(
+                            cat_row,
+                            text="Pokaż pozycje",
+                            width=110,
+                            height=24,
+                            font=ctk.CTkFont(size=11),
+                            fg_color="gray30",
+                            hover_color="gray40",
+                            command=lambda h=window_holder, c=cat_name, n=count: render_draft_window(h, draft_id, c, n, 0)
+                        ).pack(side="right", padx=5)
                 
                 # Przyciski akcji
                 action_frame = ctk.CTkFrame(summary_frame, fg_color="transparent")
@@ -1933,235 +2434,42 @@ class App(ctk.CTk):
                 )
                 loading_label.pack(pady=50)
                 offer_items_scroll.update()
-                
-                # Wyczyść ponownie
-                for widget in offer_items_scroll.winfo_children():
-                    widget.destroy()
-            
-            # Grupuj po kategoriach
-            items_by_category = {}
-            for item in selected_offer_items:
-                cat = item.get('category_name', 'Bez kategorii')
-                if cat not in items_by_category:
-                    items_by_category[cat] = []
-                items_by_category[cat].append(item)
-            
-            # Wyświetl według kolejności kategorii z batchingiem
-            total_items = len(selected_offer_items)
-            items_processed = 0
-            BATCH_SIZE = 100  # Przetwarzaj po 100 produktów na raz
+                loading_label.destroy()
             
+            # Wyświetl według kolejności kategorii - każda kategoria w osobnej sekcji
             for cat_name in category_order_list:
                 if cat_name not in items_by_category:
                     continue
-                
-                # Nagłówek kategorii
-                cat_header = ctk.CTkFrame(offer_items_scroll, fg_color="#C8102E", height=40)
-                cat_header.pack(fill="x", pady=(10, 5), padx=5)
-                cat_header.pack_propagate(False)  # Wymuś stały rozmiar
-                
-                ctk.CTkLabel(
-                    cat_header,
-                    text=f"{cat_name} ({len(items_by_category[cat_name])})",
-                    font=ctk.CTkFont(size=14, weight="bold"),
-                    text_color="white"
-                ).pack(side="left", padx=10, pady=8)
-                
-                # Przyciski kolejności kategorii
-                cat_btn_frame = ctk.CTkFrame(cat_header, fg_color="transparent")
-                cat_btn_frame.pack(side="right", padx=5)
-                
-                idx = category_order_list.index(cat_name)
-                if idx > 0:
-                    ctk.CTkButton(
-                        cat_btn_frame,
-                        text="⬆",
-                        width=30,
-                        height=25,
-                        fg_color="gray30",
-                        hover_color="gray40",
-                        command=lambda c=cat_name: move_category_up(c)
-                    ).pack(side="left", padx=2)
-                
-                if idx < len(category_order_list) - 1:
-                    ctk.CTkButton(
-                        cat_btn_frame,
-                        text="⬇",
-                        width=30,
-                        height=25,
-                        fg_color="gray30",
-                        hover_color="gray40",
-                        command=lambda c=cat_name: move_category_down(c)
-                    ).pack(side="left", padx=2)
-                
-                # Produkty w kategorii - kompaktowy widok z batchingiem
-                for idx, item in enumerate(items_by_category[cat_name]):
-                    items_processed += 1
-                    
-                    # Co BATCH_SIZE produktów - odśwież UI aby zapobiec zawieszeniu
-                    if items_processed % BATCH_SIZE == 0 and total_items > 500:
-                        offer_items_scroll.update()
-                    item_frame = ctk.CTkFrame(offer_items_scroll, fg_color="gray25", height=35)
-                    item_frame.pack(fill="x", pady=1, padx=5)
-                    
-                    # Wszystko w jednej linii
-                    # Checkbox do zaznaczania
-                    checkbox_var = ctk.BooleanVar(value=item in selected_items_for_category_change)
-                    
-                    def on_checkbox_change(itm=item, var=checkbox_var):
-                        if var.get():
-                            if itm not in selected_items_for_category_change:
-                                selected_items_for_category_change.append(itm)
-                        else:
-                            if itm in selected_items_for_category_change:
-                                selected_items_for_category_change.remove(itm)
-                    
-                    checkbox = ctk.CTkCheckBox(
-                        item_frame,
-                        text="",
-                        variable=checkbox_var,
-                        width=20,
-                        command=on_checkbox_change
-                    )
-                    checkbox.pack(side="left", padx=(3, 3), pady=3)
-                    
-                    # Kontener na nazwę i ceny
-                    info_frame = ctk.CTkFrame(item_frame, fg_color="transparent")
-                    info_frame.pack(side="left", fill="x", expand=True, padx=3)
-                    
-                    # Nazwa produktu (skrócona jeśli za długa)
-                    name_text = item['name'] if len(item['name']) <= 30 else item['name'][:27] + "..."
-                    name_label = ctk.CTkLabel(
-                        info_frame,
-                        text=name_text,
-                        font=ctk.CTkFont(size=10),
-                        anchor="w"
-                    )
-                    name_label.pack(side="left", padx=(0, 10))
-                    
-                    # Oblicz cenę netto po marży
-                    purchase_price = item['purchase_price_net']
-                    margin = item.get('margin', 30)
-                    offer_price = purchase_price * (1 + margin / 100)
-                    
-                    # CENA NA OFERCIE - wyróżniona jako najważniejsza informacja
-                    offer_price_label = ctk.CTkLabel(
-                        info_frame,
-                        text=f"➜ {offer_price:.2f} zł",
-                        font=ctk.CTkFont(size=12, weight="bold"),
-                        text_color="#3B8ED0"
-                    )
-                    offer_price_label.pack(side="left", padx=(0, 5))
-                    
-                    # Szczegóły pomocnicze (cena zakupu i marża)
-                    detail_text = f"(zakup: {purchase_price:.2f} zł | M:{margin:.0f}%)"
-                    detail_label = ctk.CTkLabel(
-                        info_frame,
-                        text=detail_text,
-                        font=ctk.CTkFont(size=8),
-                        text_color="gray60"
-                    )
-                    detail_label.pack(side="left", padx=2)
-                    
-                    # Przyciski - kompaktowe
-                    btn_frame = ctk.CTkFrame(item_frame, fg_color="transparent")
-                    btn_frame.pack(side="right", padx=2)
-                    
-                    # Przyciski kolejności produktu
-                    if idx > 0:
-                        ctk.CTkButton(
-                            btn_frame,
-                            text="⬆",
-                            width=22,
-                            height=22,
-                            font=ctk.CTkFont(size=10),
-                            fg_color="gray30",
-                            hover_color="gray40",
-                            command=lambda c=cat_name, i=item: move_product_up_in_category(c, i)
-                        ).pack(side="left", padx=1)
-                    
-                    if idx < len(items_by_category[cat_name]) - 1:
-                        ctk.CTkButton(
-                            btn_frame,
-                            text="⬇",
-                            width=22,
-                            height=22,
-                            font=ctk.CTkFont(size=10),
-                            fg_color="gray30",
-                            hover_color="gray40",
-                            command=lambda c=cat_name, i=item: move_product_down_in_category(c, i)
-                        ).pack(side="left", padx=1)
-                    
-                    # Przycisk edytuj
-                    ctk.CTkButton(
-                        btn_frame,
-                        text="✏️",
-                        width=24,
-                        height=22,
-                        font=ctk.CTkFont(size=9),
-                        fg_color="gray30",
-                        hover_color="#3B8ED0",
-                        command=lambda i=item: edit_item_in_offer(i)
-                    ).pack(side="left", padx=1)
-                    
-                    # Przycisk usuń
-                    ctk.CTkButton(
-                        btn_frame,
-                        text="🗑️",
-                        width=24,
-                        height=22,
-                        font=ctk.CTkFont(size=9),
-                        fg_color="gray30",
-                        hover_color="#C8102E",
-                        command=lambda i=item: remove_product_from_offer(i)
-                    ).pack(side="left", padx=1)
+                offer_sections[cat_name] = render_category_section(cat_name, items_by_category[cat_name])
+                offer_sections[cat_name].pack(fill="x")
         
         def clear_all_offer_items():
             """Czyści wszystkie produkty z oferty"""
             if messagebox.askyesno("Potwierdzenie", f"Czy na pewno usunąć wszystkie {len(selected_offer_items)} produktów z oferty?"):
-                selected_offer_items.clear()
-                category_order_list.clear()
+                offer_draft.clear()
                 selected_items_for_category_change.clear()
                 refresh_offer_items()
                 messagebox.showinfo("Sukces", "Wyczyszczono ofertę!")
         
         def move_category_up(cat_name):
             """Przesuwa kategorię w górę"""
-            idx = category_order_list.index(cat_name)
-            if idx > 0:
-                category_order_list[idx], category_order_list[idx - 1] = category_order_list[idx - 1], category_order_list[idx]
-                refresh_offer_items()
+            if offer_draft.move_category(cat_name, -1):
+                refresh_offer_items(changed_categories=set())
         
         def move_category_down(cat_name):
             """Przesuwa kategorię w dół"""
-            idx = category_order_list.index(cat_name)
-            if idx < len(category_order_list) - 1:
-                category_order_list[idx], category_order_list[idx + 1] = category_order_list[idx + 1], category_order_list[idx]
-                refresh_offer_items()
+            if offer_draft.move_category(cat_name, 1):
+                refresh_offer_items(changed_categories=set())
         
         def move_product_up_in_category(cat_name, item):
             """Przesuwa produkt w górę w ramach kategorii"""
-            category_items = [i for i in selected_offer_items if i['category_name'] == cat_name]
-            idx = category_items.index(item)
-            if idx > 0:
-                # Znajdź indeksy w głównej liście
-                main_idx = selected_offer_items.index(item)
-                main_idx_prev = selected_offer_items.index(category_items[idx - 1])
-                # Zamień miejscami
-                selected_offer_items[main_idx], selected_offer_items[main_idx_prev] = selected_offer_items[main_idx_prev], selected_offer_items[main_idx]
-                refresh_offer_items()
+            if self.offer_service.move_item(offer_draft, item, -1):
+                refresh_offer_items(changed_categories={cat_name})
         
         def move_product_down_in_category(cat_name, item):
             """Przesuwa produkt w dół w ramach kategorii"""
-            category_items = [i for i in selected_offer_items if i['category_name'] == cat_name]
-            idx = category_items.index(item)
-            if idx < len(category_items) - 1:
-                # Znajdź indeksy w głównej liście
-                main_idx = selected_offer_items.index(item)
-                main_idx_next = selected_offer_items.index(category_items[idx + 1])
-                # Zamień miejscami
-                selected_offer_items[main_idx], selected_offer_items[main_idx_next] = selected_offer_items[main_idx_next], selected_offer_items[main_idx]
-                refresh_offer_items()
+            if self.offer_service.move_item(offer_draft, item, 1):
+                refresh_offer_items(changed_categories={cat_name})
         
         def edit_item_in_offer(item):
             """Edytuje wartości produktu w ofercie"""
@@ -2293,39 +2601,22 @@ class App(ctk.CTk):
                             new_category_id = cat['id']
                             break
                     
-                    # Sprawdź czy coś się zmieniło w bazie danych
-                    price_changed = abs(item['purchase_price_net'] - new_price) > 0.001
-                    category_changed = item.get('category_id') != new_category_id
-                    
-                    # Jeśli produkt ma ID, zaktualizuj w bazie danych
-                    if item.get('id') and (price_changed or category_changed):
-                        success = self.db.update_product(
-                            product_id=item['id'],
-                            code=item.get('code'),
-                            name=new_name,
-                            unit=item.get('unit', 'szt.'),
-                            purchase_price_net=new_price,
-                            vat_rate=new_vat,
-                            category_id=new_category_id
-                        )
-                        
-                        if success and category_changed:
-                            # Dodaj nową kategorię do kolejności jeśli jeszcze nie ma
-                            if new_category not in category_order_list:
-                                category_order_list.append(new_category)
-                    
-                    # Zaktualizuj wartości w ofercie (marża tylko dla tego produktu w ofercie)
-                    item['name'] = new_name
-                    item['purchase_price_net'] = new_price
-                    item['vat_rate'] = new_vat
-                    item['margin'] = new_margin
-                    item['category_name'] = new_category
-                    item['category_id'] = new_category_id
+                    # Zaktualizuj pozycję oferty (i produkt w bazie, jeśli zmieniła się cena lub kategoria)
+                    catalog_updated = self.offer_service.edit_item(
+                        offer_draft,
+                        item,
+                        name=new_name,
+                        purchase_price_net=new_price,
+                        vat_rate=new_vat,
+                        margin=new_margin,
+                        category_name=new_category,
+                        category_id=new_category_id
+                    )
                     
                     refresh_offer_items()
                     edit_dialog.destroy()
                     
-                    if item.get('id') and (price_changed or category_changed):
+                    if catalog_updated:
                         messagebox.showinfo("Sukces", "Wartości zostały zaktualizowane w ofercie i w bazie danych!")
                     else:
                         messagebox.showinfo("Sukces", "Wartości zostały zaktualizowane w ofercie!")
@@ -2393,12 +2684,45 @@ class App(ctk.CTk):
         
         # Jeśli edytujemy istniejącą ofertę
         if existing_offer_id:
-            offer = self.db.get_offer_by_id(existing_offer_id)
-            if offer:
-                offer_title_var.set(offer['title'])
-                selected_offer_items.extend(offer['items'])
-                category_order_list.extend(offer.get('category_order', {}).keys())
-                refresh_offer_items()
+            if self.offer_service.open_offer(existing_offer_id, offer_draft):
+                offer_title_var.set(offer_draft.title)
+        
+        # Niezapisane zmiany z poprzedniej sesji (np. po awarii) - szkic z dziennikiem autozapisu.
+        # Szkice otwartych okien (ta sama oferta edytowana w innym kreatorze) nie są ruszane -
+        # ich ID czytamy po liście szkiców, żeby objąć też szkic zakładany w tej chwili
+        drafts = self.db.get_drafts()
+        live_draft_ids = self.live_draft_ids()
+        drafts = [d for d in drafts
+                  if d['source_offer_id'] == existing_offer_id and d['id'] not in live_draft_ids]
+        restorable = [d for d in drafts if d['changes'] > 0]
+        restored_draft_id = None
+        if restorable and messagebox.askyesno(
+            "Przywrócić szkic?",
+            f"Znaleziono niezapisane zmiany tej oferty z {restorable[0]['modified_date']}.\n\n"
+            f"Czy przywrócić szkic?"
+        ):
+            if DraftAutosave.restore(self.db, restorable[0]['id'], offer_draft):
+                restored_draft_id = restorable[0]['id']
+                offer_title_var.set(offer_draft.title)
+        for draft in drafts:
+            if draft['id'] != restored_draft_id:
+                self.db.delete_draft(draft['id'])
+        
+        if restored_draft_id:
+            attach_autosave(DraftAutosave(self.db, restored_draft_id, source_offer_id=existing_offer_id))
+        else:
+            start_autosave(existing_offer_id)
+        offer_title_var.trace_add('write', lambda *args: offer_draft.set_title(offer_title_var.get().strip()))
+        # DraftAutosave scala kolejne zmiany tytułu - po wyjściu z pola trafiają do dziennika
+        title_entry.bind('<FocusOut>', lambda e: autosave[0] is not None and autosave[0].flush_title())
+        creator.protocol("WM_DELETE_WINDOW", close_creator)
+        
+        if offer_draft.items:
+            refresh_offer_items()
+    
+    def live_draft_ids(self) -> set:
+        """ID szkiców używanych przez otwarte kreatory ofert"""
+        return {draft_autosave.draft_id for draft_autosave in self.open_autosaves}
     
     def load_csv_file(self):
         """Otwiera okno wyboru pliku CSV i importuje dane"""
@@ -2472,9 +2796,9 @@ class App(ctk.CTk):
                     """Zadanie importu wykonywane w tle"""
                     try:
                         # Import danych (parsowanie i zapis do bazy)
-                        products = self.importer.import_from_file(file_path, category_id)
+                        result = self.catalog_service.import_file(file_path, category_id)
                         
-                        if not products:
+                        if not result['parsed']:
                             # Przywróć kursor i pokaż ostrzeżenie w głównym wątku
                             def show_warning():
                                 import_dialog.config(cursor="")
@@ -2485,8 +2809,7 @@ class App(ctk.CTk):
                             self.after(0, show_warning)
                             return
                         
-                        # Zapisz do bazy
-                        added, updated = self.db.import_products_batch(products)
+                        added, updated = result['added'], result['updated']
                         
                         # Przywróć kursor i pokaż wynik w głównym wątku
                         def show_success():
@@ -2509,11 +2832,17 @@ class App(ctk.CTk):
                         self.after(0, show_success)
                         
                     except Exception as e:
+                        # Porcje zapisane przed błędem zostają w bazie - komunikat
+                        # CatalogImportError podaje ich liczniki, tabela pokazuje zmiany
+                        partial = isinstance(e, CatalogImportError) and e.result['batches'] > 0
+                        
                         # Obsługa błędów w głównym wątku
                         def show_error():
                             import_dialog.config(cursor="")
                             self.config(cursor="")
                             messagebox.showerror("Błąd importu", f"Wystąpił błąd:\n{str(e)}")
+                            if partial:
+                                self.load_products()
                             import_dialog.destroy()
                         
                         self.after(0, show_error)
@@ -2624,6 +2953,30 @@ class App(ctk.CTk):
                 )
                 edit_btn.pack(side="left", padx=5)
                 
+                # Przycisk Duplikuj
+                clone_btn = ctk.CTkButton(
+                    btn_frame,
+                    text="📑 Duplikuj",
+                    width=100,
+                    height=30,
+                    fg_color="gray30",
+                    hover_color="gray35",
+                    command=lambda o=offer: clone_offer(o)
+                )
+                clone_btn.pack(side="left", padx=5)
+                
+                # Przycisk Aktualizuj ceny
+                reprice_btn = ctk.CTkButton(
+                    btn_frame,
+                    text="💲 Aktualizuj ceny",
+                    width=130,
+                    height=30,
+                    fg_color="gray30",
+                    hover_color="gray35",
+                    command=lambda o=offer: reprice_offer(o)
+                )
+                reprice_btn.pack(side="left", padx=5)
+                
                 # Przycisk Usuń
                 delete_btn = ctk.CTkButton(
                     btn_frame,
@@ -2784,6 +3137,28 @@ class App(ctk.CTk):
         )
         title_label.pack(pady=20)
         
+        # Wyszukiwanie i sortowanie
+        filter_frame = ctk.CTkFrame(offers_window, fg_color="transparent")
+        filter_frame.pack(fill="x", padx=20)
+        
+        offers_search_var = ctk.StringVar()
+        ctk.CTkEntry(
+            filter_frame,
+            textvariable=offers_search_var,
+            height=32,
+            placeholder_text="🔍 Szukaj po tytule..."
+        ).pack(side="left", fill="x", expand=True, padx=(0, 10))
+        
+        sort_labels = {"Ostatnio zmienione": 'modified', "Data utworzenia": 'created', "Tytuł": 'title'}
+        offers_sort_var = ctk.StringVar(value="Ostatnio zmienione")
+        ctk.CTkOptionMenu(
+            filter_frame,
+            variable=offers_sort_var,
+            values=list(sort_labels),
+            width=180,
+            command=lambda _: refresh_offers()
+        ).pack(side="right")
+        
         # Ramka z listą ofert
         list_frame = ctk.CTkFrame(offers_window)
         list_frame.pack(pady=10, padx=20, fill="both", expand=True)
@@ -2792,14 +3167,43 @@ class App(ctk.CTk):
         scroll_frame = ctk.CTkScrollableFrame(list_frame, fg_color="gray20")
         scroll_frame.pack(fill="both", expand=True, padx=5, pady=5)
         
+        # Stan stronicowania (słownik dla nonlocal)
+        offers_page_size = 30
+        offers_state = {'page': 0, 'total': 0, 'more_btn': None}
+        search_job_offers = [None]
+        
         def refresh_offers():
-            """Odświeża listę ofert"""
+            """Odświeża listę ofert - od pierwszej strony"""
             for widget in scroll_frame.winfo_children():
                 widget.destroy()
+            offers_state['page'] = 0
+            offers_state['more_btn'] = None
+            load_next_offers_page()
+        
+        def on_offers_search_change(*args):
+            """Wyszukiwanie ofert z debounce (300ms)"""
+            if search_job_offers[0] is not None:
+                offers_window.after_cancel(search_job_offers[0])
+            search_job_offers[0] = offers_window.after(300, refresh_offers)
+        
+        offers_search_var.trace_add('write', on_offers_search_change)
+        
+        def load_next_offers_page():
+            """Dokłada kolejną stronę ofert na końcu listy"""
+            search_job_offers[0] = None
+            if offers_state['more_btn'] is not None:
+                offers_state['more_btn'].destroy()
+                offers_state['more_btn'] = None
+            
+            offers_state['page'] += 1
+            offers, offers_state['total'] = self.db.list_offers(
+                page=offers_state['page'],
+                page_size=offers_page_size,
+                search=offers_search_var.get().strip(),
+                sort=sort_labels.get(offers_sort_var.get(), 'modified')
+            )
             
-            offers = self.db.get_saved_offers()
-            
-            if not offers:
+            if not offers and offers_state['page'] == 1:
                 empty_label = ctk.CTkLabel(
                     scroll_frame,
                     text="Brak zapisanych ofert",
@@ -2809,6 +3213,23 @@ class App(ctk.CTk):
                 empty_label.pack(pady=50)
                 return
             
+            show_offers(offers)
+            
+            # Kolejne strony ładowane dopiero na żądanie
+            loaded = min(offers_state['page'] * offers_page_size, offers_state['total'])
+            if loaded < offers_state['total']:
+                offers_state['more_btn'] = ctk.CTkButton(
+                    scroll_frame,
+                    text=f"⬇️ Pokaż kolejne ({loaded} z {offers_state['total']})",
+                    height=30,
+                    fg_color="gray30",
+                    hover_color="gray35",
+                    command=load_next_offers_page
+                )
+                offers_state['more_btn'].pack(pady=10)
+        
+        def show_offers(offers):
+            """Tworzy wiersze dla podanych ofert"""
             for offer in offers:
                 offer_frame = ctk.CTkFrame(scroll_frame, fg_color="gray25")
                 offer_frame.pack(fill="x", pady=5, padx=5)
@@ -2822,10 +3243,13 @@ class App(ctk.CTk):
                 )
                 title_label.pack(side="top", anchor="w", padx=10, pady=(10, 5))
                 
-                # Data
+                # Data, liczba pozycji i wartość
                 date_label = ctk.CTkLabel(
                     offer_frame,
-                    text=f"Utworzono: {offer['created_date']} | Zmodyfikowano: {offer['modified_date']}",
+                    text=(f"Utworzono: {offer['created_date']} | Zmodyfikowano: {offer['modified_date']}\n"
+                          f"Pozycji: {offer['items_count']} | Netto: {offer['total_net']:.2f} zł | "
+                          f"Brutto: {offer['total_gross']:.2f} zł"),
+                    justify="left",
                     font=ctk.CTkFont(size=11),
                     text_color="gray",
                     anchor="w"
@@ -2942,19 +3366,9 @@ class App(ctk.CTk):
             def generate_task():
                 """Zadanie generowania wykonywane w tle"""
                 try:
-                    # Przygotuj dane oferty
-                    business_card = self.db.get_business_card()
-                    offer_data = {
-                        'title': full_offer['title'],
-                        'date': datetime.now().strftime('%d.%m.%Y'),
-                        'items': full_offer['items'],
-                        'business_card': business_card,
-                        'category_order': full_offer.get('category_order', {})
-                    }
-                    
                     # Generuj PDF z progress callback
-                    success = self.pdf_gen.generate_offer_pdf(
-                        offer_data, 
+                    success = self.offer_service.render_offer_pdf(
+                        full_offer,
                         save_path,
                         progress_callback=update_progress if items_count > 200 else None
                     )
@@ -2982,6 +3396,48 @@ class App(ctk.CTk):
             thread = threading.Thread(target=generate_task, daemon=True)
             thread.start()
         
+        def clone_offer(offer):
+            """Tworzy kopię oferty (np. nową ofertę z szablonu)"""
+            dialog = ctk.CTkInputDialog(
+                title="Duplikuj ofertę",
+                text=f"Tytuł nowej oferty (kopia '{offer['title']}'):"
+            )
+            new_title = dialog.get_input()
+            if new_title is None:
+                return
+            
+            if self.db.clone_offer(offer['id'], new_title.strip() or None):
+                refresh_offers()
+            else:
+                messagebox.showerror("Błąd", "Nie udało się skopiować oferty!")
+        
+        def reprice_offer(offer):
+            """Aktualizuje ceny zakupu w ofercie do bieżących cen katalogowych (z podglądem)"""
+            changes = self.db.preview_reprice_offer(offer['id'])
+            if not changes:
+                messagebox.showinfo("Aktualne ceny", "Wszystkie ceny w ofercie są zgodne z katalogiem.")
+                return
+            
+            net_diff = sum(((line['new_net_unit'] or 0) - (line['old_net_unit'] or 0)) * (line['quantity'] or 1)
+                           for line in changes)
+            examples = "\n".join(
+                f"• {line['name']}: {line['old_price'] or 0:.2f} → {line['new_price']:.2f} zł"
+                for line in changes[:10]
+            )
+            more = f"\n... i {len(changes) - 10} kolejnych" if len(changes) > 10 else ""
+            if not messagebox.askyesno(
+                "Aktualizacja cen",
+                f"Zmienione ceny zakupu: {len(changes)} pozycji\n\n{examples}{more}\n\n"
+                f"Zmiana wartości netto oferty: {net_diff:+.2f} zł (marże bez zmian)\n\nZastosować?"
+            ):
+                return
+            
+            if self.db.reprice_offer(offer['id']):
+                messagebox.showinfo("Sukces", f"Zaktualizowano ceny {len(changes)} pozycji.")
+                refresh_offers()
+            else:
+                messagebox.showerror("Błąd", "Nie udało się zaktualizować cen oferty!")
+        
         def delete_offer(offer):
             """Usuwa zapisaną ofertę"""
             if messagebox.askyesno("Potwierdzenie", f"Czy na pewno usunąć ofertę '{offer['title']}'?"):
@@ -0,0 +1,225 @@
+"""
+Wiersz poleceń Ofertomat 2.0 - operacje wsadowe bez GUI (np. z crona na serwerze bez ekranu)
+
+Użycie:
+    python -m ofertomat import cennik.csv [--category NAZWA] [--batch-size N]
+    python -m ofertomat render 12 15 [--all] [--output-dir pdf] [--workers 4]
+    python -m ofertomat export katalog.csv [--category NAZWA]
+    python -m ofertomat maintenance [--integrity-check] [--vacuum]
+    python -m ofertomat serve [--host 127.0.0.1] [--port 8765] [--readers 4]
+    python -m ofertomat gui
+
+Opcja wspólna: --db ŚCIEŻKA (domyślnie ofertomat.db)
+
+Wynik każdego polecenia to jeden wiersz JSON na stdout (m.in. ok i seconds);
+komunikaty i postęp trafiają na stderr. Kod wyjścia: 0 - sukces, 1 - błąd.
+Polecenia serve i gui działają do zamknięcia i nie wypisują wyniku JSON.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from contextlib import redirect_stdout
+from typing import Callable, Dict, List, Optional
+
+from database import Database
+from services import CatalogImportError, CatalogService, OfferService
+
+
+def rows_per_second(rows: int, seconds: float) -> int:
+    return round(rows / seconds) if seconds else 0
+
+
+def _category_id(catalog: CatalogService, name: Optional[str]) -> Optional[int]:
+    """ID kategorii z opcji --category (błąd gdy podana nazwa nie istnieje)"""
+    if not name:
+        return None
+    category_id = catalog.find_category_id(name)
+    if category_id is None:
+        raise ValueError(f"Nie ma kategorii '{name}'")
+    return category_id
+
+
+# === POLECENIA ===
+
+def cmd_import(db: Database, args) -> Dict:
+    """Import pliku CSV/Excel do katalogu (strumieniowo, porcjami)"""
+    catalog = CatalogService(db)
+    category_id = _category_id(catalog, args.category)
+    
+    start = time.perf_counter()
+    error = None
+    try:
+        # Bez --category aktualizowane produkty zachowują swoje kategorie (import cennika)
+        result = catalog.import_file(
+            args.file, category_id, batch_size=args.batch_size,
+            progress_callback=lambda rows: print(f"Wczytano {rows} wierszy"),
+            keep_category=True
+        )
+    except CatalogImportError as e:
+        print(f"Błąd importu: {e}")
+        result, error = e.result, str(e.error)
+    seconds = time.perf_counter() - start
+    summary = {
+        'file': args.file,
+        'rows': result['parsed'],
+        'added': result['added'],
+        'updated': result['updated'],
+        'batches': result['batches'],
+        'rows_per_s': rows_per_second(result['parsed'], seconds)
+    }
+    if error is not None:
+        summary.update(ok=False, error=error)
+    return summary
+
+
+def cmd_render(db: Database, args) -> Dict:
+    """Generowanie PDF zapisanych ofert"""
+    offer_ids = [offer['id'] for offer in db.get_saved_offers()] if args.all else args.offer_ids
+    if not offer_ids:
+        raise ValueError("Podaj ID ofert albo --all")
+    
+    results = OfferService(db).render_offers(offer_ids, args.output_dir, workers=args.workers)
+    failed = [result for result in results if not result['ok']]
+    return {
+        'ok': not failed,
+        'workers': args.workers,
+        'rendered': len(results) - len(failed),
+        'failed': len(failed),
+        'offers': results
+    }
+
+
+def cmd_export(db: Database, args) -> Dict:
+    """Eksport katalogu do CSV (format zgodny z importem)"""
+    catalog = CatalogService(db)
+    category_id = _category_id(catalog, args.category)
+    
+    start = time.perf_counter()
+    rows = catalog.export_csv(args.output, category_id)
+    seconds = time.perf_counter() - start
+    return {
+        'path': args.output,
+        'rows': rows,
+        'bytes': os.path.getsize(args.output),
+        'rows_per_s': rows_per_second(rows, seconds)
+    }
+
+
+def cmd_maintenance(db: Database, args) -> Dict:
+    """Utrzymanie bazy: scalenie dzienników szkiców, statystyki, (opcjonalnie) kontrola i VACUUM, checkpoint"""
+    steps: Dict[str, Dict] = {}
+    
+    def timed(name: str, func: Callable, **extra):
+        start = time.perf_counter()
+        value = func()
+        steps[name] = {'seconds': round(time.perf_counter() - start, 3), **extra}
+        return value
+    
+    compacted = timed('compact_drafts', lambda: sum(
+        db.compact_draft_journal(draft['id']) for draft in db.get_drafts()
+    ))
+    steps['compact_drafts']['operations'] = compacted
+    
+    problems: List[str] = []
+    if args.integrity_check:
+        problems = timed('integrity_check', db.integrity_check)
+        steps['integrity_check']['problems'] = problems[:20]
+    
+    timed('optimize', db.optimize)
+    if args.vacuum:
+        size_before = os.path.getsize(db.db_path)
+        timed('vacuum', db.vacuum)
+        steps['vacuum'].update(bytes_before=size_before, bytes_after=os.path.getsize(db.db_path))
+    
+    checkpoint = timed('checkpoint', lambda: db.checkpoint('TRUNCATE'))
+    steps['checkpoint']['result'] = list(checkpoint) if checkpoint else None
+    
+    return {'ok': not problems, 'steps': steps}
+
+
+COMMANDS: Dict[str, Callable] = {
+    'import': cmd_import,
+    'render': cmd_render,
+    'export': cmd_export,
+    'maintenance': cmd_maintenance,
+}
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m ofertomat",
+        description="Ofertomat 2.0 - operacje wsadowe (wynik: JSON na stdout)"
+    )
+    parser.add_argument('--db', default="ofertomat.db", help="ścieżka do bazy (domyślnie ofertomat.db)")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    
+    import_parser = subparsers.add_parser('import', help="import pliku CSV/XLSX/XLS do katalogu")
+    import_parser.add_argument('file')
+    import_parser.add_argument('--category', help="kategoria importowanych produktów (bez niej aktualizowane produkty zachowują swoją)")
+    import_parser.add_argument('--batch-size', type=int, default=None, help="wierszy w porcji zapisu")
+    
+    render_parser = subparsers.add_parser('render', help="PDF zapisanych ofert")
+    render_parser.add_argument('offer_ids', type=int, nargs='*')
+    render_parser.add_argument('--all', action='store_true', help="wszystkie zapisane oferty")
+    render_parser.add_argument('--output-dir', default="pdf", help="katalog wyjściowy (domyślnie pdf)")
+    render_parser.add_argument('--workers', type=int, default=1, help="liczba procesów generujących PDF")
+    
+    export_parser = subparsers.add_parser('export', help="eksport katalogu do CSV")
+    export_parser.add_argument('output')
+    export_parser.add_argument('--category', help="tylko produkty z tej kategorii")
+    
+    maintenance_parser = subparsers.add_parser('maintenance', help="utrzymanie bazy danych")
+    maintenance_parser.add_argument('--integrity-check', action='store_true', help="PRAGMA integrity_check")
+    maintenance_parser.add_argument('--vacuum', action='store_true', help="VACUUM (wymaga wyłącznego dostępu)")
+    
+    # Argumenty serwera (--host, --port, --readers, --help) parsuje api_server - importowany
+    # dopiero po wybraniu serve, więc pozostałe polecenia nie ładują http.server
+    subparsers.add_parser('serve', help="lokalny serwer HTTP/JSON (api_server.py)", add_help=False)
+    
+    subparsers.add_parser('gui', help="uruchom aplikację okienkową")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = build_parser()
+    args, server_args = parser.parse_known_args(argv)
+    if server_args and args.command != 'serve':
+        parser.error(f"nieznane argumenty: {' '.join(server_args)}")
+    if args.command == 'gui':
+        from main import main as run_gui
+        run_gui()
+        return 0
+    if args.command == 'serve':
+        import api_server
+        return api_server.main(['--db', args.db] + server_args)
+    
+    start = time.perf_counter()
+    # Komunikaty (migracje, postęp, błędy bazy) na stderr - stdout tylko dla wyniku JSON
+    with redirect_stdout(sys.stderr):
+        db = None
+        try:
+            db = Database(args.db)
+            result = COMMANDS[args.command](db, args)
+            ok = result.pop('ok', True)
+        except Exception as e:
+            print(f"Błąd: {e}")
+            result = {'error': str(e)}
+            ok = False
+        finally:
+            if db is not None:
+                db.close()
+    
+    print(json.dumps({
+        'command': args.command,
+        'ok': ok,
+        'seconds': round(time.perf_counter() - start, 3),
+        **result
+    }, ensure_ascii=False))
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
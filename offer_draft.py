@@ -0,0 +1,467 @@
+"""
+Model edytowanej oferty dla Ofertomat 2.0
+Trzyma pozycje i kolejność kategorii kreatora ofert. Każda zmiana jest
+małą operacją (słownik gotowy do zapisu w JSON) przekazywaną słuchaczom -
+m.in. dziennikowi autozapisu DraftAutosave, który dopisuje ją w tle do
+tabeli DraftJournal. Koszt autozapisu zależy od rozmiaru zmiany, nie oferty.
+"""
+
+import queue
+import threading
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+# Pola pozycji, które można zmieniać operacją 'update' (kolumny DraftItems)
+EDITABLE_FIELDS = ('name', 'category_name', 'unit', 'purchase_price_net', 'vat_rate', 'margin', 'quantity')
+
+# Pola pozycji zapisywane w dzienniku przy dodawaniu
+JOURNAL_ITEM_FIELDS = ('id', 'offer_item_id') + EDITABLE_FIELDS
+
+# Maksymalna liczba kroków historii cofania
+UNDO_LIMIT = 200
+
+
+def item_key(item: Dict):
+    """Klucz pozycji w ofercie: ID produktu, a dla pozycji bez produktu - nazwa"""
+    product_id = item.get('id')
+    return product_id if product_id is not None else f"n:{item['name']}"
+
+
+def item_from_draft_row(row: Dict) -> Dict:
+    """Pozycja modelu z wiersza DraftItems (w kreatorze 'id' oznacza produkt)"""
+    item = {field: row[field] for field in ('offer_item_id',) + EDITABLE_FIELDS}
+    item['id'] = row['product_id']
+    return item
+
+
+class OfferDraft:
+    """
+    Pozycje oferty + kolejność kategorii; zmiany tylko przez metody modelu
+    
+    Każda zmiana (poza tytułem) jest jednym krokiem historii cofania. Krok trzyma
+    tylko dane potrzebne do odwrócenia zmiany - referencje do tych samych słowników
+    pozycji i poprzednie wartości zmienionych pól - więc pamięć zależy od rozmiaru
+    zmian, a nie oferty. Historia ma co najwyżej `undo_limit` kroków.
+    """
+    
+    def __init__(self, items: Optional[List[Dict]] = None, category_order: Optional[List[str]] = None,
+                 title: str = "Oferta handlowa", undo_limit: int = UNDO_LIMIT):
+        self.items: List[Dict] = items if items is not None else []
+        self.category_order: List[str] = category_order if category_order is not None else []
+        self.title = title
+        self._keys = {item_key(item) for item in self.items}
+        self._listeners: List[Callable[[Dict], None]] = []
+        self._undo_steps: Deque[Dict] = deque(maxlen=undo_limit)
+        self._redo_steps: List[Dict] = []
+    
+    def load(self, items: List[Dict], category_order: List[str], title: str) -> None:
+        """Podmienia zawartość modelu (wczytanie oferty lub szkicu) - bez operacji dla słuchaczy"""
+        self.items[:] = items
+        self.category_order[:] = category_order
+        self.title = title
+        self._keys = {item_key(item) for item in self.items}
+        self._undo_steps.clear()
+        self._redo_steps.clear()
+    
+    def add_listener(self, listener: Callable[[Dict], None]) -> None:
+        """Rejestruje funkcję wywoływaną z każdą operacją"""
+        self._listeners.append(listener)
+    
+    def remove_listener(self, listener: Callable[[Dict], None]) -> None:
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+    
+    def _emit(self, op: Dict) -> None:
+        for listener in self._listeners:
+            listener(op)
+    
+    # === ODCZYT ===
+    
+    def contains(self, product: Dict) -> bool:
+        """Czy produkt (lub pozycja) jest już w ofercie - O(1)"""
+        return item_key(product) in self._keys
+    
+    def __len__(self) -> int:
+        return len(self.items)
+    
+    # === ZMIANY ===
+    
+    def add_items(self, products: List[Dict], stored: bool = False) -> Tuple[List[Dict], List[Dict]]:
+        """
+        Dodaje produkty na koniec oferty (marża domyślna kategorii), pomija już obecne
+        
+        Args:
+            stored: Pozycje są już zapisane w szkicu w bazie (Database.add_category_to_draft) -
+                operacja dla dziennika niesie tylko klucze, a scalanie jej nie odtwarza
+        
+        Returns:
+            (dodane pozycje, produkty pominięte bo już były w ofercie)
+        """
+        added, already_in = [], []
+        added_keys = set()
+        for product in products:
+            key = item_key(product)
+            if key in self._keys or key in added_keys:
+                already_in.append(product)
+                continue
+            added_keys.add(key)
+            item = product.copy()
+            item.setdefault('margin', product.get('default_margin', 30.0))
+            if item.get('margin') is None:
+                item['margin'] = 30.0
+            item['category_name'] = item.get('category_name') or 'Bez kategorii'
+            added.append(item)
+        
+        if added:
+            entries = list(enumerate(added, start=len(self.items)))
+            order_before = list(self.category_order)
+            self._insert(entries, stored=stored)
+            self._record({
+                'label': f"dodanie {len(added)} poz." if len(added) > 1 else f"dodanie '{added[0]['name']}'",
+                'categories': {item['category_name'] for item in added},
+                'undo': lambda: (self._delete(added), self._restore_category_order(order_before)),
+                'redo': lambda: self._insert(entries)
+            })
+        return added, already_in
+    
+    def remove_items(self, items: List[Dict]) -> int:
+        """Usuwa pozycje z oferty; zwraca liczbę usuniętych"""
+        entries = self._delete(items)
+        if entries:
+            removed = [item for _, item in entries]
+            self._record({
+                'label': f"usunięcie {len(removed)} poz." if len(removed) > 1 else f"usunięcie '{removed[0]['name']}'",
+                'categories': {item['category_name'] for item in removed},
+                'undo': lambda: self._insert(entries),
+                'redo': lambda: self._delete(removed)
+            })
+        return len(entries)
+    
+    def update_items(self, items: List[Dict], **fields) -> None:
+        """Zmienia pola (EDITABLE_FIELDS, np. margin, category_name) wielu pozycji naraz"""
+        unknown = set(fields) - set(EDITABLE_FIELDS) - {'category_id'}
+        if unknown:
+            raise ValueError(f"Nieobsługiwane pola pozycji: {', '.join(sorted(unknown))}")
+        if not items:
+            return
+        
+        # Tylko poprzednie wartości zmienianych pól - nie kopie pozycji
+        previous = [(item, {field: item.get(field) for field in fields}) for item in items]
+        order_before = list(self.category_order)
+        categories = {item['category_name'] for item in items}
+        self._update([(item, fields) for item in items])
+        categories.update(item['category_name'] for item in items)
+        self._record({
+            'label': "zmiana kategorii" if 'category_name' in fields and len(fields) == 1
+                     else "zmiana marży" if set(fields) == {'margin'} else "edycja pozycji",
+            'categories': categories,
+            'undo': lambda: (self._update(previous), self._restore_category_order(order_before)),
+            'redo': lambda: self._update([(item, fields) for item in items])
+        })
+    
+    def swap_items(self, first: Dict, second: Dict) -> None:
+        """Zamienia miejscami dwie pozycje (przesuwanie w obrębie kategorii)"""
+        self._swap(first, second)
+        self._record({
+            'label': "przesunięcie pozycji",
+            'categories': {first['category_name'], second['category_name']},
+            'undo': lambda: self._swap(first, second),
+            'redo': lambda: self._swap(first, second)
+        })
+    
+    def move_category(self, cat_name: str, delta: int) -> bool:
+        """Przesuwa kategorię o delta miejsc (-1 w górę, 1 w dół); False gdy nie można"""
+        idx = self.category_order.index(cat_name)
+        if not 0 <= idx + delta < len(self.category_order):
+            return False
+        self._move_category(cat_name, delta)
+        self._record({
+            'label': f"przesunięcie kategorii '{cat_name}'",
+            'categories': set(),
+            'undo': lambda: self._move_category(cat_name, -delta),
+            'redo': lambda: self._move_category(cat_name, delta)
+        })
+        return True
+    
+    def clear(self) -> None:
+        """Usuwa wszystkie pozycje i kategorie"""
+        # Listy referencji (współdzielone słowniki pozycji), nie głębokie kopie
+        items = list(self.items)
+        order_before = list(self.category_order)
+        self._clear()
+        self._record({
+            'label': "wyczyszczenie oferty",
+            'categories': None,
+            'undo': lambda: (self._insert(list(enumerate(items))), self._restore_category_order(order_before)),
+            'redo': self._clear
+        })
+    
+    def set_title(self, title: str) -> None:
+        if title != self.title:
+            self.title = title
+            self._emit({'op': 'title', 'title': title})
+    
+    # === COFANIE ===
+    
+    @property
+    def can_undo(self) -> bool:
+        return bool(self._undo_steps)
+    
+    @property
+    def can_redo(self) -> bool:
+        return bool(self._redo_steps)
+    
+    def undo(self) -> Optional[Dict]:
+        """
+        Cofa ostatni krok
+        
+        Returns:
+            dict z kluczami label i categories (zmienione kategorie; None = cała oferta)
+            lub None gdy nie ma czego cofać
+        """
+        if not self._undo_steps:
+            return None
+        step = self._undo_steps.pop()
+        step['undo']()
+        self._redo_steps.append(step)
+        return {'label': step['label'], 'categories': step['categories']}
+    
+    def redo(self) -> Optional[Dict]:
+        """Ponawia ostatnio cofnięty krok (wynik jak w undo)"""
+        if not self._redo_steps:
+            return None
+        step = self._redo_steps.pop()
+        step['redo']()
+        self._undo_steps.append(step)
+        return {'label': step['label'], 'categories': step['categories']}
+    
+    def _record(self, step: Dict) -> None:
+        """Zapisuje krok historii; nowa zmiana unieważnia kroki do ponowienia"""
+        self._undo_steps.append(step)
+        self._redo_steps.clear()
+    
+    # === OPERACJE ELEMENTARNE (bez historii, z operacjami dla słuchaczy) ===
+    
+    def _insert(self, entries: List[Tuple[int, Dict]], stored: bool = False) -> None:
+        """Wstawia pozycje na podane indeksy listy wynikowej (entries rosnąco po indeksie) - O(n + k)"""
+        if not entries:
+            return
+        appended = entries[0][0] >= len(self.items)
+        if appended:
+            self.items.extend(item for _, item in entries)
+        else:
+            merged = []
+            remaining = iter(self.items)
+            for idx, item in entries:
+                while len(merged) < idx:
+                    merged.append(next(remaining))
+                merged.append(item)
+            merged.extend(remaining)
+            self.items[:] = merged
+        for _, item in entries:
+            self._keys.add(item_key(item))
+            self._append_category(item['category_name'])
+        
+        if stored:
+            self._emit({'op': 'add', 'stored': True, 'keys': [item_key(item) for _, item in entries]})
+            return
+        op_items = [{field: item.get(field) for field in JOURNAL_ITEM_FIELDS} for _, item in entries]
+        if appended:
+            self._emit({'op': 'add', 'items': op_items})
+        else:
+            # Od końca: pozycja wskazana w 'before' jest już wtedy na swoim miejscu
+            before = [item_key(self.items[idx + 1]) if idx + 1 < len(self.items) else None
+                      for idx, _ in entries]
+            self._emit({'op': 'add', 'items': op_items[::-1], 'before': before[::-1]})
+    
+    def _delete(self, items: List[Dict]) -> List[Tuple[int, Dict]]:
+        """Usuwa pozycje; zwraca (indeks, pozycja) rosnąco - dane do ponownego wstawienia"""
+        removed_ids = {id(item) for item in items}
+        entries = [(idx, item) for idx, item in enumerate(self.items) if id(item) in removed_ids]
+        if not entries:
+            return entries
+        self.items[:] = [item for item in self.items if id(item) not in removed_ids]
+        for _, item in entries:
+            self._keys.discard(item_key(item))
+        self._emit({'op': 'remove', 'keys': [item_key(item) for _, item in entries]})
+        return entries
+    
+    def _update(self, changes: List[Tuple[Dict, Dict]]) -> None:
+        """Ustawia pola pozycji; jedna operacja dziennika na grupę pozycji z tymi samymi wartościami"""
+        groups: Dict[tuple, Tuple[Dict, List]] = {}
+        for item, fields in changes:
+            key = item_key(item)
+            item.update(fields)
+            if 'name' in fields:
+                self._keys.discard(key)
+                self._keys.add(item_key(item))
+            if 'category_name' in fields:
+                self._append_category(fields['category_name'])
+            journal_fields = {field: value for field, value in fields.items() if field in EDITABLE_FIELDS}
+            if journal_fields:
+                group_key = tuple(sorted(journal_fields.items()))
+                groups.setdefault(group_key, (journal_fields, []))[1].append(key)
+        
+        for journal_fields, keys in groups.values():
+            self._emit({'op': 'update', 'keys': keys, 'fields': journal_fields})
+    
+    def _swap(self, first: Dict, second: Dict) -> None:
+        first_idx = self.items.index(first)
+        second_idx = self.items.index(second)
+        self.items[first_idx], self.items[second_idx] = second, first
+        self._emit({'op': 'swap', 'keys': [item_key(first), item_key(second)]})
+    
+    def _move_category(self, cat_name: str, delta: int) -> None:
+        idx = self.category_order.index(cat_name)
+        new_idx = idx + delta
+        self.category_order[idx], self.category_order[new_idx] = self.category_order[new_idx], self.category_order[idx]
+        self._emit({'op': 'category_order', 'categories': list(self.category_order)})
+    
+    def _restore_category_order(self, category_order: List[str]) -> None:
+        if self.category_order != category_order:
+            self.category_order[:] = category_order
+            self._emit({'op': 'category_order', 'categories': list(category_order)})
+    
+    def _clear(self) -> None:
+        self.items.clear()
+        self.category_order.clear()
+        self._keys.clear()
+        self._emit({'op': 'clear'})
+    
+    def _append_category(self, cat_name: str) -> None:
+        if cat_name not in self.category_order:
+            self.category_order.append(cat_name)
+
+
+class DraftAutosave:
+    """
+    Autozapis szkicu: operacje OfferDraft dopisywane w tle do DraftJournal
+    
+    Wątek zapisujący zbiera operacje z kolejki i dopisuje je partiami (jedna transakcja
+    na partię). Co `compact_every` operacji dziennik jest scalany z migawką szkicu
+    (DraftItems) przez Database.compact_draft_journal.
+    
+    Bez draft_id szkic zakładany jest dopiero przy pierwszej operacji - w wątku
+    zapisującym, z samym odnośnikiem do oferty źródłowej (bez kopii pozycji).
+    Otwarcie i zapis oferty nie piszą więc nic do bazy w wątku GUI.
+    """
+    
+    def __init__(self, db, draft_id: Optional[int] = None, compact_every: int = 500,
+                 title: str = "Oferta handlowa", source_offer_id: Optional[int] = None):
+        self.db = db
+        self._draft_id = draft_id
+        self._draft_lock = threading.Lock()
+        self.title = title
+        self.source_offer_id = source_offer_id
+        self.compact_every = compact_every
+        self._queue: "queue.Queue[Optional[Dict]]" = queue.Queue()
+        self._pending_compaction = 0
+        self._pending_title: Optional[Dict] = None  # ostatnia operacja 'title' jeszcze nie w kolejce
+        self.operations = 0  # liczba operacji przyjętych od startu
+        self._thread = threading.Thread(target=self._writer, name="draft-autosave", daemon=True)
+        self._thread.start()
+    
+    @property
+    def draft_id(self) -> Optional[int]:
+        """ID szkicu (None przed pierwszą operacją); gdy szkic jest właśnie zakładany - czeka na ID"""
+        with self._draft_lock:
+            return self._draft_id
+    
+    def __call__(self, op: Dict) -> None:
+        """Słuchacz OfferDraft - tylko kolejkuje operację (wątek GUI nie czeka na dysk)"""
+        self.operations += 1
+        if op['op'] == 'title':
+            # Pisanie tytułu to operacja na każdy znak - kolejne zmiany tytułu scalamy w ostatnią
+            self._pending_title = op
+            return
+        self.flush_title()
+        self._queue.put(op)
+    
+    def flush_title(self) -> None:
+        """Kolejkuje odłożoną zmianę tytułu (przed następną operacją, przy wyjściu z pola tytułu, przy zamknięciu)"""
+        if self._pending_title is not None:
+            self._queue.put(self._pending_title)
+            self._pending_title = None
+    
+    def _writer(self) -> None:
+        running = True
+        while running:
+            ops = [self._queue.get()]
+            # Zbierz wszystko, co czeka - jedna transakcja na partię
+            while True:
+                try:
+                    ops.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            fetched = len(ops)
+            try:
+                if None in ops:
+                    running = False
+                    ops = [op for op in ops if op is not None]
+                if ops:
+                    self._write(ops)
+            finally:
+                # sync() czeka (queue.join), aż partia trafi do bazy
+                for _ in range(fetched):
+                    self._queue.task_done()
+    
+    def _write(self, ops: List[Dict]) -> None:
+        if self._draft_id is None:
+            # Blokada do przypisania ID - szkic widoczny w bazie ma już właściciela (App.live_draft_ids)
+            with self._draft_lock:
+                self._draft_id = self.db.create_draft(self.title, self.source_offer_id) or None
+            if self._draft_id is None:
+                return
+        if self.db.append_draft_journal(self._draft_id, ops):
+            self._pending_compaction += len(ops)
+        if self._pending_compaction >= self.compact_every:
+            self.db.compact_draft_journal(self._draft_id)
+            self._pending_compaction = 0
+    
+    def sync(self) -> Optional[int]:
+        """
+        Zapisuje operacje z kolejki i scala dziennik - DraftItems odpowiada wtedy modelowi
+        
+        Wywoływane (w wątku GUI) przed operacjami zbiorowymi i odczytami na szkicu w bazie
+        (Database.add_category_to_draft, get_draft_items). Zakłada szkic, jeśli go jeszcze nie ma.
+        
+        Returns:
+            ID szkicu lub None gdy nie udało się go założyć
+        """
+        self.flush_title()
+        if self._thread.is_alive():
+            self._queue.join()
+        with self._draft_lock:
+            if self._draft_id is None:
+                self._draft_id = self.db.create_draft(self.title, self.source_offer_id) or None
+        if self._draft_id is not None:
+            # Wątek zapisujący czeka na kolejną operację - scalanie tutaj nie koliduje z nim
+            self.db.compact_draft_journal(self._draft_id)
+            self._pending_compaction = 0
+        return self._draft_id
+    
+    def close(self, discard: bool = False) -> None:
+        """
+        Kończy autozapis po zapisaniu wszystkich operacji z kolejki
+        
+        Args:
+            discard: True - usuń szkic (oferta została zapisana lub porzucona)
+        """
+        if self._thread.is_alive():
+            self.flush_title()
+            self._queue.put(None)
+            self._thread.join()
+        if discard and self._draft_id is not None:
+            self.db.delete_draft(self._draft_id)
+    
+    @staticmethod
+    def restore(db, draft_id: int, draft: OfferDraft) -> bool:
+        """Wczytuje szkic do modelu: scala dziennik z migawką i ładuje pozycje"""
+        db.compact_draft_journal(draft_id)
+        snapshot = db.get_draft_snapshot(draft_id)
+        if snapshot is None:
+            return False
+        
+        items = [item_from_draft_row(row) for row in snapshot['items']]
+        draft.load(items, [cat['category_name'] for cat in snapshot['categories']], snapshot['title'])
+        return True
@@ -0,0 +1,227 @@
+"""
+Profilowanie operacji GUI Ofertomat 2.0
+Opakowuje główne operacje (przeglądanie katalogu, kreator, import, PDF) pomiarem
+cProfile i tracemalloc. Każde wywołanie zapisuje plik .prof i wpis z czasem oraz
+szczytem pamięci do dziennika sesji - do załączenia w zgłoszeniu typu
+"Generowanie PDF zawiesza aplikację".
+
+Włączanie: zmienna środowiskowa OFERTOMAT_PROFILE=1
+    OFERTOMAT_PROFILE_OPS - tylko wybrane operacje, np. "select_category,render_draft_pdf"
+    OFERTOMAT_PROFILE_MEMORY=0 - bez tracemalloc (tracemalloc wyraźnie spowalnia)
+    OFERTOMAT_PROFILE_MIN_MS - plik .prof tylko dla operacji dłuższych niż próg (domyślnie 0)
+    OFERTOMAT_DIAGNOSTICS_DIR - katalog na logi i zrzuty (domyślnie "diagnostics")
+
+Przegląd sesji (najwolniejsze operacje):
+    python op_profiler.py                          # ostatnia sesja
+    python op_profiler.py diagnostics/profiles/20260301_101500 --top 30 --functions 15
+"""
+
+import argparse
+import cProfile
+import functools
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional
+
+SESSION_LOG = "session.jsonl"
+
+
+class OperationProfiler:
+    """Profiluje operacje i zapisuje wyniki do katalogu sesji (diagnostics/profiles/<data>)"""
+    
+    def __init__(self, log_dir: str = "diagnostics", operations: Optional[Iterable[str]] = None,
+                 memory: bool = True, min_prof_ms: float = 0.0):
+        self.session_dir = os.path.join(log_dir, "profiles", datetime.now().strftime('%Y%m%d_%H%M%S'))
+        self.operations = set(operations) if operations else None
+        self.memory = memory
+        self.min_prof_ms = min_prof_ms
+        self.lock = threading.Lock()
+        self._sequence = 0
+        # Jedna operacja profilowana naraz w całym procesie (od Pythona 3.12 drugi profiler
+        # nie może wystartować, gdy inny jest aktywny - także w innym wątku)
+        self._active = threading.Lock()
+    
+    @classmethod
+    def from_env(cls) -> Optional['OperationProfiler']:
+        """Tworzy profiler jeśli włączono go zmienną OFERTOMAT_PROFILE"""
+        if os.environ.get('OFERTOMAT_PROFILE', '').lower() not in ('1', 'true', 'yes', 'tak'):
+            return None
+        operations = [name.strip() for name in os.environ.get('OFERTOMAT_PROFILE_OPS', '').split(',') if name.strip()]
+        return cls(
+            log_dir=os.environ.get('OFERTOMAT_DIAGNOSTICS_DIR', 'diagnostics'),
+            operations=operations,
+            memory=os.environ.get('OFERTOMAT_PROFILE_MEMORY', '1').lower() not in ('0', 'false', 'no', 'nie'),
+            min_prof_ms=float(os.environ.get('OFERTOMAT_PROFILE_MIN_MS', 0))
+        )
+    
+    # === OPAKOWYWANIE ===
+    
+    def wrap(self, obj, method_names: Iterable[str]) -> None:
+        """Podmienia wskazane metody obiektu na profilowane (atrybut instancji przesłania metodę klasy)"""
+        for name in method_names:
+            setattr(obj, name, self.wrap_function(name, getattr(obj, name)))
+    
+    def wrap_function(self, name: str, func: Callable) -> Callable:
+        if self.operations is not None and name not in self.operations:
+            return func
+        
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            # Operacja zagnieżdżona liczy się do zewnętrznej; operacja z innego wątku w trakcie
+            # profilowania (np. PDF w tle + odświeżanie tabeli) wykonuje się bez pomiaru
+            if not self._active.acquire(blocking=False):
+                return func(*args, **kwargs)
+            try:
+                return self._run_profiled(name, func, args, kwargs)
+            finally:
+                self._active.release()
+        return wrapper
+    
+    def _run_profiled(self, name: str, func: Callable, args, kwargs):
+        if self.memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            if hasattr(tracemalloc, 'reset_peak'):
+                tracemalloc.reset_peak()
+            else:
+                tracemalloc.clear_traces()  # Python 3.8 - brak reset_peak, zeruje też szczyt
+            memory_before = tracemalloc.get_traced_memory()[0]
+        
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Aktywny inny profiler/debugger (sys.monitoring) - operacja bez pomiaru
+            return func(*args, **kwargs)
+        
+        error = None
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        except Exception as e:
+            error = repr(e)
+            raise
+        finally:
+            profile.disable()
+            duration_ms = (time.perf_counter() - start) * 1000
+            peak_kb = None
+            if self.memory:
+                peak_kb = round((tracemalloc.get_traced_memory()[1] - memory_before) / 1024, 1)
+            try:
+                self._save(name, profile, duration_ms, peak_kb, error)
+            except OSError as e:
+                print(f"Nie można zapisać profilu operacji {name}: {e}")
+    
+    def _save(self, name: str, profile: cProfile.Profile, duration_ms: float,
+              peak_kb: Optional[float], error: Optional[str]) -> None:
+        with self.lock:
+            self._sequence += 1
+            sequence = self._sequence
+        os.makedirs(self.session_dir, exist_ok=True)
+        
+        prof_file = None
+        if duration_ms >= self.min_prof_ms:
+            prof_file = f"{sequence:04d}_{name}.prof"
+            profile.dump_stats(os.path.join(self.session_dir, prof_file))
+        
+        entry = {
+            'seq': sequence,
+            'operation': name,
+            'ms': round(duration_ms, 2),
+            'peak_kb': peak_kb,
+            'thread': threading.current_thread().name,
+            'at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'prof': prof_file,
+            'error': error
+        }
+        with self.lock:
+            with open(os.path.join(self.session_dir, SESSION_LOG), 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+
+def profiled(profiler: Optional[OperationProfiler], name: str) -> Callable[[Callable], Callable]:
+    """Dekorator dla funkcji zagnieżdżonych (kreator ofert) - bez profilera zwraca funkcję bez zmian"""
+    if profiler is None:
+        return lambda func: func
+    return lambda func: profiler.wrap_function(name, func)
+
+
+# === PRZEGLĄD SESJI ===
+
+def latest_session(log_dir: str = "diagnostics") -> Optional[str]:
+    """Katalog ostatniej sesji profilowania (nazwy katalogów to daty - sortują się chronologicznie)"""
+    profiles_dir = os.path.join(log_dir, "profiles")
+    if not os.path.isdir(profiles_dir):
+        return None
+    sessions = sorted(entry for entry in os.listdir(profiles_dir)
+                      if os.path.isfile(os.path.join(profiles_dir, entry, SESSION_LOG)))
+    return os.path.join(profiles_dir, sessions[-1]) if sessions else None
+
+
+def load_session(session_dir: str) -> List[Dict]:
+    with open(os.path.join(session_dir, SESSION_LOG), encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def summarize(entries: List[Dict]) -> List[Dict]:
+    """Statystyki per operacja: liczba wywołań, suma, maksimum czasu i szczyt pamięci"""
+    by_operation: Dict[str, Dict] = {}
+    for entry in entries:
+        stats = by_operation.setdefault(entry['operation'], {
+            'operation': entry['operation'], 'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'peak_kb': None
+        })
+        stats['count'] += 1
+        stats['total_ms'] = round(stats['total_ms'] + entry['ms'], 2)
+        stats['max_ms'] = max(stats['max_ms'], entry['ms'])
+        if entry.get('peak_kb') is not None:
+            stats['peak_kb'] = max(stats['peak_kb'] or 0.0, entry['peak_kb'])
+    return sorted(by_operation.values(), key=lambda stats: stats['total_ms'], reverse=True)
+
+
+def print_session(session_dir: str, top: int = 20, functions: int = 0) -> None:
+    entries = load_session(session_dir)
+    print(f"📂 Sesja: {session_dir} ({len(entries)} operacji)\n")
+    
+    print("Operacje (suma czasu):")
+    print(f"  {'operacja':<32} {'liczba':>6} {'suma ms':>10} {'max ms':>10} {'pamięć KB':>10}")
+    for stats in summarize(entries):
+        peak = f"{stats['peak_kb']:.0f}" if stats['peak_kb'] is not None else "-"
+        print(f"  {stats['operation']:<32} {stats['count']:>6} {stats['total_ms']:>10.1f} "
+              f"{stats['max_ms']:>10.1f} {peak:>10}")
+    
+    slowest = sorted(entries, key=lambda entry: entry['ms'], reverse=True)[:top]
+    print(f"\nNajwolniejsze wywołania (top {len(slowest)}):")
+    for entry in slowest:
+        peak = f"{entry['peak_kb']:.0f} KB" if entry.get('peak_kb') is not None else "-"
+        error = f"  ❌ {entry['error']}" if entry.get('error') else ""
+        print(f"  {entry['ms']:>10.1f} ms  {peak:>10}  {entry['at']}  {entry['operation']} "
+              f"[{entry['thread']}] {entry.get('prof') or ''}{error}")
+    
+    if functions:
+        with_prof = [entry for entry in slowest if entry.get('prof')]
+        if with_prof:
+            entry = with_prof[0]
+            print(f"\nNajdroższe funkcje w {entry['prof']} ({entry['operation']}, {entry['ms']:.0f} ms):")
+            stats = pstats.Stats(os.path.join(session_dir, entry['prof']), stream=sys.stdout)
+            stats.sort_stats('cumulative').print_stats(functions)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Przegląd profilowania operacji Ofertomat 2.0")
+    parser.add_argument('session', nargs='?', help="katalog sesji (domyślnie ostatnia w diagnostics/profiles)")
+    parser.add_argument('--top', type=int, default=20, help="liczba najwolniejszych wywołań")
+    parser.add_argument('--functions', type=int, default=0,
+                        help="pokaż N najdroższych funkcji najwolniejszego wywołania (pstats)")
+    args = parser.parse_args()
+    
+    session = args.session or latest_session(os.environ.get('OFERTOMAT_DIAGNOSTICS_DIR', 'diagnostics'))
+    if not session:
+        print("Brak sesji profilowania (uruchom aplikację z OFERTOMAT_PROFILE=1)")
+        sys.exit(1)
+    print_session(session, args.top, args.functions)
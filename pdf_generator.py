@@ -8,8 +8,30 @@ from reportlab.pdfbase.ttfonts import TTFont
 from reportlab.lib.enums import TA_CENTER, TA_RIGHT, TA_LEFT
 from reportlab.pdfgen import canvas
 from datetime import datetime
-from typing import List, Dict
+from typing import BinaryIO, List, Dict
 import os
+import time
+
+
+class PDFGenerationError(Exception):
+    """Nie udało się wygenerować PDF oferty (oryginalny wyjątek w __cause__)"""
+
+
+class _CountingStream:
+    """Przekazuje zapis do strumienia docelowego i liczy zapisane bajty"""
+    
+    def __init__(self, stream: BinaryIO):
+        self.stream = stream
+        self.bytes_written = 0
+    
+    def write(self, data: bytes):
+        self.bytes_written += len(data)
+        return self.stream.write(data)
+    
+    def flush(self):
+        if hasattr(self.stream, 'flush'):
+            self.stream.flush()
+
 
 class PDFGenerator:
     """Klasa do generowania raportów PDF z ofert"""
@@ -160,34 +182,27 @@ class PDFGenerator:
             except Exception as e:
                 print(f"Błąd dodawania znaku wodnego: {e}")
     
-    def generate_offer_pdf(self, offer_data: Dict, output_path: str, progress_callback=None) -> bool:
+    def render_offer_pdf(self, offer_data: Dict, stream: BinaryIO, progress_callback=None) -> Dict:
         """
-        Generuje PDF z ofertą
+        Generuje PDF z ofertą do podanego strumienia binarnego (np. BytesIO, otwarty plik, socket)
         
         Args:
-            offer_data: Słownik z danymi oferty:
-                - title: str (tytuł oferty)
-                - date: str (data, opcjonalnie)
-                - items: List[Dict] - produkty z polami:
-                    - name: str
-                    - quantity: float
-                    - purchase_price_net: float
-                    - vat_rate: float
-                    - margin: float (z kategorii)
-                    - category_name: str
-            output_path: Ścieżka do pliku wyjściowego PDF
+            offer_data: Dane oferty (klucze opisane w generate_offer_pdf)
+            stream: Obiekt z metodą write(bytes) - nie musi obsługiwać seek/tell
             progress_callback: Opcjonalna funkcja callback(current, total) dla progress bar
         
         Returns:
-            bool - True jeśli sukces
+            Dict: bytes (zapisane bajty), pages (liczba stron), seconds (czas generowania)
+        
+        Raises:
+            PDFGenerationError: gdy nie udało się zbudować dokumentu (przyczyna w __cause__)
         """
+        start = time.perf_counter()
+        output = _CountingStream(stream)
         try:
-            # Stwórz katalog jeśli nie istnieje
-            os.makedirs(os.path.dirname(output_path) if os.path.dirname(output_path) else '.', exist_ok=True)
-            
             # Utwórz dokument
             doc = SimpleDocTemplate(
-                output_path,
+                output,
                 pagesize=A4,
                 rightMargin=2*cm,
                 leftMargin=2*cm,
@@ -359,10 +374,49 @@ class PDFGenerator:
             
             # Zbuduj PDF ze znakiem wodnym
             doc.build(elements, onFirstPage=self.add_watermark, onLaterPages=self.add_watermark)
-            return True
-            
         except Exception as e:
-            import traceback
+            raise PDFGenerationError(str(e)) from e
+        
+        return {
+            'bytes': output.bytes_written,
+            'pages': doc.page,
+            'seconds': time.perf_counter() - start
+        }
+    
+    def generate_offer_pdf(self, offer_data: Dict, output_path: str, progress_callback=None) -> bool:
+        """
+        Generuje PDF z ofertą do pliku (render_offer_pdf + obsługa błędów w stylu GUI)
+        
+        Args:
+            offer_data: Słownik z danymi oferty:
+                - title: str (tytuł oferty)
+                - date: str (data, opcjonalnie)
+                - items: List[Dict] - produkty z polami:
+                    - name: str
+                    - quantity: float
+                    - purchase_price_net: float
+                    - vat_rate: float
+                    - margin: float (z kategorii)
+                    - category_name: str
+            output_path: Ścieżka do pliku wyjściowego PDF
+            progress_callback: Opcjonalna funkcja callback(current, total) dla progress bar
+        
+        Returns:
+            bool - True jeśli sukces
+        """
+        output_dir = os.path.dirname(output_path)
+        try:
+            if output_dir:
+                os.makedirs(output_dir, exist_ok=True)
+            with open(output_path, 'wb') as f:
+                self.render_offer_pdf(offer_data, f, progress_callback=progress_callback)
+            return True
+        except (PDFGenerationError, OSError) as e:
             print(f"Błąd generowania PDF: {e}")
-            traceback.print_exc()
+            # Nie zostawiaj niekompletnego pliku
+            if os.path.exists(output_path):
+                try:
+                    os.remove(output_path)
+                except OSError:
+                    pass
             return False
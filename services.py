@@ -0,0 +1,398 @@
+"""
+Warstwa usług Ofertomat 2.0
+Logika biznesowa ofert i katalogu niezależna od GUI - kreator ofert (main.py)
+tylko wywołuje te metody, a te same operacje można uruchomić wsadowo,
+zmierzyć w benchmarku albo przetestować bez okna Tk.
+
+Ciężkie zależności (pandas w DataImporter, reportlab w PDFGenerator) są
+importowane dopiero przy pierwszym użyciu.
+"""
+
+import csv
+import os
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import BinaryIO, Dict, List, Optional, Tuple
+
+from database import Database
+from offer_draft import OfferDraft, item_from_draft_row
+
+# Nagłówki eksportu katalogu - nazwy rozpoznawane przez importer (COLUMN_MAPPING)
+EXPORT_COLUMNS = ('Kod', 'Nazwa', 'Jednostka', 'Cena zakupu netto', 'VAT', 'Kategoria')
+
+
+class CatalogImportError(Exception):
+    """Import przerwany błędem - result zawiera liczniki porcji zapisanych przed błędem"""
+    
+    def __init__(self, error: Exception, result: Dict):
+        super().__init__(
+            f"{error}\n\nZapisano przed błędem: wczytano {result['parsed']} wierszy, "
+            f"dodano {result['added']}, zaktualizowano {result['updated']} produktów"
+        )
+        self.error = error
+        self.result = result
+
+
+class CatalogService:
+    """Katalog produktów: import z plików i kategorie"""
+    
+    def __init__(self, db: Database, importer=None):
+        self.db = db
+        self._importer = importer
+        self._lazy_lock = threading.Lock()
+    
+    @property
+    def importer(self):
+        """DataImporter tworzony przy pierwszym użyciu (import pandas trwa)"""
+        if self._importer is None:
+            # Blokada - pierwsze użycie może przyjść jednocześnie z wątku GUI i z ładowania w tle
+            with self._lazy_lock:
+                if self._importer is None:
+                    from importer import DataImporter
+                    self._importer = DataImporter()
+        return self._importer
+    
+    def find_category_id(self, name: str) -> Optional[int]:
+        """ID kategorii o podanej nazwie (None = brak / 'Bez kategorii')"""
+        return next((cat['id'] for cat in self.db.get_categories() if cat['name'] == name), None)
+    
+    def import_file(self, file_path: str, category_id: Optional[int] = None,
+                    batch_size: Optional[int] = None, progress_callback=None,
+                    keep_category: bool = False) -> Dict:
+        """
+        Importuje produkty z pliku CSV/Excel do bazy strumieniowo
+        
+        Plik czytany jest porcjami (DataImporter.iter_import_batches), a każda porcja
+        zapisywana osobną transakcją - pamięć nie zależy od rozmiaru pliku. Błąd w trakcie
+        zostawia w bazie porcje zapisane przed nim - CatalogImportError podaje ich liczniki.
+        
+        Args:
+            batch_size: Wierszy w porcji (domyślnie importer.IMPORT_BATCH_ROWS)
+            progress_callback: Opcjonalna funkcja callback(wczytane_wiersze) po każdej porcji
+            keep_category: Produkty bez kategorii zachowują dotychczasową (Database.import_products_batch)
+        
+        Returns:
+            dict z kluczami parsed (wczytane wiersze), added, updated, batches
+        
+        Raises:
+            CatalogImportError: z wynikiem (result) porcji zapisanych przed błędem
+        """
+        result = {'parsed': 0, 'added': 0, 'updated': 0, 'batches': 0}
+        try:
+            for products in self.importer.iter_import_batches(file_path, category_id, batch_size):
+                added, updated = self.db.import_products_batch(products, keep_category)
+                result['parsed'] += len(products)
+                result['added'] += added
+                result['updated'] += updated
+                result['batches'] += 1
+                if progress_callback:
+                    progress_callback(result['parsed'])
+        except Exception as e:
+            raise CatalogImportError(e, result) from e
+        return result
+    
+    def export_csv(self, output_path: str, category_id: Optional[int] = None) -> int:
+        """
+        Eksportuje katalog do CSV w formacie importu (średnik, przecinek dziesiętny)
+        
+        Produkty czytane są z bazy strumieniowo (Database.iter_products).
+        
+        Returns:
+            Liczba wyeksportowanych produktów
+        """
+        count = 0
+        with open(output_path, 'w', encoding='utf-8-sig', newline='') as f:
+            writer = csv.writer(f, delimiter=';')
+            writer.writerow(EXPORT_COLUMNS)
+            for product in self.db.iter_products(category_id):
+                writer.writerow((
+                    product['code'] or '',
+                    product['name'],
+                    product['unit'] or 'szt.',
+                    f"{product['purchase_price_net'] or 0:.2f}".replace('.', ','),
+                    f"{product['vat_rate'] or 0:g}%",
+                    product['category_name'] or ''
+                ))
+                count += 1
+        return count
+
+
+class OfferService:
+    """Operacje na ofertach: model kreatora (OfferDraft), zapis i generowanie PDF"""
+    
+    def __init__(self, db: Database, pdf_generator=None):
+        self.db = db
+        self._pdf_generator = pdf_generator
+        self._lazy_lock = threading.Lock()
+    
+    @property
+    def pdf_generator(self):
+        """PDFGenerator tworzony przy pierwszym użyciu (import reportlab trwa)"""
+        if self._pdf_generator is None:
+            with self._lazy_lock:
+                if self._pdf_generator is None:
+                    from pdf_generator import PDFGenerator
+                    self._pdf_generator = PDFGenerator()
+        return self._pdf_generator
+    
+    # === MODEL OFERTY ===
+    
+    def open_offer(self, offer_id: Optional[int] = None, draft: Optional[OfferDraft] = None) -> Optional[OfferDraft]:
+        """
+        Wczytuje zapisaną ofertę do modelu (nowy lub podany - np. kreatora)
+        
+        Returns:
+            OfferDraft lub None gdy oferty nie ma
+        """
+        draft = draft if draft is not None else OfferDraft()
+        if offer_id is None:
+            return draft
+        offer = self.db.get_offer_by_id(offer_id)
+        if not offer:
+            return None
+        # W kreatorze 'id' oznacza produkt; wiersz oferty zachowujemy w 'offer_item_id'
+        for item in offer['items']:
+            item['id'] = item.get('product_id')
+        draft.load(offer['items'], list(offer.get('category_order', {}).keys()), offer['title'])
+        return draft
+    
+    @staticmethod
+    def add_products(draft: OfferDraft, products: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
+        """Dodaje produkty (pojedynczy lub 'dodaj wszystkie') jednym krokiem; zwraca (dodane, już obecne)"""
+        return draft.add_items(products)
+    
+    def add_category(self, draft: OfferDraft, category_id: Optional[int], draft_id: Optional[int] = None,
+                     product_ids: Optional[List[int]] = None) -> Tuple[List[Dict], List[Dict]]:
+        """
+        Dodaje do oferty wszystkie produkty kategorii z bazy (z jej domyślną marżą)
+        
+        Z draft_id (szkic scalony z modelem - DraftAutosave.sync) produkty trafiają do szkicu
+        jednym INSERT ... SELECT po stronie bazy, a do modelu - odczytane oknem get_draft_items.
+        
+        Args:
+            product_ids: Tylko te produkty kategorii (np. przefiltrowane wyszukiwaniem)
+        
+        Returns:
+            (dodane pozycje, produkty pominięte bo już były w ofercie)
+        """
+        if draft_id is None:
+            products = self.db.get_products(category_id)
+            if product_ids is not None:
+                wanted = set(product_ids)
+                products = [product for product in products if product['id'] in wanted]
+            return draft.add_items(products)
+        
+        if product_ids is None:
+            added = self.db.add_category_to_draft(draft_id, category_id)
+        else:
+            added = self.db.add_products_to_draft(draft_id, product_ids)
+        if not added:
+            return [], []
+        
+        # Dopisane wiersze są ostatnimi (wg position) w sekcji swojej kategorii
+        cat_name = next((cat['name'] for cat in self.db.get_categories() if cat['id'] == category_id), 'Bez kategorii')
+        counts = {row['category_name']: row['items_count'] for row in self.db.get_draft_categories(draft_id)}
+        rows = self.db.get_draft_items(draft_id, cat_name, offset=counts.get(cat_name, added) - added, limit=added)
+        items = []
+        for row in rows:
+            item = item_from_draft_row(row)
+            item['category_id'] = category_id
+            items.append(item)
+        return draft.add_items(items, stored=True)
+    
+    @staticmethod
+    def move_item(draft: OfferDraft, item: Dict, delta: int) -> bool:
+        """Przesuwa pozycję o jedno miejsce w obrębie jej kategorii (-1 w górę, 1 w dół)"""
+        category_items = [i for i in draft.items if i['category_name'] == item['category_name']]
+        idx = category_items.index(item)
+        if not 0 <= idx + delta < len(category_items):
+            return False
+        draft.swap_items(item, category_items[idx + delta])
+        return True
+    
+    @staticmethod
+    def set_margin(draft: OfferDraft, items: List[Dict], margin: float) -> None:
+        """Ustawia marżę (%) wielu pozycji naraz - jeden krok historii"""
+        draft.update_items(items, margin=margin)
+    
+    @staticmethod
+    def change_category(draft: OfferDraft, items: List[Dict], category_name: str,
+                        category_id: Optional[int]) -> None:
+        """Przenosi pozycje oferty do innej kategorii (nowa kategoria trafia na koniec kolejności)"""
+        draft.update_items(items, category_name=category_name, category_id=category_id)
+    
+    def edit_item(self, draft: OfferDraft, item: Dict, name: str, purchase_price_net: float,
+                  vat_rate: float, margin: float, category_name: str, category_id: Optional[int]) -> bool:
+        """
+        Edycja pozycji oferty; zmiana ceny zakupu lub kategorii trafia też do katalogu
+        
+        Returns:
+            True gdy zaktualizowano również produkt w bazie
+        """
+        price_changed = abs(item['purchase_price_net'] - purchase_price_net) > 0.001
+        category_changed = item.get('category_id') != category_id
+        catalog_updated = bool(item.get('id')) and (price_changed or category_changed)
+        if catalog_updated:
+            self.db.update_product(
+                product_id=item['id'],
+                code=item.get('code'),
+                name=name,
+                unit=item.get('unit', 'szt.'),
+                purchase_price_net=purchase_price_net,
+                vat_rate=vat_rate,
+                category_id=category_id
+            )
+        
+        # Marża zmienia się tylko dla tej pozycji oferty
+        draft.update_items(
+            [item],
+            name=name,
+            purchase_price_net=purchase_price_net,
+            vat_rate=vat_rate,
+            margin=margin,
+            category_name=category_name,
+            category_id=category_id
+        )
+        return catalog_updated
+    
+    # === ZAPIS ===
+    
+    @staticmethod
+    def items_to_save(draft: OfferDraft) -> Tuple[List[Dict], Dict]:
+        """Pozycje i kolejność kategorii w formacie Database.save_offer / update_offer"""
+        items = [{
+            'offer_item_id': item.get('offer_item_id'),
+            'product_id': item.get('id'),
+            'name': item['name'],
+            'category_name': item.get('category_name', 'Bez kategorii'),
+            'unit': item.get('unit', 'szt.'),
+            'purchase_price_net': item.get('purchase_price_net', 0),
+            'vat_rate': item.get('vat_rate', 23),
+            'margin': item.get('margin', item.get('default_margin', 30.0)),
+            'quantity': 1.0
+        } for item in draft.items]
+        category_order = {cat: idx for idx, cat in enumerate(draft.category_order)}
+        return items, category_order
+    
+    def save_offer(self, draft: OfferDraft, title: str, offer_id: Optional[int] = None) -> int:
+        """
+        Zapisuje ofertę z modelu: aktualizuje istniejącą (offer_id) albo tworzy nową
+        
+        ID zapisanych wierszy trafiają do pozycji modelu (offer_item_id) - kolejny zapis
+        aktualizuje je różnicowo zamiast usuwać i dopisywać od nowa.
+        
+        Returns:
+            ID zapisanej oferty lub 0 w przypadku błędu
+        """
+        items, category_order = self.items_to_save(draft)
+        if offer_id:
+            inserted_ids = self.db.update_offer(offer_id, title, items, category_order)
+            if inserted_ids is None:
+                return 0
+        else:
+            offer_id = self.db.save_offer(title, items, category_order)
+            if not offer_id:
+                return 0
+            inserted_ids = dict(enumerate(self.db.get_offer_item_ids(offer_id)))
+        
+        for index, offer_item_id in inserted_ids.items():
+            draft.items[index]['offer_item_id'] = offer_item_id
+        return offer_id
+    
+    # === PDF ===
+    
+    def build_offer_data(self, title: str, items: List[Dict], category_order: Dict) -> Dict:
+        """Dane dla PDFGenerator.generate_offer_pdf (data dzisiejsza + wizytówka)"""
+        return {
+            'title': title,
+            'date': datetime.now().strftime('%d.%m.%Y'),
+            'items': items,
+            'business_card': self.db.get_business_card(),
+            'category_order': category_order
+        }
+    
+    def render_draft_pdf(self, draft: OfferDraft, title: str, output_path: str, progress_callback=None) -> bool:
+        """Generuje PDF z bieżącej zawartości modelu (kreator)"""
+        category_order = {cat: idx for idx, cat in enumerate(draft.category_order)}
+        offer_data = self.build_offer_data(title, draft.items, category_order)
+        return self.pdf_generator.generate_offer_pdf(offer_data, output_path, progress_callback=progress_callback)
+    
+    def render_offer_pdf(self, offer: Dict, output_path: str, progress_callback=None) -> bool:
+        """Generuje PDF z zapisanej oferty (wynik Database.get_offer_by_id)"""
+        offer_data = self.build_offer_data(offer['title'], offer['items'], offer.get('category_order', {}))
+        return self.pdf_generator.generate_offer_pdf(offer_data, output_path, progress_callback=progress_callback)
+    
+    def write_offer_pdf(self, offer: Dict, stream: BinaryIO, progress_callback=None) -> Dict:
+        """
+        Generuje PDF zapisanej oferty do strumienia (np. BytesIO dla serwera API)
+        
+        Returns: bytes, pages, seconds (PDFGenerator.render_offer_pdf)
+        Raises: PDFGenerationError
+        """
+        offer_data = self.build_offer_data(offer['title'], offer['items'], offer.get('category_order', {}))
+        return self.pdf_generator.render_offer_pdf(offer_data, stream, progress_callback=progress_callback)
+    
+    def offer_pdf_path(self, offer: Dict, output_dir: str) -> str:
+        """Ścieżka PDF oferty w katalogu wyjściowym: <id>_<tytuł>.pdf"""
+        safe_title = re.sub(r'[^\w\-]+', '_', offer['title']).strip('_') or 'oferta'
+        return os.path.join(output_dir, f"{offer['id']}_{safe_title}.pdf")
+    
+    def render_offers(self, offer_ids: List[int], output_dir: str, workers: int = 1) -> List[Dict]:
+        """
+        Generuje PDF dla wielu zapisanych ofert (wsadowo, np. z crona)
+        
+        Generowanie PDF (reportlab) zajmuje procesor, więc przy workers > 1 oferty
+        renderowane są w osobnych procesach - każdy z własnym połączeniem z bazą.
+        
+        Returns:
+            Lista wyników per oferta: offer_id, path, items, seconds, ok
+            (bytes i pages po sukcesie, error przy błędzie)
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        if workers <= 1 or len(offer_ids) <= 1:
+            return [_render_offer(self, offer_id, output_dir) for offer_id in offer_ids]
+        
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_render_worker,
+                                 initargs=(self.db.db_path, self.db.pragmas)) as executor:
+            return list(executor.map(_render_offer_in_worker, offer_ids, [output_dir] * len(offer_ids)))
+
+
+def _render_offer(service: OfferService, offer_id: int, output_dir: str) -> Dict:
+    """Generuje PDF jednej zapisanej oferty i mierzy czas"""
+    start = time.perf_counter()
+    result = {'offer_id': offer_id, 'path': None, 'items': 0, 'ok': False}
+    try:
+        offer = service.db.get_offer_by_id(offer_id)
+        if not offer:
+            result['error'] = "Oferta nie istnieje"
+        else:
+            result['path'] = service.offer_pdf_path(offer, output_dir)
+            result['items'] = len(offer['items'])
+            with open(result['path'], 'wb') as f:
+                rendered = service.write_offer_pdf(offer, f)
+            result.update(ok=True, bytes=rendered['bytes'], pages=rendered['pages'])
+    except Exception as e:
+        result['error'] = str(e)
+        if result['path'] and os.path.exists(result['path']):
+            os.remove(result['path'])
+    result['seconds'] = round(time.perf_counter() - start, 3)
+    return result
+
+
+# Usługa procesu roboczego render_offers (jedna na proces)
+_worker_service: Optional[OfferService] = None
+
+
+def _init_render_worker(db_path: str, pragmas: Dict) -> None:
+    global _worker_service
+    # Komunikaty bazy i generatora PDF nie mogą trafić na stdout (wynik JSON w CLI)
+    sys.stdout = sys.stderr
+    _worker_service = OfferService(Database(db_path, pragmas=pragmas))
+
+
+def _render_offer_in_worker(offer_id: int, output_dir: str) -> Dict:
+    return _render_offer(_worker_service, offer_id, output_dir)
@@ -0,0 +1,209 @@
+"""
+Raport czasu startu Ofertomat 2.0
+
+1. Importy: `python -X importtime -c "import main"` - czas importu main i jego
+   bezpośrednich zależności oraz najcięższe pakiety (suma czasu własnego modułów).
+2. Pierwsze okno: aplikacja uruchamiana z OFERTOMAT_STARTUP_PROBE=1 zapisuje czasy
+   (importy, budowa App, pierwsze wyświetlenie) i sama się zamyka. Wymaga ekranu.
+   Pomiar działa na kopii ofertomat.db w katalogu tymczasowym (OFERTOMAT_DB) - prawdziwa
+   baza i jej migawka startowa pozostają nietknięte. Osobno mierzony jest start zimny
+   (bez migawki - tabela z zapytania do bazy) i ciepły (z migawki poprzedniego zamknięcia).
+
+Użycie:
+    python startup_report.py [--runs 3] [--top 10] [--output startup.json]
+
+Wynik JSON ma format benchmark.py suite, więc regresje sprawdza:
+    python benchmark.py compare startup_baseline.json startup.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from startup_snapshot import snapshot_path
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+PROBE_TIMEOUT_S = 60
+
+
+def parse_importtime(output: str) -> List[Dict]:
+    """Wiersze "import time: self [us] | cumulative | nazwa" -> name, depth, self_us, cumulative_us"""
+    modules = []
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        modules.append({
+            'name': name.strip(),
+            'depth': (len(name) - len(name.lstrip()) - 1) // 2,
+            'self_us': int(self_us),
+            'cumulative_us': int(cumulative_us)
+        })
+    return modules
+
+
+def measure_imports(module: str = "main") -> List[Dict]:
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=APP_DIR, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "błąd importu")
+    return parse_importtime(result.stderr)
+
+
+def import_breakdown(modules: List[Dict], module: str = "main", top: int = 10) -> Dict:
+    """Czas importu modułu, jego bezpośrednie importy i najcięższe pakiety najwyższego poziomu"""
+    # importtime wypisuje moduł po jego zależnościach - bezpośrednie importy to wiersze
+    # głębokości 1 między poprzednim modułem najwyższego poziomu a wierszem `module`
+    end = next(index for index, entry in enumerate(modules) if entry['name'] == module and entry['depth'] == 0)
+    start = end
+    while start > 0 and modules[start - 1]['depth'] > 0:
+        start -= 1
+    total = modules[end]
+    direct = [entry for entry in modules[start:end] if entry['depth'] == 1]
+    packages: Dict[str, int] = {}
+    for entry in modules:
+        package = entry['name'].split('.')[0]
+        packages[package] = packages.get(package, 0) + entry['self_us']
+    return {
+        'total_us': total['cumulative_us'],
+        'direct': sorted(direct, key=lambda entry: entry['cumulative_us'], reverse=True)[:top],
+        'packages': sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+    }
+
+
+def prepare_probe_database(db_path: str) -> None:
+    """Spójna kopia ofertomat.db (backup API - także zmiany z pliku WAL) z wykonanymi migracjami"""
+    from database import Database
+    
+    source_path = os.path.join(APP_DIR, "ofertomat.db")
+    if os.path.exists(source_path):
+        source = target = None
+        try:
+            source = sqlite3.connect(source_path)
+            target = sqlite3.connect(db_path)
+            source.backup(target)
+        finally:
+            if target:
+                target.close()
+            if source:
+                source.close()
+    # Migracje przed pomiarem - żaden przebieg nie mierzy jednorazowej zmiany schematu
+    Database(db_path)
+
+
+def measure_first_window(db_path: str) -> Optional[Dict]:
+    """Uruchomienie pomiarowe aplikacji; None gdy okno nie mogło się otworzyć (np. brak ekranu)"""
+    log_dir = os.path.dirname(db_path)
+    env = dict(os.environ, OFERTOMAT_STARTUP_PROBE='1', OFERTOMAT_DIAGNOSTICS_DIR=log_dir, OFERTOMAT_DB=db_path)
+    start = time.perf_counter()
+    try:
+        result = subprocess.run([sys.executable, 'main.py'], cwd=APP_DIR, env=env,
+                                capture_output=True, text=True, timeout=PROBE_TIMEOUT_S)
+    except subprocess.TimeoutExpired:
+        print("⚠️  Aplikacja nie zamknęła się po pierwszym wyświetleniu okna")
+        return None
+    process_s = time.perf_counter() - start
+    log_path = os.path.join(log_dir, "startup.jsonl")
+    if result.returncode != 0 or not os.path.exists(log_path):
+        error = result.stderr.strip().splitlines()[-1] if result.stderr.strip() else f"kod {result.returncode}"
+        print(f"⚠️  Pomiar pierwszego okna nieudany: {error}")
+        return None
+    with open(log_path, encoding='utf-8') as f:
+        timings = json.loads(f.readlines()[-1])
+    timings['process_s'] = round(process_s, 3)
+    return timings
+
+
+def measure_first_windows(runs: int) -> Dict[str, List[Dict]]:
+    """Przebiegi zimne (migawka usuwana przed każdym) i ciepłe (migawka z poprzedniego zamknięcia)"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, "ofertomat.db")
+        prepare_probe_database(db_path)
+        cold = []
+        for _ in range(runs):
+            if os.path.exists(snapshot_path(db_path)):
+                os.remove(snapshot_path(db_path))
+            cold.append(measure_first_window(db_path))
+        # Ostatni zimny przebieg zapisał migawkę przy zamknięciu
+        warm = [measure_first_window(db_path) for _ in range(runs)]
+    return {
+        'cold': [timings for timings in cold if timings],
+        'warm': [timings for timings in warm if timings]
+    }
+
+
+def median_timings(runs: List[Dict]) -> Dict:
+    keys = [key for key in runs[0] if key.endswith('_s')]
+    return {key: round(statistics.median(run[key] for run in runs), 3) for key in keys}
+
+
+def build_report(runs: int = 3, top: int = 10) -> Dict:
+    import_runs = [import_breakdown(measure_imports(), top=top) for _ in range(runs)]
+    fastest = min(import_runs, key=lambda breakdown: breakdown['total_us'])
+    results = {
+        'import_main': {'seconds': round(statistics.median(run['total_us'] for run in import_runs) / 1e6, 4)},
+        'import_direct': {entry['name']: {'seconds': round(entry['cumulative_us'] / 1e6, 4)}
+                          for entry in fastest['direct']},
+        'import_packages': {name: {'seconds': round(self_us / 1e6, 4)} for name, self_us in fastest['packages']}
+    }
+    
+    window_runs = measure_first_windows(runs)
+    for kind, kind_runs in window_runs.items():
+        if kind_runs:
+            results[f'first_window_{kind}'] = {name: {'seconds': value}
+                                               for name, value in median_timings(kind_runs).items()}
+    
+    return {
+        'meta': {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'runs': runs,
+            'first_window_runs': {kind: len(kind_runs) for kind, kind_runs in window_runs.items()}
+        },
+        'results': results
+    }
+
+
+def print_report(report: Dict) -> None:
+    results = report['results']
+    print(f"\n📦 import main: {results['import_main']['seconds'] * 1000:.0f} ms (mediana z {report['meta']['runs']})")
+    print("   bezpośrednie importy:")
+    for name, value in results['import_direct'].items():
+        print(f"     {value['seconds'] * 1000:8.1f} ms  {name}")
+    print("   najcięższe pakiety (czas własny modułów):")
+    for name, value in results['import_packages'].items():
+        print(f"     {value['seconds'] * 1000:8.1f} ms  {name}")
+    
+    labels = {'cold': "zimny - bez migawki", 'warm': "ciepły - z migawki startowej"}
+    if not any(f'first_window_{kind}' in results for kind in labels):
+        print("\n🪟 Pierwsze okno: brak pomiaru (aplikacja nie uruchomiła się - brak ekranu?)")
+    for kind, label in labels.items():
+        if f'first_window_{kind}' in results:
+            print(f"\n🪟 Start aplikacji, {label} (mediana):")
+            for name, value in results[f'first_window_{kind}'].items():
+                print(f"     {value['seconds'] * 1000:8.0f} ms  {name}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Raport czasu startu Ofertomat 2.0")
+    parser.add_argument('--runs', type=int, default=3, help="liczba powtórzeń (wynik: mediana)")
+    parser.add_argument('--top', type=int, default=10, help="liczba pozycji w zestawieniach importów")
+    parser.add_argument('--output', help="zapis wyniku JSON (format benchmark.py)")
+    args = parser.parse_args()
+    
+    report = build_report(args.runs, args.top)
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n💾 Wyniki zapisane: {args.output}")
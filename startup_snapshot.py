@@ -0,0 +1,86 @@
+"""
+Migawka startowa Ofertomat 2.0
+Przy zamknięciu aplikacji zapisywana jest pierwsza strona produktów, liczba produktów
+i stan okna. Przy następnym starcie okno rysowane jest od razu z migawki,
+a wątek w tle porównuje zapisany licznik zmian bazy (ChangeCounter) z aktualnym -
+nieaktualna migawka jest natychmiast zastępowana danymi z bazy.
+Lista kategorii nie trafia do migawki: główne okno jej nie wyświetla, a okna dialogowe
+pobierają kategorie z bazy dopiero przy otwarciu.
+
+Format pliku: nagłówek SNAPSHOT_MAGIC + wersja formatu, dalej marshal skompresowany zlib.
+Plik leży obok bazy (ofertomat.db -> ofertomat.snapshot) i jest tylko pamięcią podręczną -
+można go w każdej chwili usunąć.
+"""
+
+import marshal
+import os
+import struct
+import zlib
+from typing import Dict, Optional
+
+SNAPSHOT_MAGIC = b'OFSNAP'
+SNAPSHOT_FORMAT = 1
+_HEADER = struct.Struct('<6sH')
+
+
+def snapshot_path(db_path: str) -> str:
+    return os.path.splitext(os.path.abspath(db_path))[0] + '.snapshot'
+
+
+def build_snapshot(db, page_size: int, window: Optional[Dict] = None) -> Dict:
+    """Dane pierwszego ekranu z bazy (licznik czytany najpierw - zmiana w trakcie unieważni migawkę)"""
+    change_counter = db.get_change_counter()
+    products, total = db.get_products_paginated(page=1, page_size=page_size)
+    return {
+        'db_path': os.path.abspath(db.db_path),
+        'change_counter': change_counter,
+        'page_size': page_size,
+        'products': products,
+        'total_products': total,
+        'window': window or {}
+    }
+
+
+def save_snapshot(path: str, snapshot: Dict) -> bool:
+    """Zapisuje migawkę atomowo (plik tymczasowy + os.replace)"""
+    tmp_path = f"{path}.tmp"
+    try:
+        payload = zlib.compress(marshal.dumps(snapshot), 1)
+        with open(tmp_path, 'wb') as f:
+            f.write(_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_FORMAT))
+            f.write(payload)
+        os.replace(tmp_path, path)
+        return True
+    except (OSError, ValueError) as e:
+        print(f"Nie można zapisać migawki startowej: {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return False
+
+
+def load_snapshot(path: str, db_path: Optional[str] = None) -> Optional[Dict]:
+    """Wczytuje migawkę; None gdy brak pliku, inny format lub migawka innej bazy"""
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except OSError:
+        return None
+    
+    if len(data) < _HEADER.size or _HEADER.unpack_from(data) != (SNAPSHOT_MAGIC, SNAPSHOT_FORMAT):
+        return None
+    try:
+        snapshot = marshal.loads(zlib.decompress(data[_HEADER.size:]))
+    except (zlib.error, EOFError, ValueError, TypeError):
+        return None
+    
+    if not isinstance(snapshot, dict) or snapshot.get('change_counter') is None:
+        return None
+    if db_path is not None and snapshot.get('db_path') != os.path.abspath(db_path):
+        return None
+    return snapshot
+
+
+def is_current(snapshot: Dict, db) -> bool:
+    """Czy od zapisu migawki nie zmieniono produktów ani kategorii (jedno zapytanie)"""
+    counter = db.get_change_counter()
+    return counter is not None and counter == snapshot['change_counter']
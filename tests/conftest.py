@@ -0,0 +1,31 @@
+"""Wspólne fixture testów Ofertomat 2.0 (moduły aplikacji leżą w katalogu głównym repozytorium)"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database  # noqa: E402
+
+
+@pytest.fixture
+def db(tmp_path):
+    """Pusta baza z aktualnym schematem w katalogu tymczasowym"""
+    database = Database(str(tmp_path / "test.db"))
+    yield database
+    database.close()
+
+
+@pytest.fixture
+def catalog(db):
+    """Dwie kategorie z produktami: {'napoje': id, 'dodatki': id, 'products': [produkty wg kodu]}"""
+    drinks = db.add_category("Napoje", 20.0)
+    extras = db.add_category("Dodatki", 50.0)
+    for index in range(5):
+        db.add_product(f"N{index}", f"Napój {index}", "szt.", 10.0 + index, 23.0, drinks)
+    for index in range(3):
+        db.add_product(f"D{index}", f"Dodatek {index}", "kg", 4.0, 8.0, extras)
+    products = sorted(db.get_products(), key=lambda product: product['code'])
+    return {'napoje': drinks, 'dodatki': extras, 'products': products}
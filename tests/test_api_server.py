@@ -0,0 +1,102 @@
+"""Serwer REST (api_server): walidacja treści żądań (400) i brakujące zasoby (404)"""
+
+import http.client
+import json
+
+import pytest
+
+from api_server import start_server
+from database import Database
+
+ITEM = {'name': "Napój", 'purchase_price_net': 10.0, 'vat_rate': 23.0}
+
+
+@pytest.fixture(scope="module")
+def api(tmp_path_factory):
+    # Jeden serwer na moduł - zatrzymanie serve_forever trwa do 0,5 s
+    db_path = str(tmp_path_factory.mktemp("api") / "api.db")
+    Database(db_path).close()
+    server, thread = start_server(db_path, port=0, readers=2)
+    
+    def request(method, path, body=None):
+        conn = http.client.HTTPConnection("127.0.0.1", server.server_port, timeout=10)
+        try:
+            payload = body if isinstance(body, (bytes, type(None))) else json.dumps(body).encode('utf-8')
+            conn.request(method, path, body=payload, headers={'Content-Type': 'application/json'})
+            response = conn.getresponse()
+            data = response.read()
+            if response.getheader('Content-Type', '').startswith('application/json'):
+                data = json.loads(data)
+            return response.status, data
+        finally:
+            conn.close()
+    
+    yield request
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+def test_create_and_read_offer(api):
+    status, data = api('POST', '/api/offers', {'title': "Oferta", 'items': [ITEM]})
+    assert status == 201
+    
+    status, offer = api('GET', f"/api/offers/{data['id']}")
+    assert status == 200
+    assert offer['title'] == "Oferta"
+    item = offer['items'][0]
+    assert (item['category_name'], item['unit'], item['margin'], item['quantity']) == ('Bez kategorii', 'szt.', 0.0, 1.0)
+
+
+@pytest.mark.parametrize("body", [
+    {'items': [ITEM]},
+    {'title': "  ", 'items': [ITEM]},
+    {'title': "Oferta", 'items': {}},
+    {'title': "Oferta", 'items': ["Napój"]},
+    {'title': "Oferta", 'items': [{'name': "Napój"}]},
+    {'title': "Oferta", 'items': [dict(ITEM, purchase_price_net="10")]},
+    {'title': "Oferta", 'items': [dict(ITEM, vat_rate=True)]},
+    {'title': "Oferta", 'items': [dict(ITEM, name="")]},
+    {'title': "Oferta", 'items': [ITEM], 'category_order': "Napoje"},
+    {'title': "Oferta", 'items': [ITEM], 'category_order': {'Napoje': "1"}},
+    [ITEM],
+    b"{niepoprawny json",
+    b"",
+])
+def test_invalid_offer_body_is_rejected(api, body):
+    offers_before = api('GET', '/api/offers')[1]['total']
+    status, data = api('POST', '/api/offers', body)
+    assert status == 400
+    assert data['error']
+    assert api('GET', '/api/offers')[1]['total'] == offers_before
+
+
+@pytest.mark.parametrize("path", ['/api/products?page=0', '/api/products?page_size=x', '/api/offers?sort=cena'])
+def test_invalid_query_parameter(api, path):
+    assert api('GET', path)[0] == 400
+
+
+def test_invalid_update_keeps_offer(api):
+    offer_id = api('POST', '/api/offers', {'title': "Oferta", 'items': [ITEM]})[1]['id']
+    
+    status, _ = api('PUT', f'/api/offers/{offer_id}', {'title': "Nowa", 'items': [dict(ITEM, margin="5")]})
+    assert status == 400
+    assert api('GET', f'/api/offers/{offer_id}')[1]['title'] == "Oferta"
+
+
+@pytest.mark.parametrize("method, path, body", [
+    ('GET', '/api/offers/999', None),
+    ('GET', '/api/offers/999/pdf', None),
+    ('PUT', '/api/offers/999', {'title': "Oferta", 'items': [ITEM]}),
+    ('DELETE', '/api/offers/999', None),
+    ('POST', '/api/offers/999/clone', None),
+    ('GET', '/api/nieznany', None),
+])
+def test_missing_resource(api, method, path, body):
+    status, data = api(method, path, body)
+    assert status == 404
+    assert data['error']
+
+
+def test_unsupported_method(api):
+    assert api('DELETE', '/api/offers')[0] == 405
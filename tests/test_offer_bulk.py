@@ -0,0 +1,61 @@
+"""Operacje zbiorowe na zapisanych ofertach: aktualizacja cen (reprice_offers) i kopiowanie (clone_offer)"""
+
+import pytest
+
+
+@pytest.fixture
+def offer_id(db, catalog):
+    napoj, dodatek = catalog['products'][3], catalog['products'][0]
+    items = [
+        {'product_id': napoj['id'], 'name': napoj['name'], 'category_name': "Napoje", 'unit': 'szt.',
+         'purchase_price_net': 100.0, 'vat_rate': 23.0, 'margin': 30.0, 'quantity': 2.0},
+        {'product_id': dodatek['id'], 'name': dodatek['name'], 'category_name': "Dodatki", 'unit': 'kg',
+         'purchase_price_net': 4.0, 'vat_rate': 8.0, 'margin': 50.0, 'quantity': 1.0},
+        {'product_id': None, 'name': "Transport", 'category_name': "Dodatki", 'unit': 'szt.',
+         'purchase_price_net': 50.0, 'vat_rate': 23.0, 'margin': 0.0, 'quantity': 1.0},
+    ]
+    return db.save_offer("Oferta", items, {"Napoje": 0, "Dodatki": 1})
+
+
+def _totals(db, offer_id):
+    totals = db.get_offer_totals(offer_id)
+    return totals['items_count'], totals['total_net'], totals['total_vat'], totals['total_gross']
+
+
+def test_saved_offer_totals(db, offer_id):
+    # 100*1.3*2 = 260 (+59.80 VAT), 4*1.5 = 6 (+0.48), 50 (+11.50)
+    assert _totals(db, offer_id) == (3, 316.0, 71.78, 387.78)
+
+
+def test_reprice_updates_prices_and_totals(db, catalog, offer_id):
+    # Ceny w katalogu: Napój 0 = 10.00, Dodatek 0 = 4.00 (bez zmian)
+    preview = db.preview_reprice_offer(offer_id)
+    assert [(row['name'], row['old_price'], row['new_price']) for row in preview] == [("Napój 0", 100.0, 10.0)]
+    
+    assert db.reprice_offers([offer_id]) == 1
+    
+    prices = [item['purchase_price_net'] for item in db.get_offer_by_id(offer_id)['items']]
+    assert prices == [10.0, 4.0, 50.0]
+    # 10*1.3*2 = 26 (+5.98 VAT)
+    assert _totals(db, offer_id) == (3, 82.0, 17.96, 99.96)
+    assert db.reprice_offers([offer_id]) == 0
+
+
+def test_clone_copies_items_and_totals(db, offer_id):
+    clone_id = db.clone_offer(offer_id)
+    
+    original, clone = db.get_offer_by_id(offer_id), db.get_offer_by_id(clone_id)
+    assert clone['title'] == "Oferta (kopia)"
+    assert clone['category_order'] == original['category_order']
+    columns = ('product_id', 'name', 'category_name', 'purchase_price_net', 'margin', 'quantity', 'position')
+    assert [[item[col] for col in columns] for item in clone['items']] == \
+           [[item[col] for col in columns] for item in original['items']]
+    assert db.get_offer_totals(clone_id) == db.get_offer_totals(offer_id)
+    
+    # Kopia jest niezależna od oryginału
+    db.reprice_offers([clone_id])
+    assert _totals(db, offer_id) == (3, 316.0, 71.78, 387.78)
+
+
+def test_clone_missing_offer(db):
+    assert db.clone_offer(999) == 0
@@ -0,0 +1,120 @@
+"""Model kreatora (OfferDraft): cofanie/ponawianie i odtwarzanie szkicu z dziennika (DraftAutosave)"""
+
+import pytest
+
+from offer_draft import EDITABLE_FIELDS, DraftAutosave, OfferDraft
+from services import OfferService
+
+
+def _state(draft):
+    """Stan modelu porównywalny ze szkicem odtworzonym z bazy"""
+    fields = ('id', 'offer_item_id') + EDITABLE_FIELDS
+    items = [{field: item.get(field) for field in fields} for item in draft.items]
+    for item in items:
+        # Brak ilości w modelu = 1 (DraftItems zapisuje domyślne 1.0)
+        if item['quantity'] is None:
+            item['quantity'] = 1.0
+    return items, list(draft.category_order), draft.title
+
+
+def _restored(db, draft_id):
+    draft = OfferDraft()
+    assert DraftAutosave.restore(db, draft_id, draft)
+    return draft
+
+
+@pytest.fixture
+def service(db):
+    return OfferService(db)
+
+
+def test_add_all_is_one_undo_step(db, catalog, service):
+    draft = service.open_offer()
+    draft.add_items(catalog['products'][:1])
+    
+    added, already_in = service.add_products(draft, catalog['products'])
+    assert len(added) == len(catalog['products']) - 1
+    assert already_in == catalog['products'][:1]
+    after_add = _state(draft)
+    
+    assert draft.undo()['label'] == f"dodanie {len(added)} poz."
+    assert [item['id'] for item in draft.items] == [catalog['products'][0]['id']]
+    assert draft.category_order == [catalog['products'][0]['category_name']]
+    
+    draft.redo()
+    assert _state(draft) == after_add
+    assert not draft.can_redo
+    
+    draft.undo()
+    draft.undo()
+    assert draft.items == [] and not draft.can_undo
+
+
+def test_set_based_add_category_is_one_undo_step(db, catalog, service):
+    draft = service.open_offer()
+    autosave = DraftAutosave(db)
+    draft.add_listener(autosave)
+    draft.add_items(catalog['products'][:1])
+    
+    added, _ = service.add_category(draft, catalog['napoje'], draft_id=autosave.sync())
+    assert [item['name'] for item in added] == [f"Napój {index}" for index in range(5)]
+    assert all(item['margin'] == 20.0 for item in added)
+    
+    draft.undo()
+    assert len(draft.items) == 1
+    draft.redo()
+    assert len(draft.items) == 6
+    
+    autosave.close()
+    assert _state(_restored(db, autosave.draft_id)) == _state(draft)
+
+
+def test_restore_replays_journal(db, catalog, service):
+    draft = service.open_offer()
+    autosave = DraftAutosave(db, compact_every=3)
+    draft.add_listener(autosave)
+    
+    draft.add_items(catalog['products'])
+    napoje = [item for item in draft.items if item['category_name'] == "Napoje"]
+    draft.update_items(napoje[:2], margin=12.5)
+    service.move_item(draft, napoje[1], -1)
+    draft.remove_items(napoje[2:3])
+    draft.move_category("Napoje", -1)
+    draft.undo()
+    for title in ("O", "Of", "Oferta"):
+        draft.set_title(title)
+    autosave.close()
+    
+    assert _state(_restored(db, autosave.draft_id)) == _state(draft)
+
+
+def test_restore_saved_offer_edit_from_baseline(db, catalog, service):
+    draft = service.open_offer()
+    draft.add_items(catalog['products'][:4])
+    offer_id = service.save_offer(draft, "Zapisana")
+    
+    draft = service.open_offer(offer_id)
+    autosave = DraftAutosave(db, title=draft.title, source_offer_id=offer_id)
+    draft.add_listener(autosave)
+    assert autosave.draft_id is None  # szkic zakładany dopiero przy pierwszej zmianie
+    
+    draft.remove_items(draft.items[:1])
+    draft.update_items(draft.items[-1:], margin=45.0)
+    draft.add_items(catalog['products'][6:7])
+    autosave.close()
+    
+    restored = _restored(db, autosave.draft_id)
+    assert _state(restored) == _state(draft)
+    # Pozycje z oferty źródłowej zachowują offer_item_id - zapis szkicu aktualizuje je różnicowo
+    assert all(item['offer_item_id'] for item in restored.items[:3])
+    assert restored.items[3]['offer_item_id'] is None
+
+
+def test_close_without_changes_creates_no_draft(db, catalog, service):
+    offer_id = db.save_offer("Zapisana", [], {})
+    autosave = DraftAutosave(db, source_offer_id=offer_id)
+    service.open_offer(offer_id).add_listener(autosave)
+    autosave.close()
+    
+    assert autosave.draft_id is None
+    assert db.get_drafts() == []
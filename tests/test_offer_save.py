@@ -0,0 +1,101 @@
+"""Zapis ofert: OfferService.items_to_save / save_offer i różnicowy Database.update_offer"""
+
+import pytest
+
+from services import OfferService
+
+
+def _item(name, price=100.0, category="Napoje", margin=30.0, quantity=1.0, product_id=None):
+    return {'product_id': product_id, 'name': name, 'category_name': category, 'unit': 'szt.',
+            'purchase_price_net': price, 'vat_rate': 23.0, 'margin': margin, 'quantity': quantity}
+
+
+def _saved_items(db, offer_id):
+    return [(item['offer_item_id'], item['name'], item['purchase_price_net'])
+            for item in db.get_offer_by_id(offer_id)['items']]
+
+
+@pytest.fixture
+def service(db):
+    return OfferService(db)
+
+
+def test_save_offer_round_trip(db, catalog, service):
+    draft = service.open_offer()
+    draft.add_items(catalog['products'][:3])
+    draft.add_items(catalog['products'][5:6])
+    
+    offer_id = service.save_offer(draft, "Oferta testowa")
+    
+    offer = db.get_offer_by_id(offer_id)
+    assert offer['title'] == "Oferta testowa"
+    assert [item['name'] for item in offer['items']] == [item['name'] for item in draft.items]
+    assert list(offer['category_order']) == draft.category_order == ["Dodatki", "Napoje"]
+    # Zapisane ID wierszy wracają do pozycji modelu
+    assert [item['offer_item_id'] for item in draft.items] == [item['offer_item_id'] for item in offer['items']]
+    
+    reopened = service.open_offer(offer_id)
+    assert service.items_to_save(reopened) == service.items_to_save(draft)
+
+
+def test_items_to_save_defaults(service):
+    draft = service.open_offer()
+    draft.add_items([{'id': None, 'name': "Usługa", 'purchase_price_net': 50.0}])
+    
+    items, category_order = service.items_to_save(draft)
+    
+    assert items == [{
+        'offer_item_id': None, 'product_id': None, 'name': "Usługa", 'category_name': 'Bez kategorii',
+        'unit': 'szt.', 'purchase_price_net': 50.0, 'vat_rate': 23, 'margin': 30.0, 'quantity': 1.0
+    }]
+    assert category_order == {'Bez kategorii': 0}
+
+
+def test_second_save_keeps_row_ids(db, catalog, service):
+    draft = service.open_offer()
+    draft.add_items(catalog['products'][:2])
+    offer_id = service.save_offer(draft, "Oferta")
+    first_ids = [item['offer_item_id'] for item in draft.items]
+    
+    draft.add_items(catalog['products'][2:3])
+    assert service.save_offer(draft, "Oferta", offer_id) == offer_id
+    
+    ids = [item['offer_item_id'] for item in draft.items]
+    assert ids[:2] == first_ids
+    assert ids[2] is not None and ids[2] not in first_ids
+    assert [row[0] for row in _saved_items(db, offer_id)] == ids
+
+
+def test_update_offer_diff(db):
+    offer_id = db.save_offer("Oferta", [_item("A"), _item("B"), _item("C")], {'Napoje': 0})
+    a, b, c = db.get_offer_by_id(offer_id)['items']
+    
+    # C przed A, B usunięte, A ze zmienioną ceną, D nowe na końcu
+    items = [dict(c), dict(a, purchase_price_net=120.0), _item("D")]
+    inserted = db.update_offer(offer_id, "Oferta 2", items, {'Napoje': 0})
+    
+    assert set(inserted) == {2}
+    rows = _saved_items(db, offer_id)
+    assert rows == [(c['offer_item_id'], "C", 100.0), (a['offer_item_id'], "A", 120.0), (inserted[2], "D", 100.0)]
+    assert db.get_offer_by_id(offer_id)['title'] == "Oferta 2"
+    assert db.get_offer_totals(offer_id)['items_count'] == 3
+
+
+def test_update_offer_insert_between_rows(db):
+    offer_id = db.save_offer("Oferta", [_item("A"), _item("B")], {'Napoje': 0})
+    a, b = db.get_offer_by_id(offer_id)['items']
+    
+    inserted = db.update_offer(offer_id, "Oferta", [a, _item("X"), _item("Y"), b], {'Napoje': 0})
+    
+    assert set(inserted) == {1, 2}
+    assert [row[1] for row in _saved_items(db, offer_id)] == ["A", "X", "Y", "B"]
+    assert [row[0] for row in _saved_items(db, offer_id)] == [a['offer_item_id'], inserted[1],
+                                                              inserted[2], b['offer_item_id']]
+
+
+def test_update_offer_without_changes_returns_empty_mapping(db):
+    offer_id = db.save_offer("Oferta", [_item("A")], {'Napoje': 0})
+    items = db.get_offer_by_id(offer_id)['items']
+    
+    assert db.update_offer(offer_id, "Oferta", items, {'Napoje': 0}) == {}
+    assert _saved_items(db, offer_id) == [(items[0]['offer_item_id'], "A", 100.0)]
@@ -0,0 +1,43 @@
+"""Plany zapytań listujących produkty (EXPLAIN QUERY PLAN) - patrz check_query_plans.py"""
+
+import pytest
+
+from check_query_plans import (EXPECTED_PLANS, TracingDatabase, collect_query_plans,
+                               find_plan_problems, seed_products)
+
+
+@pytest.fixture(scope="module")
+def plan_results(tmp_path_factory):
+    db = TracingDatabase(str(tmp_path_factory.mktemp("plans") / "plans.db"))
+    category_ids = seed_products(db, 20_000)
+    results = collect_query_plans(db, category_ids[len(category_ids) // 2])
+    db.close()
+    return results
+
+
+@pytest.mark.parametrize("shape", [name for name, _, _ in EXPECTED_PLANS])
+def test_listing_query_uses_expected_index(plan_results, shape):
+    shape_results = [result for result in plan_results if result[0] == shape]
+    assert shape_results
+    for _, sql, plan_steps, problems in shape_results:
+        assert not problems, f"{sql}\n{plan_steps}"
+
+
+def test_category_filter_without_index_search_is_reported():
+    steps = ['SCAN p USING INDEX idx_products_name_code',
+             'SEARCH c USING INTEGER PRIMARY KEY (rowid=?) LEFT-JOIN']
+    expected = EXPECTED_PLANS[1][2][0]
+    assert find_plan_problems(steps, expected)
+
+
+def test_temp_b_tree_sort_is_reported():
+    steps = ['SEARCH p USING INDEX idx_products_category_name (category_id=?)',
+             'USE TEMP B-TREE FOR ORDER BY']
+    expected = EXPECTED_PLANS[1][2][0]
+    assert find_plan_problems(steps, expected) == ['USE TEMP B-TREE FOR ORDER BY']
+
+
+def test_full_scan_of_joined_table_is_reported():
+    steps = ['SCAN p USING INDEX idx_products_name_code', 'SCAN c']
+    expected = EXPECTED_PLANS[0][2][0]
+    assert find_plan_problems(steps, expected) == ['SCAN c']
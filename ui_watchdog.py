@@ -0,0 +1,180 @@
+"""
+Wykrywanie zawieszeń interfejsu Ofertomat 2.0
+Pętla Tk wysyła co HEARTBEAT_MS sygnał życia (after()); wątek w tle sprawdza, czy sygnał
+nie spóźnia się ponad próg. W trakcie zawieszenia co kilka ms próbkuje stos wątku
+głównego (sys._current_frames()) - wynik pokazuje, które miejsce kodu (np.
+display_products, refresh_offer_items, synchroniczne zapytanie do bazy) blokuje okno.
+
+Włączanie: zmienna środowiskowa OFERTOMAT_UI_WATCHDOG=1
+    OFERTOMAT_UI_STALL_MS - próg zawieszenia w ms (domyślnie 150)
+    OFERTOMAT_DIAGNOSTICS_DIR - katalog na logi i zrzuty (domyślnie "diagnostics")
+
+Wyniki:
+    diagnostics/ui_stalls.jsonl - jedno zawieszenie na wiersz: czas, liczba próbek, najczęstsze stosy
+    diagnostics/ui_stacks_<data>.folded - zagregowane stosy ze wszystkich zawieszeń sesji
+        (format "ramka;ramka;ramka liczba" - np. dla flamegraph.pl / speedscope)
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+HEARTBEAT_MS = 50
+SAMPLE_INTERVAL_MS = 5
+MAX_STACK_DEPTH = 40
+TOP_STACKS_PER_STALL = 3
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}"
+
+
+def sample_stack(frame) -> Tuple[str, ...]:
+    """Stos od najbardziej zewnętrznej ramki do bieżącej (najwyżej MAX_STACK_DEPTH najgłębszych)"""
+    labels = []
+    while frame is not None and len(labels) < MAX_STACK_DEPTH:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    return tuple(reversed(labels))
+
+
+class StallWatchdog:
+    """Wykrywa zawieszenia pętli zdarzeń Tk i zbiera próbki stosu wątku głównego"""
+    
+    def __init__(self, root, threshold_ms: float = 150.0, log_dir: str = "diagnostics",
+                 heartbeat_ms: int = HEARTBEAT_MS, sample_interval_ms: int = SAMPLE_INTERVAL_MS):
+        self.root = root
+        self.threshold_ms = threshold_ms
+        self.log_dir = log_dir
+        self.heartbeat_ms = heartbeat_ms
+        self.sample_interval_ms = sample_interval_ms
+        self.started_at = datetime.now()
+        
+        self.stalls: List[Dict] = []
+        self.stacks: Counter = Counter()    # wszystkie próbki sesji
+        self.lock = threading.Lock()
+        
+        self._main_thread_id = threading.main_thread().ident
+        self._last_beat = time.perf_counter()
+        self._after_id = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    @classmethod
+    def from_env(cls, root) -> Optional['StallWatchdog']:
+        """Tworzy watchdog jeśli włączono go zmienną OFERTOMAT_UI_WATCHDOG"""
+        if os.environ.get('OFERTOMAT_UI_WATCHDOG', '').lower() not in ('1', 'true', 'yes', 'tak'):
+            return None
+        return cls(
+            root,
+            threshold_ms=float(os.environ.get('OFERTOMAT_UI_STALL_MS', 150)),
+            log_dir=os.environ.get('OFERTOMAT_DIAGNOSTICS_DIR', 'diagnostics')
+        )
+    
+    # === STEROWANIE ===
+    
+    def start(self) -> None:
+        self._last_beat = time.perf_counter()
+        self._after_id = self.root.after(self.heartbeat_ms, self._beat)
+        self._thread = threading.Thread(target=self._monitor, name="ui-watchdog", daemon=True)
+        self._thread.start()
+    
+    def stop(self) -> None:
+        """Zatrzymuje monitorowanie (wywołać w wątku głównym, przed zniszczeniem okna)"""
+        self._stop.set()
+        if self._after_id is not None:
+            try:
+                self.root.after_cancel(self._after_id)
+            except Exception:
+                pass
+            self._after_id = None
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+    
+    def _beat(self):
+        self._last_beat = time.perf_counter()
+        if not self._stop.is_set():
+            self._after_id = self.root.after(self.heartbeat_ms, self._beat)
+    
+    # === WĄTEK MONITORUJĄCY ===
+    
+    def _monitor(self):
+        limit_s = (self.heartbeat_ms + self.threshold_ms) / 1000
+        interval_s = self.sample_interval_ms / 1000
+        stall_beat = None             # sygnał, po którym nastąpiło zawieszenie
+        stall_samples: Counter = Counter()
+        
+        while not self._stop.wait(interval_s):
+            last_beat = self._last_beat
+            now = time.perf_counter()
+            
+            if stall_beat is not None and last_beat != stall_beat:
+                # Pętla Tk ruszyła - zapisz zakończone zawieszenie
+                self._record_stall(last_beat - stall_beat, stall_samples)
+                stall_beat, stall_samples = None, Counter()
+                continue
+            
+            if now - last_beat < limit_s:
+                continue
+            
+            stall_beat = last_beat
+            frame = sys._current_frames().get(self._main_thread_id)
+            if frame is not None:
+                stall_samples[sample_stack(frame)] += 1
+            del frame
+    
+    def _record_stall(self, gap_s: float, samples: Counter) -> None:
+        # Odstęp między sygnałami obejmuje też zwykłe oczekiwanie after() (heartbeat_ms)
+        stall_ms = max(0.0, gap_s * 1000 - self.heartbeat_ms)
+        stall = {
+            'at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'ms': round(stall_ms, 1),
+            'samples': sum(samples.values()),
+            'top_stacks': [
+                {'count': count, 'stack': list(stack[-12:])}
+                for stack, count in samples.most_common(TOP_STACKS_PER_STALL)
+            ]
+        }
+        with self.lock:
+            self.stalls.append(stall)
+            self.stacks.update(samples)
+        try:
+            os.makedirs(self.log_dir, exist_ok=True)
+            with open(os.path.join(self.log_dir, "ui_stalls.jsonl"), 'a', encoding='utf-8') as f:
+                f.write(json.dumps(stall, ensure_ascii=False) + "\n")
+        except OSError as e:
+            print(f"Nie można zapisać zawieszenia UI: {e}")
+    
+    # === RAPORT ===
+    
+    def hot_frames(self, limit: int = 15) -> List[Dict]:
+        """Ramki najczęściej obecne na stosie podczas zawieszeń (czas "włącznie" z wywołanymi)"""
+        with self.lock:
+            stacks = dict(self.stacks)
+        total = sum(stacks.values())
+        frames: Counter = Counter()
+        for stack, count in stacks.items():
+            for label in set(stack):
+                frames[label] += count
+        return [{'frame': label, 'samples': count, 'share': round(count / total, 3)}
+                for label, count in frames.most_common(limit)] if total else []
+    
+    def dump(self, path: Optional[str] = None) -> Optional[str]:
+        """Zapisuje zagregowane stosy sesji w formacie folded; None gdy nie było zawieszeń"""
+        with self.lock:
+            stacks = dict(self.stacks)
+        if not stacks:
+            return None
+        if path is None:
+            os.makedirs(self.log_dir, exist_ok=True)
+            path = os.path.join(self.log_dir, f"ui_stacks_{self.started_at.strftime('%Y%m%d_%H%M%S')}.folded")
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in sorted(stacks.items(), key=lambda entry: entry[1], reverse=True):
+                f.write(f"{';'.join(stack)} {count}\n")
+        return path